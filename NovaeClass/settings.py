@@ -42,7 +42,9 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    # Admin modules are discovered by novae_app's AppConfig, which leaves
+    # out django-import-export's: it is loaded on first use.
+    "django.contrib.admin.apps.SimpleAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
@@ -61,6 +63,9 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "novae_app.middleware.TenantMiddleware",
+    "novae_app.middleware.ProfilingMiddleware",
+    "novae_app.middleware.StudySessionHeartbeatMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -93,6 +98,7 @@ DATABASES = {
         "NAME": BASE_DIR / "db.sqlite3",
     }
 }
+DATABASE_ROUTERS = ["novae_app.tenancy.TenantRouter"]
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -129,6 +135,16 @@ USE_TZ = True
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"  # Where collectstatic will put files
 
+# Generated files (DOCX exports). Served through views, not publicly.
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Uploaded Material files are served through a permission-checked view.
+# Set MEDIA_OFFLOAD to 'x-accel-redirect' (nginx, with an internal location
+# at MEDIA_OFFLOAD_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile' (Apache)
+# to let the web server do the transfer.
+MEDIA_OFFLOAD = None
+MEDIA_OFFLOAD_PREFIX = "/protected-media/"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
@@ -141,3 +157,84 @@ CSRF_TRUSTED_ORIGINS = [
 
 # Redirect users after login to your home dashboard instead of /accounts/profile/
 LOGIN_REDIRECT_URL = "/student/dashboard/"
+
+# Study session tracking: how often an active student refreshes the
+# heartbeat, and how long a session may stay silent before
+# ``close_stale_sessions`` closes it.
+STUDY_SESSION_HEARTBEAT_SECONDS = 60
+STUDY_SESSION_IDLE_MINUTES = 30
+
+# Rendered lesson bodies are cached by content hash for this many seconds.
+LESSON_BODY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Anonymous marketing pages and assignment previews are served from the
+# cache for PAGE_CACHE_TIMEOUT seconds (see novae_app.pagecache); browsers
+# may reuse them for PAGE_CACHE_MAX_AGE.
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_MAX_AGE = 60 * 5
+
+# Background jobs (manage.py run_worker, started next to the web server by
+# the Dockerfile; see Procfile for process managers). A running job's
+# worker renews its lock every JOB_HEARTBEAT_SECONDS; a job whose lock has
+# not been renewed for JOB_LOCK_TIMEOUT_SECONDS is requeued. Failed jobs
+# retry after JOB_RETRY_BACKOFF_SECONDS, doubling per attempt up to the
+# maximum.
+JOB_HEARTBEAT_SECONDS = 60
+JOB_LOCK_TIMEOUT_SECONDS = 10 * 60
+JOB_RETRY_BACKOFF_SECONDS = 30
+JOB_RETRY_BACKOFF_MAX_SECONDS = 60 * 60
+
+# StudentAnswer retention: answers of completed assignments older than
+# this are moved to compressed files under ANSWER_ARCHIVE_DIR by
+# ``manage.py archive_answers``.
+ANSWER_RETENTION_DAYS = 365
+ANSWER_ARCHIVE_DIR = BASE_DIR / "archive"
+
+# Store each submission as one packed AnswerSet row instead of one
+# StudentAnswer row per question. Existing rows stay readable; convert
+# them with ``manage.py pack_answers``.
+PACKED_ANSWER_STORAGE = False
+
+# Per-school databases: with TENANT_DATABASES on, each school's student
+# data lives in TENANT_DATABASE_DIR/<slug>.sqlite3 while the catalog stays
+# in the default database (see novae_app.tenancy). Create and migrate
+# them with ``manage.py migrate_tenants``.
+TENANT_DATABASES = False
+TENANT_DATABASE_DIR = BASE_DIR / "tenants"
+
+# Profiling and the slow-query log (see novae_app.profiling): staff can
+# profile a single request with ``?profile=sample`` or ``?profile=cprofile``;
+# the newest PROFILE_KEEP profiles are kept in PROFILE_DIR. Queries slower
+# than SLOW_QUERY_SECONDS are logged with their query plan to
+# SLOW_QUERY_LOG, rotated at 10 MB.
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_KEEP = 100
+PROFILE_SAMPLE_INTERVAL = 0.001
+SLOW_QUERY_SECONDS = 0.2
+SLOW_QUERY_LOG = BASE_DIR / "slow_queries.log"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "slow_queries": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": SLOW_QUERY_LOG,
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+            "encoding": "utf-8",
+            "formatter": "message",
+        },
+    },
+    "loggers": {
+        "novae_app.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
@@ -0,0 +1,149 @@
+"""
+Achievements driven by per-student counters.
+
+Events (an assignment graded, study time closed, a quiz answered) are
+folded into StudentCounter rows with in-place ``F()`` increments. Only
+the badges that watch a counter which just changed are evaluated, and a
+badge is written once, at the moment its counter crosses the threshold.
+The achievements page then only has to read StudentBadge for a student.
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Sum
+
+from .models import StudentBadge, StudentCounter
+
+
+ASSIGNMENTS_COMPLETED = 'assignments_completed'
+PERFECT_SCORES = 'perfect_scores'
+STUDY_SECONDS = 'study_seconds'
+QUIZ_ANSWERS = 'quiz_answers'
+QUIZ_CORRECT = 'quiz_correct'
+
+PERFECT_SCORE = 100
+
+Badge = namedtuple('Badge', 'code name description counter threshold')
+
+BADGES = [
+    Badge('first_assignment', "First Steps", "Complete your first assignment.",
+          ASSIGNMENTS_COMPLETED, 1),
+    Badge('assignments_10', "Homework Hero", "Complete 10 assignments.",
+          ASSIGNMENTS_COMPLETED, 10),
+    Badge('assignments_50', "Assignment Ace", "Complete 50 assignments.",
+          ASSIGNMENTS_COMPLETED, 50),
+    Badge('perfect_score', "Perfect Score", "Score 100% on an assignment.",
+          PERFECT_SCORES, 1),
+    Badge('perfect_10', "Flawless", "Score 100% on 10 assignments.",
+          PERFECT_SCORES, 10),
+    Badge('study_hour', "Hour of Focus", "Study for a total of one hour.",
+          STUDY_SECONDS, 60 * 60),
+    Badge('study_10_hours', "Dedicated Learner", "Study for a total of ten hours.",
+          STUDY_SECONDS, 10 * 60 * 60),
+    Badge('quiz_10', "Quiz Taker", "Answer 10 daily quiz questions.",
+          QUIZ_ANSWERS, 10),
+    Badge('quiz_correct_50', "Sharp Mind", "Get 50 daily quiz questions right.",
+          QUIZ_CORRECT, 50),
+]
+BADGES_BY_CODE = {badge.code: badge for badge in BADGES}
+BADGES_BY_COUNTER = defaultdict(list)
+for _badge in BADGES:
+    BADGES_BY_COUNTER[_badge.counter].append(_badge)
+
+
+def record_events(events):
+    """
+    Apply ``(student_id, counter, amount)`` events. Returns the list of
+    StudentBadge rows unlocked by them.
+    """
+    totals = defaultdict(int)
+    for student_id, counter, amount in events:
+        if amount:
+            totals[(student_id, counter)] += amount
+    if not totals:
+        return []
+
+    # Students that moved the same counter by the same amount share one UPDATE.
+    by_increment = defaultdict(list)
+    for (student_id, counter), amount in totals.items():
+        by_increment[(counter, amount)].append(student_id)
+
+    with transaction.atomic():
+        StudentCounter.objects.bulk_create(
+            [StudentCounter(student_id=s, name=c) for s, c in totals],
+            ignore_conflicts=True,
+        )
+        for (counter, amount), student_ids in by_increment.items():
+            StudentCounter.objects.filter(
+                name=counter, student_id__in=student_ids
+            ).update(value=F('value') + amount)
+
+        values = StudentCounter.objects.filter(
+            student_id__in={s for s, _ in totals},
+            name__in={c for _, c in totals},
+        ).values_list('student_id', 'name', 'value')
+
+        unlocked = []
+        for student_id, counter, value in values:
+            amount = totals.get((student_id, counter))
+            if not amount:
+                continue
+            for badge in BADGES_BY_COUNTER.get(counter, ()):
+                if value - amount < badge.threshold <= value:
+                    unlocked.append(StudentBadge(student_id=student_id, code=badge.code))
+        if unlocked:
+            StudentBadge.objects.bulk_create(unlocked, ignore_conflicts=True)
+    return unlocked
+
+
+# ---------------------------
+# Event helpers
+# ---------------------------
+def record_assignment_graded(student_id, old_score, new_score, was_completed):
+    events = []
+    if not was_completed:
+        events.append((student_id, ASSIGNMENTS_COMPLETED, 1))
+    if new_score is not None and new_score >= PERFECT_SCORE and (
+        old_score is None or old_score < PERFECT_SCORE
+    ):
+        events.append((student_id, PERFECT_SCORES, 1))
+    return record_events(events)
+
+
+def record_quiz_answer(student_id, correct):
+    events = [(student_id, QUIZ_ANSWERS, 1)]
+    if correct:
+        events.append((student_id, QUIZ_CORRECT, 1))
+    return record_events(events)
+
+
+def record_study_time(sessions):
+    """
+    Credit the time spent in ``sessions`` (a queryset of closed StudySession
+    rows) to their students, with one grouped query.
+    """
+    rows = (
+        sessions.filter(logout_time__isnull=False, student__student_profile__isnull=False)
+        .values('student__student_profile')
+        .annotate(total=Sum(ExpressionWrapper(
+            F('logout_time') - F('login_time'), output_field=DurationField()
+        )))
+        .order_by()
+    )
+    return record_events(
+        (row['student__student_profile'], STUDY_SECONDS, int(row['total'].total_seconds()))
+        for row in rows
+        if row['total']
+    )
+
+
+def badges_for(student):
+    """Earned and locked badges for the achievements page."""
+    earned = {
+        badge.code: badge.earned_at
+        for badge in StudentBadge.objects.filter(student=student).only('code', 'earned_at')
+    } if student is not None else {}
+    return [
+        {'badge': badge, 'earned_at': earned.get(badge.code)}
+        for badge in BADGES
+    ]
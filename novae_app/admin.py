@@ -1,20 +1,138 @@
 ﻿from django.contrib import admin
-from import_export.admin import ImportExportModelAdmin
+
+import csv
+import io
 
 from django import forms
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_permission_codename
+from django.contrib.admin.views.main import ChangeList
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from .exports import gradebook_queryset, gradebook_response
+from .forms import GradebookExportForm
+from .grading import regrade_report_rows, regrade_schools
+from .importers import import_assignments
+from .paginators import EstimatedCountPaginator
+from .roster import import_roster
+from .tenancy import maintenance_schools, tenancy_enabled
 from .models import (
     User,
+    AnswerSet,
     StudentProfile,
     ParentProfile,
     Assignment,
+    AssignmentAttempt,
     AssignmentInstance,
+    AssignmentStats,
     Material,
     Question,
+    QuestionStats,
+    ReviewSchedule,
+    StudentBadge,
+    StudentCounter,
     Game,
+    Job,
     Course,
-    StudyPlan
+    School,
+    StudyPlan,
+    StudentAnswer,
+    get_free_trial_course,
 )
 
+# ---------------------------
+# Import / export
+# ---------------------------
+class LazyImportExportAdmin(admin.ModelAdmin):
+    """
+    django-import-export's import and export pages, with the package
+    (tablib, its format backends, YAML...) only imported the first time one
+    of them is opened instead of by every process at startup. The pages are
+    served by an ImportExportMixin subclass of the concrete admin, built on
+    demand.
+    """
+
+    import_export_change_list_template = 'admin/import_export/change_list_import_export.html'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ie_base_change_list_template = self.change_list_template or 'admin/change_list.html'
+        self.change_list_template = self.import_export_change_list_template
+        self._import_export_admin = None
+
+    def import_export_admin(self):
+        if self._import_export_admin is None:
+            from import_export.admin import ImportExportMixin
+
+            admin_class = type(type(self).__name__, (ImportExportMixin, type(self)), {})
+            self._import_export_admin = admin_class(self.model, self.admin_site)
+        return self._import_export_admin
+
+    def _has_import_export_permission(self, request, setting):
+        code = getattr(settings, setting, None)
+        if code is None:
+            return True
+        return request.user.has_perm(
+            f'{self.opts.app_label}.{get_permission_codename(code, self.opts)}'
+        )
+
+    def get_urls(self):
+        info = self.opts.app_label, self.opts.model_name
+        urls = [
+            path(
+                'process_import/',
+                self.admin_site.admin_view(self.process_import),
+                name='%s_%s_process_import' % info,
+            ),
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_action),
+                name='%s_%s_import' % info,
+            ),
+            path(
+                'export/',
+                self.admin_site.admin_view(self.export_action),
+                name='%s_%s_export' % info,
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def process_import(self, request, *args, **kwargs):
+        return self.import_export_admin().process_import(request, *args, **kwargs)
+
+    def import_action(self, request, *args, **kwargs):
+        return self.import_export_admin().import_action(request, *args, **kwargs)
+
+    def export_action(self, request, *args, **kwargs):
+        return self.import_export_admin().export_action(request, *args, **kwargs)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            'ie_base_change_list_template': self.ie_base_change_list_template,
+            'has_import_permission': self._has_import_export_permission(
+                request, 'IMPORT_EXPORT_IMPORT_PERMISSION_CODE'
+            ),
+            'has_export_permission': self._has_import_export_permission(
+                request, 'IMPORT_EXPORT_EXPORT_PERMISSION_CODE'
+            ),
+            **(extra_context or {}),
+        }
+        return super().changelist_view(request, extra_context)
+
+
+# ---------------------------
+# School admin
+# ---------------------------
+@admin.register(School)
+class SchoolAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'domain', 'created_at')
+    search_fields = ('name', 'slug', 'domain')
+    prepopulated_fields = {'slug': ('name',)}
+
+
 # ---------------------------
 # User admin
 # ---------------------------
@@ -30,20 +148,118 @@ class UserAdmin(admin.ModelAdmin):
 # ---------------------------
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'grade', 'is_demo')
-    list_filter = ('grade', 'is_demo')
+    list_display = ('user', 'grade', 'school', 'is_demo')
+    list_filter = ('grade', 'school', 'is_demo')
     search_fields = ('user__username', 'user__email')
+    list_select_related = ('user', 'school')
+    raw_id_fields = ('user',)
 
 
 
+# ---------------------------
+# Bulk import form
+# ---------------------------
+MAX_REPORTED_ERRORS = 100
+
+
+class BulkImportForm(forms.Form):
+    file = forms.FileField()
+
+
+class RosterImportForm(BulkImportForm):
+    school = forms.ModelChoiceField(
+        queryset=School.objects.order_by('name'),
+        required=False,
+        empty_label="No school",
+        help_text="Every parent and student in the file joins this school."
+    )
+
+
+class AdminGradebookExportForm(GradebookExportForm):
+    parent = forms.CharField(
+        label="Parent username",
+        required=False,
+        help_text="Only this parent's children."
+    )
+    school = forms.ModelChoiceField(
+        queryset=School.objects.order_by('name'),
+        required=False,
+        empty_label="All schools",
+        help_text="With per-school databases, choose a school to export its students."
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Each school's grades live in its own database; an export reads one.
+        if tenancy_enabled():
+            self.fields['school'].required = True
+            self.fields['school'].empty_label = None
+            self.fields['school'].help_text = "Schools are exported one at a time."
+
+    def clean_parent(self):
+        username = self.cleaned_data['parent']
+        if not username:
+            return None
+        try:
+            return ParentProfile.objects.get(user__username=username)
+        except ParentProfile.DoesNotExist:
+            raise forms.ValidationError("No parent with this username.")
+
+
 # ---------------------------
 # ParentProfile admin
 # ---------------------------
 @admin.register(ParentProfile)
 class ParentProfileAdmin(admin.ModelAdmin):
-    list_display = ('user', 'phone_number')
+    list_display = ('user', 'phone_number', 'school')
+    list_filter = ('school',)
     search_fields = ('user__username', 'user__email')
-    filter_horizontal = ('children',)
+    list_select_related = ('user', 'school')
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('children',)
+    change_list_template = 'admin/novae_app/parentprofile/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import-roster/',
+                self.admin_site.admin_view(self.import_roster_view),
+                name='novae_app_parentprofile_import_roster',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_roster_view(self, request):
+        if not self.has_add_permission(request):
+            return self.admin_site.login(request)
+
+        errors = []
+        if request.method == 'POST':
+            form = RosterImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8')
+                result = import_roster(stream, school=form.cleaned_data['school'])
+                errors = result.errors[:MAX_REPORTED_ERRORS]
+                messages.success(
+                    request,
+                    f"Imported {result.parents} families with "
+                    f"{result.students} students ({len(result.errors)} problems).",
+                )
+        else:
+            form = RosterImportForm()
+
+        return TemplateResponse(request, 'admin/novae_app/bulk_import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import school roster',
+            'help_text': (
+                'Upload a CSV with columns parent_username, parent_email, '
+                'parent_password, parent_phone (optional), child_username, '
+                'child_password and child_grade, one row per child.'
+            ),
+            'form': form,
+            'errors': errors,
+        })
 
 
 # ---------------------------
@@ -58,15 +274,35 @@ class AssignmentAdminForm(forms.ModelForm):
         instance = super().save(commit=False)
         # Automatically assign "Free Trial" course for demo/sample
         if instance.is_demo or instance.is_sample:
-            try:
-                free_course = Course.objects.get(title="Free Trial")
-                instance.course = free_course
-            except Course.DoesNotExist:
-                # fallback: pick any course if Free Trial doesn't exist
-                instance.course = Course.objects.first()
+            instance.course = get_free_trial_course()
         if commit:
             instance.save()
         return instance
+# ---------------------------
+# Regrade report
+# ---------------------------
+def regrade_report_response(changes, filename='regrade_report.csv'):
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    csv.writer(response).writerows(regrade_report_rows(changes))
+    return response
+
+
+# Each school's instances are regraded in its own database.
+@admin.action(description="Regrade submitted work (downloads a report)")
+def regrade_selected_assignments(modeladmin, request, queryset):
+    changes = regrade_schools(queryset.values_list('id', flat=True), maintenance_schools())
+    return regrade_report_response(changes)
+
+
+@admin.action(description="Regrade the assignments of these questions")
+def regrade_question_assignments(modeladmin, request, queryset):
+    changes = regrade_schools(
+        queryset.values_list('assignment_id', flat=True).distinct(), maintenance_schools()
+    )
+    return regrade_report_response(changes)
+
+
 # ---------------------------
 # Assignment admin
 class QuestionInline(admin.TabularInline):
@@ -76,7 +312,7 @@ class QuestionInline(admin.TabularInline):
 
 
 @admin.register(Assignment)
-class AssignmentAdmin(ImportExportModelAdmin):
+class AssignmentAdmin(LazyImportExportAdmin):
     form = AssignmentAdminForm
     list_display = (
         'title',
@@ -84,6 +320,7 @@ class AssignmentAdmin(ImportExportModelAdmin):
         'due_date',
         'is_demo',
         'is_sample',
+        'class_average',
     )
     list_filter = (
         'grade_level',
@@ -92,18 +329,196 @@ class AssignmentAdmin(ImportExportModelAdmin):
         'is_sample',
     )
     search_fields = ('title',)
+    list_select_related = ('stats',)
     inlines = [QuestionInline]
+    actions = [regrade_selected_assignments]
+    change_list_template = 'admin/novae_app/assignment/change_list.html'
 
     def save_model(self, request, obj, form, change):
         super().save_model(request, obj, form, change)
+
+    @admin.display(description='Class average')
+    def class_average(self, obj):
+        stats = getattr(obj, 'stats', None)
+        if stats is None or not stats.count:
+            return '-'
+        return f"{stats.mean:.1f} (n={stats.count})"
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import-questions/',
+                self.admin_site.admin_view(self.import_questions_view),
+                name='novae_app_assignment_import_questions',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_questions_view(self, request):
+        if not self.has_add_permission(request):
+            return self.admin_site.login(request)
+
+        errors = []
+        if request.method == 'POST':
+            form = BulkImportForm(request.POST, request.FILES)
+            if form.is_valid():
+                stream = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8')
+                result = import_assignments(stream)
+                errors = result.errors[:MAX_REPORTED_ERRORS]
+                messages.success(
+                    request,
+                    f"Imported {result.assignments} assignments and "
+                    f"{result.questions} questions "
+                    f"({len(result.errors)} lines skipped).",
+                )
+        else:
+            form = BulkImportForm()
+
+        return TemplateResponse(request, 'admin/novae_app/bulk_import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import assignments with questions',
+            'help_text': (
+                'Upload a JSON Lines file with one assignment per line and '
+                'its questions nested under "questions".'
+            ),
+            'form': form,
+            'errors': errors,
+        })
 # ---------------------------
 # AssignmentInstance admin
 # ---------------------------
 @admin.register(AssignmentInstance)
-class AssignmentInstanceAdmin(ImportExportModelAdmin):
+class AssignmentInstanceAdmin(LazyImportExportAdmin):
     list_display = ('assignment', 'student', 'score', 'completed')
     list_filter = ('completed', 'assignment__grade_level')
     search_fields = ('assignment__title', 'student__user__username')
+    list_select_related = ('assignment', 'student__user')
+    autocomplete_fields = ('assignment', 'student')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/novae_app/assignmentinstance/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'export-gradebook/',
+                self.admin_site.admin_view(self.export_gradebook_view),
+                name='novae_app_assignmentinstance_export_gradebook',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def export_gradebook_view(self, request):
+        if not self.has_view_permission(request):
+            return self.admin_site.login(request)
+
+        form = AdminGradebookExportForm(request.GET if 'format' in request.GET else None)
+        if form.is_valid():
+            data = form.cleaned_data
+            return gradebook_response(
+                gradebook_queryset(
+                    grade=data['grade'],
+                    start=data['start'],
+                    end=data['end'],
+                    parent=data['parent'],
+                    school=data['school'],
+                ),
+                export_format=data['format'],
+            )
+
+        return TemplateResponse(request, 'admin/novae_app/gradebook_export.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Export gradebook',
+            'form': form,
+        })
+
+
+# ---------------------------
+# StudentAnswer admin
+# ---------------------------
+KEYSET_VAR = 'after'
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist paged by primary key instead of OFFSET.
+
+    Each page is ``WHERE id < <last id seen> ORDER BY id DESC LIMIT n``,
+    so page 10,000 costs the same as page 1 and nothing is ever counted.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(KEYSET_VAR, None)
+        return lookup_params
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        after = request.GET.get(KEYSET_VAR)
+        if after:
+            try:
+                queryset = queryset.filter(pk__lt=int(after))
+            except ValueError:
+                pass
+        return queryset
+
+    def get_results(self, request):
+        rows = list(self.queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        self.next_page_query = None
+        if len(rows) > self.list_per_page:
+            self.next_page_query = self.get_query_string(
+                {KEYSET_VAR: self.result_list[-1].pk}
+            )
+        self.first_page_query = None
+        if KEYSET_VAR in self.params:
+            self.first_page_query = self.get_query_string(remove=[KEYSET_VAR])
+        self.result_count = len(self.result_list)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = self.model_admin.get_paginator(
+            request, self.queryset, self.list_per_page
+        )
+
+
+@admin.register(StudentAnswer)
+class StudentAnswerAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'student',
+        'question',
+        'selected_option',
+        'submitted_at',
+    )
+    list_select_related = ('student__user', 'question')
+    search_fields = ('student__user__username',)
+    raw_id_fields = ('student', 'question', 'assignment_instance')
+    ordering = ('-id',)
+    sortable_by = ()
+    show_full_result_count = False
+    change_list_template = 'admin/novae_app/studentanswer/change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+# ---------------------------
+# AssignmentStats admin
+# ---------------------------
+@admin.register(AssignmentStats)
+class AssignmentStatsAdmin(admin.ModelAdmin):
+    list_display = ('assignment', 'count', 'mean', 'min_score', 'max_score', 'updated_at')
+    list_select_related = ('assignment',)
+    search_fields = ('assignment__title',)
+    readonly_fields = [field.name for field in AssignmentStats._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
 
 
 # ---------------------------
@@ -117,7 +532,10 @@ class MaterialAdmin(admin.ModelAdmin):
         'is_demo',
         'is_sample',
         'file_url',
+        'file',
+        'file_size',
     )
+    readonly_fields = ('file_size', 'preview')
     list_filter = (
         'grade_level',
         'is_demo',
@@ -137,6 +555,114 @@ class QuestionAdmin(admin.ModelAdmin):
     list_display = ('question_text', 'question_type', 'is_text_answer', 'correct_option')
     list_filter = ('question_type',)
     search_fields = ('question_text',)
+    actions = [regrade_question_assignments]
+
+
+# ---------------------------
+# QuestionStats admin
+# ---------------------------
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'question',
+        'responses',
+        'p_value',
+        'point_biserial',
+        'option_a_count',
+        'option_b_count',
+        'option_c_count',
+        'option_d_count',
+        'computed_at',
+    )
+    list_select_related = ('question',)
+    search_fields = ('question__question_text',)
+    readonly_fields = [field.name for field in QuestionStats._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AssignmentAttempt)
+class AssignmentAttemptAdmin(admin.ModelAdmin):
+    list_display = ('instance', 'number', 'score', 'correct_count', 'question_count', 'submitted_at')
+    list_select_related = ('instance__assignment', 'instance__student__user')
+    raw_id_fields = ('instance',)
+    readonly_fields = [field.name for field in AssignmentAttempt._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AnswerSet)
+class AnswerSetAdmin(admin.ModelAdmin):
+    list_display = ('assignment_instance', 'student', 'attempt', 'submitted_at')
+    list_select_related = ('assignment_instance__assignment', 'assignment_instance__student__user', 'student__user')
+    raw_id_fields = ('assignment_instance', 'student')
+    date_hierarchy = 'submitted_at'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'task',
+        'status',
+        'priority',
+        'attempts',
+        'run_after',
+        'locked_by',
+        'created_at',
+    )
+    list_filter = ('status', 'task')
+    search_fields = ('task', 'key')
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    show_full_result_count = False
+    actions = ['requeue_jobs']
+
+    @admin.action(description="Requeue selected jobs")
+    def requeue_jobs(self, request, queryset):
+        count = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, attempts=0, run_after=timezone.now(), last_error=''
+        )
+        self.message_user(request, f"Requeued {count} job(s).", messages.SUCCESS)
+
+
+@admin.register(StudentBadge)
+class StudentBadgeAdmin(admin.ModelAdmin):
+    list_display = ('student', 'code', 'earned_at')
+    list_filter = ('code',)
+    list_select_related = ('student__user',)
+    raw_id_fields = ('student',)
+    search_fields = ('student__user__username',)
+
+
+@admin.register(StudentCounter)
+class StudentCounterAdmin(admin.ModelAdmin):
+    list_display = ('student', 'name', 'value')
+    list_filter = ('name',)
+    list_select_related = ('student__user',)
+    raw_id_fields = ('student',)
+    search_fields = ('student__user__username',)
+
+
+@admin.register(ReviewSchedule)
+class ReviewScheduleAdmin(admin.ModelAdmin):
+    list_display = (
+        'student',
+        'question',
+        'due_date',
+        'interval_days',
+        'repetitions',
+        'easiness',
+        'last_reviewed',
+    )
+    list_filter = ('due_date',)
+    list_select_related = ('student__user', 'question')
+    raw_id_fields = ('student', 'question')
+    search_fields = ('student__user__username', 'question__question_text')
 
 
 # ---------------------------
@@ -166,20 +692,13 @@ class GameAdmin(admin.ModelAdmin):
 class StudyPlanAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'subject', 'date', 'updated_at')
     search_fields = ('title', 'user__username', 'subject')
+    list_select_related = ('user',)
 
 
-
-from .models import Course
-
-
+# ---------------------------
+# Course admin
+# ---------------------------
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ("id", "title")
     search_fields = ("title",)
-
-
-
-
-
-
-
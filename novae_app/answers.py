@@ -0,0 +1,217 @@
+"""
+Reading and writing submitted answers.
+
+Answers are stored in one of two layouts:
+
+* one StudentAnswer row per question (the default);
+* with ``PACKED_ANSWER_STORAGE = True``, one AnswerSet row per submission
+  whose JSON payload maps question id to the answer given.
+
+A 40-question quiz is then one row and one index entry per key instead of
+forty. Both layouts can coexist (data written before the switch stays
+readable), so code that needs answers goes through the adapters here and
+gets SubmittedAnswer tuples shaped like StudentAnswer rows for the
+instance's current attempt (``AssignmentInstance.attempt_count``),
+including answers moved to cold storage by novae_app.archive.
+``pack_answers`` converts existing rows.
+"""
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db.models import F
+
+from .archive import archived_answers_by_instance
+from .models import AnswerArchiveEntry, AnswerSet, Question, StudentAnswer
+from .tenancy import atomic_student_data
+
+
+SubmittedAnswer = namedtuple(
+    'SubmittedAnswer',
+    'assignment_instance_id student_id question_id selected_option text_answer submitted_at',
+)
+
+
+def packed_storage_enabled():
+    return getattr(settings, 'PACKED_ANSWER_STORAGE', False)
+
+
+def _question_types(question_ids):
+    return dict(
+        Question.objects.filter(id__in=question_ids).values_list('id', 'question_type')
+    )
+
+
+def unpack(answer_set, question_types):
+    """SubmittedAnswer tuples for an AnswerSet (``question_types``: id -> type)."""
+    answers = []
+    for question_id, value in answer_set.answers.items():
+        question_id = int(question_id)
+        text = question_types.get(question_id) == 'TEXT'
+        answers.append(SubmittedAnswer(
+            answer_set.assignment_instance_id,
+            answer_set.student_id,
+            question_id,
+            None if text else value,
+            value if text else None,
+            answer_set.submitted_at,
+        ))
+    return answers
+
+
+def latest_answer_sets(instance_ids):
+    """The AnswerSet of each instance's current attempt, keyed by instance id."""
+    return {
+        answer_set.assignment_instance_id: answer_set
+        for answer_set in AnswerSet.objects.filter(
+            assignment_instance_id__in=instance_ids,
+            attempt=F('assignment_instance__attempt_count'),
+        )
+    }
+
+
+def answers_by_instance(instance_ids):
+    """
+    ``{instance id: [SubmittedAnswer, ...]}`` with the answers of each
+    instance's current attempt, from either layout or the cold-storage
+    archive, in a fixed number of queries.
+    """
+    instance_ids = list(instance_ids)
+    packed = latest_answer_sets(instance_ids)
+    result = defaultdict(list)
+
+    question_ids = {int(qid) for s in packed.values() for qid in s.answers}
+    types = _question_types(question_ids) if question_ids else {}
+    for instance_id, answer_set in packed.items():
+        result[instance_id] = unpack(answer_set, types)
+
+    unpacked = [i for i in instance_ids if i not in packed]
+    archived_attempts = dict(
+        AnswerArchiveEntry.objects.filter(assignment_instance_id__in=unpacked)
+        .values_list('assignment_instance_id', 'assignment_instance__attempt_count')
+        .distinct()
+    )
+    if archived_attempts:
+        for instance_id, answers in archived_answers_by_instance(archived_attempts).items():
+            result[instance_id].extend(
+                SubmittedAnswer(*(getattr(answer, field) for field in SubmittedAnswer._fields))
+                for answer in answers
+                if answer.attempt == archived_attempts[instance_id]
+            )
+
+    rows = StudentAnswer.objects.filter(
+        assignment_instance_id__in=unpacked,
+        attempt=F('assignment_instance__attempt_count'),
+    ).values_list(*SubmittedAnswer._fields).order_by('id')
+    for row in rows:
+        result[row[0]].append(SubmittedAnswer(*row))
+    return result
+
+
+def answers_for(instance):
+    return answers_by_instance([instance.id]).get(instance.id, [])
+
+
+def save_answers(instance, student, values, attempt):
+    """
+    Store the answers of attempt number ``attempt``. ``values`` maps
+    Question to the submitted value (a letter, or the text for TEXT
+    questions). Answers are only ever inserted; earlier attempts keep
+    theirs.
+    """
+    if packed_storage_enabled():
+        AnswerSet.objects.create(
+            assignment_instance=instance,
+            student=student,
+            attempt=attempt,
+            answers={str(question.id): value for question, value in values.items()},
+        )
+        return
+
+    StudentAnswer.objects.bulk_create([
+        StudentAnswer(
+            student=student,
+            question=question,
+            assignment_instance=instance,
+            attempt=attempt,
+            text_answer=value if question.question_type == 'TEXT' else None,
+            selected_option=None if question.question_type == 'TEXT' else value,
+        )
+        for question, value in values.items()
+    ])
+
+
+# ---------------------------
+# Conversion
+# ---------------------------
+def pack_instance_rows(instance_ids):
+    """
+    Fold the StudentAnswer rows of ``instance_ids`` into one AnswerSet per
+    attempt and delete them. Attempts that already have a set are left
+    alone.
+    """
+    rows = StudentAnswer.objects.filter(assignment_instance_id__in=instance_ids).values_list(
+        'assignment_instance_id', 'attempt', 'student_id', 'question_id',
+        'selected_option', 'text_answer', 'submitted_at',
+    ).order_by('id')
+    already_packed = set(
+        AnswerSet.objects.filter(assignment_instance_id__in=instance_ids)
+        .values_list('assignment_instance_id', 'attempt')
+    )
+    packed = {}
+    for instance_id, attempt, student_id, question_id, selected, text, submitted_at in rows:
+        if (instance_id, attempt) in already_packed:
+            continue
+        entry = packed.setdefault((instance_id, attempt), {
+            'student_id': student_id, 'answers': {}, 'submitted_at': submitted_at,
+        })
+        entry['answers'][str(question_id)] = selected if selected is not None else text
+        entry['submitted_at'] = max(entry['submitted_at'], submitted_at)
+    if not packed:
+        return 0
+
+    sets = [
+        AnswerSet(
+            assignment_instance_id=instance_id,
+            student_id=entry['student_id'],
+            attempt=attempt,
+            answers=entry['answers'],
+        )
+        for (instance_id, attempt), entry in packed.items()
+    ]
+    with atomic_student_data():
+        AnswerSet.objects.bulk_create(sets)
+        # bulk_create stamps auto_now_add; keep the original submission time.
+        created = {
+            (s.assignment_instance_id, s.attempt): s.id
+            for s in AnswerSet.objects.filter(
+                assignment_instance_id__in={key[0] for key in packed}
+            ).only('id', 'assignment_instance_id', 'attempt')
+        }
+        for answer_set in sets:
+            key = (answer_set.assignment_instance_id, answer_set.attempt)
+            answer_set.id = created[key]
+            answer_set.submitted_at = packed[key]['submitted_at']
+        AnswerSet.objects.bulk_update(sets, ['submitted_at'], batch_size=500)
+        by_attempt = defaultdict(list)
+        for instance_id, attempt in packed:
+            by_attempt[attempt].append(instance_id)
+        for attempt, ids in by_attempt.items():
+            StudentAnswer.objects.filter(assignment_instance_id__in=ids, attempt=attempt).delete()
+    return len(packed)
+
+
+def pack_answers(batch_size=500):
+    """Convert every StudentAnswer row into AnswerSets. Returns the sets created."""
+    packed = 0
+    last_id = 0
+    while True:
+        instance_ids = list(
+            StudentAnswer.objects.filter(assignment_instance_id__gt=last_id)
+            .order_by('assignment_instance_id')
+            .values_list('assignment_instance_id', flat=True)
+            .distinct()[:batch_size]
+        )
+        if not instance_ids:
+            return packed
+        packed += pack_instance_rows(instance_ids)
+        last_id = instance_ids[-1]
@@ -1,5 +1,35 @@
-from django.apps import AppConfig
+from importlib import import_module
+
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_migrate
+from django.utils.module_loading import module_has_submodule
+
+
+# Apps whose admin module registers nothing and is only needed once its
+# pages are opened (see LazyImportExportAdmin).
+LAZY_ADMIN_APPS = {'import_export'}
+
+
+def discover_admin_modules():
+    """admin.autodiscover(), minus LAZY_ADMIN_APPS."""
+    for app_config in apps.get_app_configs():
+        if app_config.name in LAZY_ADMIN_APPS:
+            continue
+        if module_has_submodule(app_config.module, 'admin'):
+            import_module(f'{app_config.name}.admin')
 
 
 class NovaeAppConfig(AppConfig):
     name = 'novae_app'
+
+    def ready(self):
+        from . import conditional  # noqa: F401  (moves student data versions on)
+        from . import materials  # noqa: F401  (queues material previews)
+        from . import pagecache  # noqa: F401  (invalidates cached previews)
+        from . import profiling  # noqa: F401  (logs slow queries on every connection)
+        from . import stats  # noqa: F401  (connects the stats receivers)
+        from . import tasks  # noqa: F401  (registers the background tasks)
+        from . import tenancy  # noqa: F401  (attaches the shared database to school connections)
+        from .search import install_triggers
+        discover_admin_modules()
+        post_migrate.connect(install_triggers, sender=self)
@@ -0,0 +1,251 @@
+"""
+Cold storage for old StudentAnswer rows.
+
+Answers of completed instances older than the retention horizon are moved
+out of the database into gzip-compressed JSONL files on local disk, one
+directory per month of submission::
+
+    <ANSWER_ARCHIVE_DIR>/answers/2025/03/answers-20260105T020000123456.jsonl.gz
+    <ANSWER_ARCHIVE_DIR>/answers/manifest.jsonl
+
+Each line holds one instance's answers and is written as its own gzip
+member, so the files read normally with ``zcat`` while a single instance
+can be rehydrated by seeking straight to its member. AnswerArchiveEntry
+records where each member is.
+
+A month is archived in two phases. First its answers are streamed to a
+temporary file, which is fsynced and renamed into place, and a line is
+appended to the manifest. Then the archived rows are deleted in batched
+transactions, each also writing the AnswerArchiveEntry rows for its
+instances, so a row is only ever deleted together with its pointer. If a
+run is interrupted between the phases the leftover rows are archived
+again next time; rehydration ignores the unreferenced copy.
+"""
+import gzip
+import hashlib
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AnswerArchiveEntry, StudentAnswer
+from .tenancy import atomic_student_data
+
+
+ANSWER_FIELDS = (
+    'id', 'student_id', 'question_id', 'attempt', 'text_answer', 'selected_option', 'submitted_at',
+)
+DELETE_BATCH_SIZE = 500
+READ_CHUNK_SIZE = 2000
+
+
+@dataclass
+class ArchiveResult:
+    files: int = 0
+    instances: int = 0
+    answers: int = 0
+
+
+def archive_root():
+    return os.path.join(
+        getattr(settings, 'ANSWER_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')),
+        'answers',
+    )
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=getattr(settings, 'ANSWER_RETENTION_DAYS', 365))
+
+
+def archivable_answers(cutoff):
+    return StudentAnswer.objects.filter(
+        assignment_instance__completed=True,
+        submitted_at__lt=cutoff,
+    )
+
+
+def _months(first, cutoff):
+    """``(start, end)`` month windows from ``first``'s month up to ``cutoff``."""
+    start = first.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while start < cutoff:
+        end = (start + timedelta(days=32)).replace(day=1)
+        yield start, min(end, cutoff)
+        start = end
+
+
+def _instance_lines(answers):
+    """Yield ``(instance_id, [answer dicts])`` from answers ordered by instance."""
+    current, batch = None, []
+    rows = answers.order_by('assignment_instance_id', 'id').values_list(
+        'assignment_instance_id', *ANSWER_FIELDS
+    ).iterator(chunk_size=READ_CHUNK_SIZE)
+    for instance_id, *values in rows:
+        if instance_id != current and batch:
+            yield current, batch
+            batch = []
+        current = instance_id
+        answer = dict(zip(ANSWER_FIELDS, values))
+        answer['submitted_at'] = answer['submitted_at'].isoformat()
+        batch.append(answer)
+    if batch:
+        yield current, batch
+
+
+def _write_month(answers, relative_path):
+    """
+    Stream ``answers`` into a new archive file. Returns the member index
+    ``[(instance_id, offset, length, count)]`` and the manifest record.
+    """
+    path = os.path.join(archive_root(), relative_path)
+    if os.path.exists(path):
+        raise FileExistsError(f"refusing to overwrite archive file {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.part'
+    members = []
+    digest = hashlib.sha256()
+    offset = 0
+    with open(partial, 'wb') as archive:
+        for instance_id, instance_answers in _instance_lines(answers):
+            line = json.dumps(
+                {'instance': instance_id, 'answers': instance_answers},
+                separators=(',', ':'),
+            ) + '\n'
+            member = gzip.compress(line.encode('utf-8'), mtime=0)
+            archive.write(member)
+            digest.update(member)
+            members.append((instance_id, offset, len(member), len(instance_answers)))
+            offset += len(member)
+        archive.flush()
+        os.fsync(archive.fileno())
+    if not members:
+        os.remove(partial)
+        return [], None
+    os.replace(partial, path)
+    record = {
+        'file': relative_path,
+        'instances': len(members),
+        'answers': sum(count for *_, count in members),
+        'bytes': offset,
+        'sha256': digest.hexdigest(),
+        'created_at': timezone.now().isoformat(),
+    }
+    return members, record
+
+
+def _append_manifest(record):
+    with open(os.path.join(archive_root(), 'manifest.jsonl'), 'a', encoding='utf-8') as manifest:
+        manifest.write(json.dumps(record) + '\n')
+        manifest.flush()
+        os.fsync(manifest.fileno())
+
+
+def _delete_archived(answers, members, relative_path):
+    for start in range(0, len(members), DELETE_BATCH_SIZE):
+        batch = members[start:start + DELETE_BATCH_SIZE]
+        with atomic_student_data():
+            answers.filter(assignment_instance_id__in=[m[0] for m in batch]).delete()
+            AnswerArchiveEntry.objects.bulk_create([
+                AnswerArchiveEntry(
+                    assignment_instance_id=instance_id,
+                    path=relative_path,
+                    offset=offset,
+                    length=length,
+                    answer_count=count,
+                )
+                for instance_id, offset, length, count in batch
+            ])
+
+
+def archive_answers(cutoff=None, dry_run=False, progress=None):
+    """
+    Move answers of completed instances submitted before ``cutoff``
+    (default: ANSWER_RETENTION_DAYS ago) to cold storage.
+    """
+    cutoff = cutoff or default_cutoff()
+    answers = archivable_answers(cutoff)
+    result = ArchiveResult()
+    first = answers.aggregate(first=Min('submitted_at'))['first']
+    if first is None:
+        return result
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+
+    for month_start, month_end in _months(first, cutoff):
+        month_answers = answers.filter(submitted_at__gte=month_start, submitted_at__lt=month_end)
+        if not month_answers.exists():
+            continue
+        if dry_run:
+            result.answers += month_answers.count()
+            result.instances += month_answers.values('assignment_instance').distinct().count()
+            continue
+        relative_path = os.path.join(
+            f'{month_start:%Y}', f'{month_start:%m}', f'answers-{stamp}.jsonl.gz'
+        )
+        members, record = _write_month(month_answers, relative_path)
+        if not members:
+            continue
+        _append_manifest(record)
+        _delete_archived(month_answers, members, relative_path)
+        result.files += 1
+        result.instances += record['instances']
+        result.answers += record['answers']
+        if progress:
+            progress(relative_path, result)
+    return result
+
+
+# ---------------------------
+# Read path
+# ---------------------------
+def _read_member(entry):
+    with open(os.path.join(archive_root(), entry.path), 'rb') as archive:
+        archive.seek(entry.offset)
+        data = archive.read(entry.length)
+    return json.loads(gzip.decompress(data))
+
+
+def archived_answers_by_instance(instance_ids):
+    """
+    ``{instance id: [StudentAnswer, ...]}`` with the archived answers of
+    ``instance_ids`` (every attempt) as unsaved objects, read straight
+    from cold storage with one seek per archive entry. Instances with
+    nothing archived are left out.
+    """
+    entries = AnswerArchiveEntry.objects.filter(
+        assignment_instance_id__in=list(instance_ids)
+    ).order_by('id')
+    result = defaultdict(list)
+    for entry in entries:
+        for answer in _read_member(entry)['answers']:
+            answer['submitted_at'] = parse_datetime(answer['submitted_at'])
+            result[entry.assignment_instance_id].append(
+                StudentAnswer(assignment_instance_id=entry.assignment_instance_id, **answer)
+            )
+    return dict(result)
+
+
+def archived_answers(instance):
+    """The archived answers of ``instance`` (see archived_answers_by_instance)."""
+    return archived_answers_by_instance([instance.id]).get(instance.id, [])
+
+
+def rehydrate(instance):
+    """
+    Move ``instance``'s archived answers back into the StudentAnswer table.
+    The archive files are left alone. Returns the number of answers restored.
+    """
+    answers = archived_answers(instance)
+    submitted = [answer.submitted_at for answer in answers]
+    with atomic_student_data():
+        StudentAnswer.objects.bulk_create(answers, ignore_conflicts=True)
+        # bulk_create stamps auto_now_add fields; put the originals back.
+        for answer, submitted_at in zip(answers, submitted):
+            answer.submitted_at = submitted_at
+        StudentAnswer.objects.bulk_update(answers, ['submitted_at'], batch_size=500)
+        instance.archive_entries.all().delete()
+    return len(answers)
@@ -0,0 +1,176 @@
+"""
+Conditional GET for a student's own pages.
+
+Each student has a data version (``StudentProfile.data_version`` and
+``data_changed_at``). Signals move it on whenever something a student
+page shows changes: their assignment instances and answers, their
+billing entitlement, their grade or school, or the assignments
+provisioned for their grade. The current value is kept in the cache
+under the student's *user* id, so a request can be checked before the
+view runs and without loading the profile.
+
+``@student_conditional(view_name)`` turns user, version and change time
+into an ETag and Last-Modified header, together with the version of the
+shared catalog scope (novae_app.pagecache). Both come from a single
+``get_many``.
+When the browser already holds the current page it gets a 304 and the
+view's queries never run.
+
+Bulk writes skip the signals; code doing them calls ``bump_students``
+itself (see grading and provisioning).
+"""
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .models import (
+    AnswerSet,
+    AssignmentInstance,
+    BillingProfile,
+    StudentAnswer,
+    StudentProfile,
+)
+from .pagecache import CATALOG_SCOPE, scope_key, scope_version
+
+
+VERSION_TIMEOUT = 24 * 60 * 60
+
+
+def _key(user_id):
+    return f'student-data:{user_id}'
+
+
+def _cache_versions(student_filter):
+    rows = StudentProfile.objects.filter(**student_filter).values_list(
+        'user_id', 'data_version', 'data_changed_at'
+    )
+    return {_key(user_id): (version, changed_at) for user_id, version, changed_at in rows}
+
+
+def bump_students(student_ids, using=None):
+    """
+    Move the data version of ``student_ids`` (StudentProfile ids) on, once
+    the current transaction on ``using`` commits.
+    """
+    ids = set(student_ids) - {None}
+    if not ids:
+        return
+
+    def apply():
+        StudentProfile.objects.filter(id__in=ids).update(
+            data_version=F('data_version') + 1,
+            data_changed_at=timezone.now(),
+        )
+        cache.set_many(_cache_versions({'id__in': ids}), VERSION_TIMEOUT)
+
+    transaction.on_commit(apply, using=using)
+
+
+def _load_version(user_id):
+    key = _key(user_id)
+    value = _cache_versions({'user_id': user_id}).get(key)
+    if value is not None:
+        # add, not set: never overwrite a newer value stored by bump_students.
+        cache.add(key, value, VERSION_TIMEOUT)
+    return value
+
+
+def data_version(user_id):
+    """``(version, changed_at)`` of the student with user ``user_id``, or None."""
+    return cache.get(_key(user_id)) or _load_version(user_id)
+
+
+def student_conditional(view_name):
+    """
+    Answer GET/HEAD requests for a student's page with 304 while neither
+    their data nor the catalog changed. Put it under ``@login_required``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key = _key(request.user.pk)
+            catalog_key = scope_key(CATALOG_SCOPE)
+            cached = cache.get_many([key, catalog_key])
+            student = cached.get(key) or _load_version(request.user.pk)
+            if student is None:  # not a student
+                return view(request, *args, **kwargs)
+            catalog = cached.get(catalog_key)
+            if catalog is None:
+                catalog = scope_version(CATALOG_SCOPE)
+
+            version, changed_at = student
+            # The user is part of the tag: siblings share browsers.
+            etag = quote_etag(f'{view_name}-{request.user.pk}-{version}-{catalog}')
+            last_modified = int(max(
+                changed_at or datetime.fromtimestamp(0, dt_timezone.utc),
+                datetime.fromtimestamp(catalog / 1e9, dt_timezone.utc),
+            ).timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+# ---------------------------
+# Signals
+# ---------------------------
+# Profile fields that decide what a student's pages list (grade-range
+# catalog filters, the school's catalog).
+PROFILE_SCOPE_FIELDS = ('grade', 'grade_ordinal', 'school_id')
+
+
+def _profile_scope(profile):
+    return {name: profile.__dict__[name] for name in PROFILE_SCOPE_FIELDS if name in profile.__dict__}
+
+
+# Submitting an attempt saves its instance, which covers the attempt and
+# the bulk-inserted answers. No post_delete on answers: it would turn the
+# archive's batched deletes into row-by-row ones.
+@receiver([post_save, post_delete], sender=AssignmentInstance)
+@receiver(post_save, sender=StudentAnswer)
+@receiver(post_save, sender=AnswerSet)
+def student_data_changed(sender, instance, **kwargs):
+    bump_students([instance.student_id], using=instance._state.db)
+
+
+@receiver(post_init, sender=StudentProfile)
+def remember_profile_scope(sender, instance, **kwargs):
+    instance._loaded_scope = _profile_scope(instance)
+
+
+@receiver(post_save, sender=StudentProfile)
+def profile_scope_changed(sender, instance, created, **kwargs):
+    before, after = instance._loaded_scope, _profile_scope(instance)
+    instance._loaded_scope = after
+    if created:
+        return
+    # A field that was deferred when the profile was loaded may have changed.
+    if any(name not in before or before[name] != value for name, value in after.items()):
+        bump_students([instance.id], using=instance._state.db)
+
+
+@receiver(post_save, sender=BillingProfile)
+def entitlement_changed(sender, instance, **kwargs):
+    bump_students(
+        StudentProfile.objects.filter(user_id=instance.user_id).values_list('id', flat=True),
+        using=instance._state.db,
+    )
@@ -0,0 +1,198 @@
+"""
+Weekly progress digest emailed to parents.
+
+Parents are walked in primary-key batches, so memory stays bounded by the
+batch size however many families there are. Each batch costs a fixed
+number of queries per school: the parents, their children, and, for the
+children of each school, one grouped aggregate over the week's completed
+assignments and one over study sessions, read from that school's
+database (TENANT_DATABASES). The batch's messages go out over a single email connection and a
+ParentDigest row is recorded for each, so re-running the command for the
+same week only emails the parents that were not reached yet.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Avg, Count, Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import AssignmentInstance, ParentDigest, ParentProfile, School, StudySession
+from .tenancy import use_school
+
+
+DEFAULT_BATCH_SIZE = 500
+SUBJECT = "NovaeClass weekly progress: {start:%b %d} - {end:%b %d}"
+
+
+@dataclass
+class DigestResult:
+    sent: int = 0
+    skipped: int = 0
+
+
+def last_week_start(today=None):
+    """Monday of the last full week before ``today``."""
+    today = today or timezone.localdate()
+    return today - timedelta(days=today.weekday() + 7)
+
+
+def _period_bounds(period_start):
+    start = timezone.make_aware(datetime.combine(period_start, time.min))
+    return start, start + timedelta(days=7)
+
+
+def _pending_parents(period_start, schools=None):
+    already_sent = ParentDigest.objects.filter(
+        parent=OuterRef('pk'), period_start=period_start
+    )
+    parents = (
+        ParentProfile.objects.exclude(user__email='')
+        .exclude(user__email__isnull=True)
+        .filter(~Exists(already_sent))
+        .order_by('id')
+    )
+    if schools is not None:
+        parents = parents.filter(school__in=schools)
+    return parents
+
+
+def _parent_batches(period_start, batch_size, schools=None):
+    last_id = 0
+    while True:
+        batch = list(
+            _pending_parents(period_start, schools)
+            .filter(id__gt=last_id)
+            .values_list('id', 'user__username', 'user__email')[:batch_size]
+        )
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def _children_by_parent(parent_ids):
+    Link = ParentProfile.children.through
+    rows = Link.objects.filter(parentprofile_id__in=parent_ids).values_list(
+        'parentprofile_id',
+        'studentprofile_id',
+        'studentprofile__user_id',
+        'studentprofile__user__username',
+        'studentprofile__grade',
+        'studentprofile__school_id',
+    ).order_by('parentprofile_id', 'studentprofile__user__username')
+    children = defaultdict(list)
+    for parent_id, student_id, user_id, username, grade, school_id in rows:
+        children[parent_id].append({
+            'student_id': student_id,
+            'user_id': user_id,
+            'username': username,
+            'grade': grade,
+            'school_id': school_id,
+        })
+    return children
+
+
+def _weekly_figures(children, start, end):
+    """
+    Attach completed count, average score and study time to each child,
+    reading each school's children from that school's database.
+    """
+    by_school = defaultdict(list)
+    for child in children:
+        by_school[child['school_id']].append(child)
+    schools = School.objects.in_bulk([school_id for school_id in by_school if school_id])
+    for school_id, school_children in by_school.items():
+        with use_school(schools.get(school_id)):
+            _school_figures(school_children, start, end)
+
+
+def _school_figures(children, start, end):
+    student_ids = [child['student_id'] for child in children]
+    user_ids = [child['user_id'] for child in children]
+
+    grades = {
+        row['student']: row
+        for row in AssignmentInstance.objects.filter(
+            student_id__in=student_ids,
+            completed_at__gte=start,
+            completed_at__lt=end,
+        ).values('student').annotate(
+            completed_count=Count('id'),
+            average_score=Avg('score'),
+        ).order_by()
+    }
+    study = {
+        row['student']: row['total_time']
+        for row in StudySession.objects.filter(
+            student_id__in=user_ids,
+            login_time__gte=start,
+            login_time__lt=end,
+        ).totals_by_student()
+    }
+    for child in children:
+        row = grades.get(child['student_id'], {})
+        child['completed_count'] = row.get('completed_count', 0)
+        child['average_score'] = row.get('average_score')
+        child['study_time'] = study.get(child['user_id']) or timedelta()
+
+
+def _build_message(username, email, children, period_start, period_end):
+    context = {
+        'username': username,
+        'children': children,
+        'period_start': period_start,
+        'period_end': period_end,
+    }
+    return EmailMessage(
+        subject=SUBJECT.format(start=period_start, end=period_end),
+        body=render_to_string('novae_app/email/parent_digest.txt', context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+    )
+
+
+def send_parent_digests(period_start=None, batch_size=DEFAULT_BATCH_SIZE, progress=None,
+                        schools=None):
+    """
+    Email every parent (or only those of ``schools``) the digest for the
+    week starting ``period_start`` (default: last full week). Returns a
+    DigestResult.
+    """
+    period_start = period_start or last_week_start()
+    period_end = period_start + timedelta(days=6)
+    start, end = _period_bounds(period_start)
+    result = DigestResult()
+
+    connection = get_connection()
+    for batch in _parent_batches(period_start, batch_size, schools):
+        children_by_parent = _children_by_parent([parent_id for parent_id, _, _ in batch])
+        _weekly_figures(
+            [child for children in children_by_parent.values() for child in children],
+            start,
+            end,
+        )
+
+        messages, parent_ids = [], []
+        for parent_id, username, email in batch:
+            children = children_by_parent.get(parent_id)
+            if not children:
+                result.skipped += 1
+                continue
+            messages.append(_build_message(username, email, children, period_start, period_end))
+            parent_ids.append(parent_id)
+
+        if messages:
+            connection.send_messages(messages)
+            ParentDigest.objects.bulk_create(
+                [ParentDigest(parent_id=parent_id, period_start=period_start)
+                 for parent_id in parent_ids],
+                ignore_conflicts=True,
+            )
+            result.sent += len(messages)
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,74 @@
+"""
+DOCX exports of assignments, rendered by a background worker.
+
+Each file is named after a hash of the content it shows, under
+``MEDIA_ROOT/exports``, so an unchanged assignment is rendered once and
+served from disk afterwards, and an edited one simply gets a new file.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+EXPORT_DIR = 'exports'
+
+
+def _export_path(kind, object_id, *content):
+    digest = hashlib.sha256(
+        '\x1f'.join(str(part) for part in content).encode('utf-8')
+    ).hexdigest()[:16]
+    return os.path.join(settings.MEDIA_ROOT, EXPORT_DIR, kind, f'{object_id}-{digest}.docx')
+
+
+def assignment_docx_path(assignment):
+    return _export_path(
+        'assignments', assignment.id,
+        assignment.title, assignment.due_date, assignment.description,
+    )
+
+
+def graded_docx_path(instance):
+    assignment = instance.assignment
+    return _export_path(
+        'graded', instance.id,
+        assignment.title, assignment.due_date, assignment.description,
+        instance.score, instance.feedback,
+    )
+
+
+def _save(doc, path):
+    # Write then rename, so a half-written file is never served.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.{os.getpid()}.part'
+    doc.save(partial)
+    os.replace(partial, path)
+
+
+def write_assignment_docx(assignment):
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(assignment.title, level=1)
+    doc.add_paragraph(f"Due Date: {assignment.due_date}")
+    doc.add_paragraph(assignment.description or "No description provided.")
+    path = assignment_docx_path(assignment)
+    _save(doc, path)
+    return path
+
+
+def write_graded_docx(instance):
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(f"{instance.assignment.title} - Graded Review", level=1)
+    doc.add_paragraph(f"Due Date: {instance.assignment.due_date}")
+    doc.add_paragraph(f"Score: {instance.score or 'Not graded yet'}")
+    doc.add_paragraph("Description:")
+    doc.add_paragraph(instance.assignment.description or "No description provided.")
+    doc.add_paragraph("Feedback:")
+    doc.add_paragraph(instance.feedback or "No feedback provided.")
+    path = graded_docx_path(instance)
+    _save(doc, path)
+    return path
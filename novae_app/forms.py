@@ -1,4 +1,6 @@
 from django import forms
+from django.forms import formset_factory
+
 from .models import StudyPlan
 
 
@@ -35,13 +37,6 @@ class StudyPlanForm(forms.ModelForm):
             }),
         }
 
-from django import forms
-from django.forms import formset_factory
-from novae_app.models import User, StudentProfile, ParentProfile
-
-from django import forms
-from django.forms import formset_factory
-
 # Explicit list of grades for full dropdown
 GRADES = [
     ('K', 'K'),
@@ -59,42 +54,73 @@ GRADES = [
     ('12th', '12th'),
 ]
 
+
+class ParentSignUpForm(forms.Form):
+    """Form for parent signup."""
+    username = forms.CharField(
+        max_length=150,
+        label="Username",
+        widget=forms.TextInput(attrs={'placeholder': 'Username'})
+    )
+    email = forms.EmailField(
+        label="Email",
+        widget=forms.EmailInput(attrs={'placeholder': 'Email'})
+    )
+    password = forms.CharField(
+        label="Password",
+        widget=forms.PasswordInput(attrs={'placeholder': 'Password'})
+    )
+
+
 class ChildForm(forms.Form):
-    username = forms.CharField(label="Child's Name")
+    """Form for adding a child account."""
+    username = forms.CharField(
+        max_length=150,
+        label="Child Username",
+        widget=forms.TextInput(attrs={'placeholder': 'Child Username'})
+    )
     grade = forms.ChoiceField(
         choices=GRADES,
-        label="Grade",
-        widget=forms.Select(attrs={'class': 'form-control'})
+        label="Grade"
     )
-    password = forms.CharField(widget=forms.PasswordInput)
+    password = forms.CharField(
+        label="Password",
+        widget=forms.PasswordInput(attrs={'placeholder': 'Password'})
+    )
+
 
-# Formset for multiple children
+# Formset to allow adding multiple children
 ChildFormSet = formset_factory(ChildForm, extra=1)
 
-from django import forms
 
-class AssignmentSubmissionForm(forms.Form):
-    def __init__(self, questions, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        for question in questions:
-            if question.is_text_answer:
-                # Text answer field
-                self.fields[f'q_{question.id}'] = forms.CharField(
-                    label=question.question_text,
-                    widget=forms.Textarea(attrs={'rows': 4, 'placeholder': 'Type your answer here...'}),
-                    required=True
-                )
-            else:
-                # Multiple choice
-                choices = [
-                    ('A', question.option_a),
-                    ('B', question.option_b),
-                    ('C', question.option_c),
-                    ('D', question.option_d),
-                ]
-                self.fields[f'q_{question.id}'] = forms.ChoiceField(
-                    label=question.question_text,
-                    choices=choices,
-                    widget=forms.RadioSelect,
-                    required=True
-                )
+class GradebookExportForm(forms.Form):
+    format = forms.ChoiceField(
+        choices=[('csv', 'CSV'), ('xlsx', 'Excel (XLSX)')],
+        initial='csv'
+    )
+    grade = forms.ChoiceField(
+        choices=[('', 'All grades')] + GRADES,
+        required=False
+    )
+    start = forms.DateField(
+        label="Completed from",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    end = forms.DateField(
+        label="Completed until",
+        required=False,
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError("The start date must not be after the end date.")
+        return cleaned_data
+
+
+class DailyQuizAnswerForm(forms.Form):
+    """The question a daily quiz answer is for; bounded to what SQLite stores."""
+    question_id = forms.IntegerField(min_value=1, max_value=2 ** 63 - 1)
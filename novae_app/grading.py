@@ -0,0 +1,274 @@
+"""
+Scoring helpers shared by submission and regrading.
+
+A submitted answer is correct when its multiple-choice letter matches
+``Question.correct_option`` or, for TEXT questions, when the text answer
+equals the key ignoring case. ``correct_answer_q`` expresses that rule as a
+database condition so whole assignments can be rescored in SQL.
+"""
+from collections import defaultdict, namedtuple
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, F, Q, TextField, Value
+from django.db.models.functions import Coalesce, Lower
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+from .answers import save_answers
+from .archive import archived_answers_by_instance
+from .conditional import bump_students
+from .models import AnswerSet, AssignmentAttempt, AssignmentInstance, Question, StudentAnswer
+from .stats import apply_score_changes
+from .tenancy import atomic_student_data, use_school
+
+
+ScoreChange = namedtuple(
+    'ScoreChange', ['instance_id', 'assignment_id', 'old_score', 'new_score']
+)
+
+REGRADE_REPORT_HEADER = ['school', 'instance_id', 'assignment_id', 'old_score', 'new_score']
+
+TWO_PLACES = Decimal('0.01')
+
+
+def compute_score(correct, total):
+    """Percentage score with the precision of AssignmentInstance.score."""
+    if not total:
+        return Decimal('0.00')
+    return (Decimal(correct) * 100 / Decimal(total)).quantize(
+        TWO_PLACES, rounding=ROUND_HALF_UP
+    )
+
+
+def answer_is_correct(question_type, correct_option, selected_option, text_answer):
+    """The rule of ``correct_answer_q`` for an answer already in memory."""
+    if question_type == 'TEXT':
+        return (text_answer or '').lower() == (correct_option or '').lower()
+    return selected_option is not None and selected_option == correct_option
+
+
+def correct_answer_q(prefix=''):
+    """
+    Condition matching correct StudentAnswer rows. ``prefix`` is the path
+    from the queried model to StudentAnswer, e.g. ``'answers__'``.
+    """
+    question = f'{prefix}question__'
+    return (
+        Q(**{f'{question}question_type': 'TEXT'})
+        & Exact(
+            Lower(Coalesce(f'{prefix}text_answer', Value(''), output_field=TextField())),
+            Lower(Coalesce(f'{question}correct_option', Value(''), output_field=TextField())),
+        )
+    ) | (
+        ~Q(**{f'{question}question_type': 'TEXT'})
+        & Q(**{f'{prefix}selected_option': F(f'{question}correct_option')})
+    )
+
+
+def submit_attempt(instance, student, values):
+    """
+    Grade and record a submission. ``values`` maps Question to the value
+    given. Appends an AssignmentAttempt and the attempt's answers, and
+    updates the instance's score, latest/best score and attempt count in
+    the same transaction. Returns the AssignmentAttempt.
+    """
+    correct = sum(
+        answer_is_correct(
+            question.question_type,
+            question.correct_option,
+            None if question.question_type == 'TEXT' else value,
+            value if question.question_type == 'TEXT' else None,
+        )
+        for question, value in values.items()
+    )
+    score = compute_score(correct, len(values))
+
+    with atomic_student_data():
+        # Lock the instance so two concurrent submissions get distinct numbers.
+        current = AssignmentInstance.objects.select_for_update().only(
+            'attempt_count', 'best_score'
+        ).get(id=instance.id)
+        number = current.attempt_count + 1
+        attempt = AssignmentAttempt.objects.create(
+            instance=instance,
+            number=number,
+            score=score,
+            correct_count=correct,
+            question_count=len(values),
+        )
+        save_answers(instance, student, values, attempt=number)
+
+        instance.score = instance.latest_score = score
+        instance.best_score = max(score, current.best_score) if current.best_score is not None else score
+        instance.attempt_count = number
+        instance.completed = True
+        instance.completed_at = timezone.now()
+        instance.save(update_fields=[
+            'score', 'latest_score', 'best_score', 'attempt_count', 'completed', 'completed_at',
+        ])
+    return attempt
+
+
+def _answer_keys(assignment_ids):
+    return {
+        question_id: (question_type, correct_option)
+        for question_id, question_type, correct_option in Question.objects.filter(
+            assignment_id__in=assignment_ids
+        ).values_list('id', 'question_type', 'correct_option')
+    }
+
+
+def _packed_correct(keys, answers):
+    correct = 0
+    for question_id, value in answers.items():
+        key = keys.get(int(question_id))
+        if key is None:
+            continue
+        question_type, correct_option = key
+        text = question_type == 'TEXT'
+        correct += answer_is_correct(
+            question_type, correct_option, None if text else value, value if text else None
+        )
+    return correct
+
+
+def attempt_correct_counts(assignment_ids):
+    """
+    Correct answers per ``(instance id, attempt number)`` for every attempt
+    at ``assignment_ids`` that has answers on record: StudentAnswer rows
+    (one grouped query), archived answers and packed AnswerSets, which
+    SQL cannot look inside portably. Attempts without answers are left out.
+    """
+    counts = defaultdict(int)
+    rows = (
+        StudentAnswer.objects.filter(assignment_instance__assignment_id__in=assignment_ids)
+        .values('assignment_instance_id', 'attempt')
+        .annotate(correct=Count('id', filter=correct_answer_q()))
+        .values_list('assignment_instance_id', 'attempt', 'correct')
+        .order_by()
+    )
+    for instance_id, attempt, correct in rows.iterator():
+        counts[instance_id, attempt] += correct
+
+    keys = _answer_keys(assignment_ids)
+    archived = AssignmentInstance.objects.filter(
+        assignment_id__in=assignment_ids, archive_entries__isnull=False,
+    ).values_list('id', flat=True).distinct()
+    for instance_id, answers in archived_answers_by_instance(archived).items():
+        for answer in answers:
+            counts[instance_id, answer.attempt] += (
+                answer.question_id in keys
+                and answer_is_correct(
+                    *keys[answer.question_id], answer.selected_option, answer.text_answer
+                )
+            )
+
+    sets = AnswerSet.objects.filter(
+        assignment_instance__assignment_id__in=assignment_ids,
+    ).values_list('assignment_instance_id', 'attempt', 'answers')
+    for instance_id, attempt, answers in sets.iterator():
+        counts[instance_id, attempt] = _packed_correct(keys, answers)
+    return dict(counts)
+
+
+def regrade_assignments(assignment_ids, dry_run=False, batch_size=1000):
+    """
+    Recompute the score of every graded instance of ``assignment_ids``.
+
+    Every attempt is rescored against the current answer key: the attempt
+    history is corrected in place, and each instance's score and latest
+    score follow its current attempt while its best score is the best of
+    the rescored attempts. An earlier attempt whose answers are no longer
+    on record keeps its score. Only rows that actually changed are written
+    back with ``bulk_update``. Returns the ScoreChange rows of instances
+    whose score changed.
+    """
+    assignment_ids = list(assignment_ids)
+    totals = dict(
+        Question.objects.filter(assignment_id__in=assignment_ids)
+        .values('assignment_id')
+        .annotate(total=Count('id'))
+        .values_list('assignment_id', 'total')
+    )
+    counts = attempt_correct_counts(assignment_ids)
+
+    def rescore(instance_id, number, assignment_id):
+        correct = counts.get((instance_id, number), 0)
+        return correct, compute_score(correct, totals.get(assignment_id, 0))
+
+    attempts, best = [], {}
+    rows = AssignmentAttempt.objects.filter(
+        instance__assignment_id__in=assignment_ids,
+        instance__completed=True,
+        instance__score__isnull=False,
+    ).values_list(
+        'id', 'instance_id', 'number', 'score', 'correct_count',
+        'instance__assignment_id', 'instance__attempt_count',
+    ).order_by('id')
+    for attempt_id, instance_id, number, score, correct_count, assignment_id, current in (
+        rows.iterator(chunk_size=batch_size)
+    ):
+        if number > current:
+            continue
+        if number == current or (instance_id, number) in counts:
+            correct, new_score = rescore(instance_id, number, assignment_id)
+            if (correct, new_score) != (correct_count, score):
+                attempts.append(AssignmentAttempt(id=attempt_id, score=new_score, correct_count=correct))
+                score = new_score
+        best[instance_id] = max(score, best.get(instance_id, score))
+
+    changes, instances = [], []
+    rows = AssignmentInstance.objects.filter(
+        assignment_id__in=assignment_ids,
+        completed=True,
+        score__isnull=False,
+    ).values_list('id', 'assignment_id', 'score', 'best_score', 'attempt_count').order_by('id')
+    for instance_id, assignment_id, old_score, old_best, current in rows.iterator(chunk_size=batch_size):
+        new_score = rescore(instance_id, current, assignment_id)[1]
+        new_best = max(new_score, best.get(instance_id, new_score))
+        if new_score != old_score:
+            changes.append(ScoreChange(instance_id, assignment_id, old_score, new_score))
+        if new_score != old_score or new_best != old_best:
+            instances.append(AssignmentInstance(
+                id=instance_id, score=new_score, latest_score=new_score, best_score=new_best,
+            ))
+
+    if (attempts or instances) and not dry_run:
+        with atomic_student_data():
+            AssignmentAttempt.objects.bulk_update(
+                attempts, ['score', 'correct_count'], batch_size=batch_size
+            )
+            AssignmentInstance.objects.bulk_update(
+                instances, ['score', 'latest_score', 'best_score'], batch_size=batch_size
+            )
+            apply_score_changes(
+                (change.assignment_id, change.old_score, change.new_score)
+                for change in changes
+            )
+            bump_students(AssignmentInstance.objects.filter(
+                id__in=[instance.id for instance in instances]
+            ).values_list('student_id', flat=True).distinct())
+    return changes
+
+
+def regrade_schools(assignment_ids, schools, dry_run=False):
+    """
+    ``regrade_assignments`` in the database of each of ``schools`` (see
+    tenancy.maintenance_schools). Returns (school, ScoreChange) pairs.
+    """
+    assignment_ids = list(assignment_ids)
+    changes = []
+    for school in schools:
+        with use_school(school):
+            changes += [
+                (school, change)
+                for change in regrade_assignments(assignment_ids, dry_run=dry_run)
+            ]
+    return changes
+
+
+def regrade_report_rows(changes):
+    """CSV rows, header first, for (school, ScoreChange) pairs."""
+    yield REGRADE_REPORT_HEADER
+    for school, change in changes:
+        yield [school.slug if school else '', *change]
@@ -0,0 +1,199 @@
+"""
+Bulk import of assignments together with their questions.
+
+The input is JSON Lines: one assignment per line, questions nested under a
+``questions`` key::
+
+    {"title": "Fractions 1", "due_date": "2026-03-01", "grade_level": "3rd",
+     "is_demo": false, "questions": [
+        {"question_text": "1/2 + 1/4?", "question_type": "MC",
+         "is_text_answer": false, "option_a": "3/4", "option_b": "2/6",
+         "correct_option": "A"}]}
+
+Lines are read lazily and validated a chunk at a time. Each valid chunk is
+written with two ``bulk_create`` calls inside its own transaction, so a bad
+line only costs that line and a failure never leaves half a chunk behind.
+"""
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Assignment, Course, Question, get_free_trial_course
+
+
+ASSIGNMENT_FIELDS = (
+    'title',
+    'description',
+    'due_date',
+    'grade_level',
+    'min_grade',
+    'max_grade',
+    'is_demo',
+    'is_sample',
+)
+QUESTION_FIELDS = (
+    'question_text',
+    'question_type',
+    'is_text_answer',
+    'option_a',
+    'option_b',
+    'option_c',
+    'option_d',
+    'correct_option',
+)
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+@dataclass
+class ImportResult:
+    assignments: int = 0
+    questions: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line_number, message):
+        self.errors.append((line_number, message))
+
+
+# Largest id a bigint primary key can hold; anything above is not a row.
+MAX_ID = 2 ** 63 - 1
+
+
+def _course_id(value):
+    """A course id given as a JSON number or string, as an int."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValidationError(f"invalid course_id {value!r}")
+    try:
+        course_id = int(value)
+    except ValueError:
+        raise ValidationError(f"invalid course_id {value!r}")
+    if not 0 < course_id <= MAX_ID:
+        raise ValidationError(f"unknown course_id {course_id}")
+    return course_id
+
+
+def _parse_line(line):
+    """
+    Turn one JSON line into an unsaved Assignment and its unsaved Questions.
+    Raises ValidationError with a readable message on bad input.
+    """
+    try:
+        data = json.loads(line)
+    except ValueError as exc:
+        raise ValidationError(f"invalid JSON ({exc})")
+    if not isinstance(data, dict):
+        raise ValidationError("expected a JSON object")
+
+    assignment = Assignment(**{
+        name: data[name] for name in ASSIGNMENT_FIELDS if name in data
+    })
+    if data.get('course_id'):
+        assignment.course_id = _course_id(data['course_id'])
+    assignment.sync_grade_range()
+    assignment.full_clean(exclude=['course'])
+
+    questions = []
+    raw_questions = data.get('questions') or []
+    if not isinstance(raw_questions, list):
+        raise ValidationError("'questions' must be a list")
+    for index, raw in enumerate(raw_questions, start=1):
+        if not isinstance(raw, dict):
+            raise ValidationError(f"question {index}: expected a JSON object")
+        question = Question(**{
+            name: raw[name] for name in QUESTION_FIELDS if name in raw
+        })
+        try:
+            question.full_clean(exclude=['assignment'])
+        except ValidationError as exc:
+            raise ValidationError(f"question {index}: {'; '.join(exc.messages)}")
+        questions.append(question)
+
+    return assignment, questions
+
+
+def _read_chunks(lines, chunk_size):
+    numbered = (
+        (number, line)
+        for number, line in enumerate(lines, start=1)
+        if line.strip()
+    )
+    while True:
+        chunk = list(islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_assignments(lines, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Import assignments with nested questions from an iterable of JSON lines.
+
+    ``progress`` is called after every committed chunk as
+    ``progress(result)``. Returns an ImportResult with the number of rows
+    created and a list of ``(line_number, message)`` errors for the lines
+    that were skipped.
+    """
+    result = ImportResult()
+    free_trial_course = None
+    free_trial_resolved = False
+
+    for chunk in _read_chunks(lines, chunk_size):
+        parsed = []
+        parsed_lines = []
+        for line_number, line in chunk:
+            try:
+                parsed.append(_parse_line(line))
+                parsed_lines.append(line_number)
+            except ValidationError as exc:
+                result.add_error(line_number, '; '.join(exc.messages))
+
+        # Check referenced courses with one query per chunk rather than
+        # letting a dangling id fail the whole chunk at commit time.
+        course_ids = {a.course_id for a, _ in parsed if a.course_id}
+        if course_ids:
+            known = set(
+                Course.objects.filter(id__in=course_ids).values_list('id', flat=True)
+            )
+            valid = []
+            for (assignment, questions), line_number in zip(parsed, parsed_lines):
+                if assignment.course_id and assignment.course_id not in known:
+                    result.add_error(
+                        line_number, f"unknown course_id {assignment.course_id}"
+                    )
+                else:
+                    valid.append((assignment, questions))
+            parsed = valid
+
+        if not parsed:
+            continue
+
+        # Resolve the Free Trial course once per import, and only if needed.
+        if not free_trial_resolved and any(
+            a.is_demo or a.is_sample for a, _ in parsed
+        ):
+            free_trial_course = get_free_trial_course()
+            free_trial_resolved = True
+        for assignment, _ in parsed:
+            if assignment.is_demo or assignment.is_sample:
+                assignment.course = free_trial_course
+
+        with transaction.atomic():
+            assignments = Assignment.objects.bulk_create(
+                [assignment for assignment, _ in parsed]
+            )
+            questions = []
+            for assignment, (_, assignment_questions) in zip(assignments, parsed):
+                for question in assignment_questions:
+                    question.assignment = assignment
+                    questions.append(question)
+            Question.objects.bulk_create(questions)
+
+        result.assignments += len(assignments)
+        result.questions += len(questions)
+        if progress is not None:
+            progress(result)
+
+    return result
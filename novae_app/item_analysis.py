@@ -0,0 +1,231 @@
+"""
+Classical item analysis over StudentAnswer.
+
+For each assignment the answers are streamed in chunks of plain integers
+(instance, question, chosen option, correct flag) with correctness decided
+in SQL by the same rule used for grading, packed into NumPy arrays, and
+turned into an instances x questions response matrix. All statistics are
+then computed column-wise without Python loops:
+
+* difficulty (p-value): share of responses that were correct;
+* discrimination: corrected point-biserial correlation between the item
+  and the rest score (total score without that item);
+* distractor counts for options A-D.
+
+Only each instance's current attempt counts. Submissions stored as packed
+AnswerSets and answers moved to the cold-storage archive are turned into
+the same rows. Questions are shared while instances may live in school
+databases (TENANT_DATABASES), so every database is read, each under
+``use_school()``, and the statistics cover all schools.
+"""
+from itertools import islice
+
+import numpy as np
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .answers import latest_answer_sets
+from .archive import archived_answers_by_instance
+from .grading import answer_is_correct, correct_answer_q
+from .models import AssignmentInstance, Question, QuestionStats, StudentAnswer
+from .tenancy import maintenance_schools, use_school
+
+
+OPTION_CODES = {'A': 0, 'B': 1, 'C': 2, 'D': 3}
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def _answer_rows(assignment_id, chunk_size):
+    """Yield int64 arrays of shape (n, 4), one per chunk."""
+    option_code = Case(
+        *[When(selected_option=letter, then=Value(code)) for letter, code in OPTION_CODES.items()],
+        default=Value(-1),
+        output_field=IntegerField(),
+    )
+    is_correct = Case(
+        When(correct_answer_q(), then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows = (
+        StudentAnswer.objects.filter(
+            assignment_instance__assignment_id=assignment_id,
+            attempt=F('assignment_instance__attempt_count'),
+        )
+        .annotate(option_code=option_code, is_correct=is_correct)
+        .values_list('assignment_instance_id', 'question_id', 'option_code', 'is_correct')
+        .order_by()
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield np.array(chunk, dtype=np.int64)
+
+
+def _answer_keys(assignment_id):
+    return {
+        question_id: (question_type, correct_option)
+        for question_id, question_type, correct_option in Question.objects.filter(
+            assignment_id=assignment_id
+        ).values_list('id', 'question_type', 'correct_option')
+    }
+
+
+def _row(instance_id, question_id, key, selected_option, text_answer):
+    question_type, correct_option = key
+    return (
+        instance_id,
+        question_id,
+        OPTION_CODES.get(selected_option, -1),
+        int(answer_is_correct(question_type, correct_option, selected_option, text_answer)),
+    )
+
+
+def _packed_answer_rows(assignment_id, keys):
+    """The same rows for submissions stored as AnswerSets."""
+    latest = latest_answer_sets(
+        AssignmentInstance.objects.filter(assignment_id=assignment_id, answer_sets__isnull=False)
+        .values('id')
+    )
+    rows = []
+    for instance_id, answer_set in latest.items():
+        for question_id, value in answer_set.answers.items():
+            key = keys.get(int(question_id))
+            if key is None:
+                continue
+            text = key[0] == 'TEXT'
+            rows.append(_row(
+                instance_id, int(question_id), key, None if text else value, value if text else None
+            ))
+    if rows:
+        yield np.array(rows, dtype=np.int64)
+
+
+def _archived_answer_rows(assignment_id, keys):
+    """The same rows for answers moved to the archive."""
+    attempts = dict(
+        AssignmentInstance.objects.filter(
+            assignment_id=assignment_id, archive_entries__isnull=False
+        ).values_list('id', 'attempt_count').distinct()
+    )
+    rows = [
+        _row(instance_id, answer.question_id, keys[answer.question_id],
+             answer.selected_option, answer.text_answer)
+        for instance_id, answers in archived_answers_by_instance(attempts).items()
+        for answer in answers
+        if answer.attempt == attempts[instance_id] and answer.question_id in keys
+    ]
+    if rows:
+        yield np.array(rows, dtype=np.int64)
+
+
+def _school_rows(assignment_id, chunk_size):
+    """All answer rows of ``assignment_id`` in the current school's database."""
+    keys = _answer_keys(assignment_id)
+    chunks = [
+        *_answer_rows(assignment_id, chunk_size),
+        *_archived_answer_rows(assignment_id, keys),
+        *_packed_answer_rows(assignment_id, keys),
+    ]
+    return np.concatenate(chunks) if chunks else None
+
+
+def analyze_assignment(assignment_id, chunk_size=DEFAULT_CHUNK_SIZE, schools=None):
+    """
+    Compute item statistics for one assignment over the answers in every
+    database (or those of ``schools``, see maintenance_schools). Returns a
+    list of unsaved QuestionStats (empty if nobody answered).
+    """
+    chunks = []
+    for school in maintenance_schools() if schools is None else schools:
+        with use_school(school):
+            data = _school_rows(assignment_id, chunk_size)
+        if data is not None:
+            # Instance ids are only unique within one database: renumber
+            # them past the instances already collected.
+            offset = chunks[-1][:, 0].max() + 1 if chunks else 0
+            data[:, 0] = np.unique(data[:, 0], return_inverse=True)[1] + offset
+            chunks.append(data)
+    if not chunks:
+        return []
+    data = np.concatenate(chunks)
+    instances, questions, options, correct = data.T
+
+    question_ids, q_index = np.unique(questions, return_inverse=True)
+    _, i_index = np.unique(instances, return_inverse=True)
+    n_instances, n_questions = i_index.max() + 1, len(question_ids)
+
+    # Response matrix; NaN where an instance has no answer for a question.
+    matrix = np.full((n_instances, n_questions), np.nan)
+    matrix[i_index, q_index] = correct
+    answered = ~np.isnan(matrix)
+    scores = np.where(answered, matrix, 0.0)
+
+    responses = answered.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_values = scores.sum(axis=0) / responses
+
+        # Corrected point-biserial: correlate each item with the total
+        # score excluding that item, over the instances that answered it.
+        rest = scores.sum(axis=1, keepdims=True) - scores
+        n = responses
+        mean_item = p_values
+        mean_rest = (rest * answered).sum(axis=0) / n
+        item_dev = (scores - mean_item) * answered
+        rest_dev = (rest - mean_rest) * answered
+        covariance = (item_dev * rest_dev).sum(axis=0) / n
+        spread = np.sqrt((item_dev ** 2).sum(axis=0) / n) * np.sqrt((rest_dev ** 2).sum(axis=0) / n)
+        point_biserial = np.where(spread > 0, covariance / spread, np.nan)
+
+    chosen = options >= 0
+    option_counts = np.zeros((n_questions, len(OPTION_CODES)), dtype=np.int64)
+    np.add.at(option_counts, (q_index[chosen], options[chosen]), 1)
+
+    now = timezone.now()
+
+    def clean(value):
+        return None if np.isnan(value) else float(value)
+
+    return [
+        QuestionStats(
+            question_id=int(question_id),
+            responses=int(responses[j]),
+            p_value=clean(p_values[j]),
+            point_biserial=clean(point_biserial[j]),
+            option_a_count=int(option_counts[j, 0]),
+            option_b_count=int(option_counts[j, 1]),
+            option_c_count=int(option_counts[j, 2]),
+            option_d_count=int(option_counts[j, 3]),
+            computed_at=now,
+        )
+        for j, question_id in enumerate(question_ids)
+    ]
+
+
+def save_question_stats(stats):
+    QuestionStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=[
+            'responses',
+            'p_value',
+            'point_biserial',
+            'option_a_count',
+            'option_b_count',
+            'option_c_count',
+            'option_d_count',
+            'computed_at',
+        ],
+        batch_size=500,
+    )
+
+
+def analyzable_assignment_ids():
+    return (
+        Question.objects.order_by('assignment_id')
+        .values_list('assignment_id', flat=True)
+        .distinct()
+    )
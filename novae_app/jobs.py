@@ -0,0 +1,224 @@
+"""
+A small job queue kept in the application database.
+
+Work is queued with ``Job.objects.enqueue(task, payload)`` from views and
+signals and picked up by ``manage.py run_worker``. Functions become tasks
+with the ``@task`` decorator (see novae_app.tasks)::
+
+    @task('render_assignment_docx', concurrency=2)
+    def render_assignment_docx(assignment_id):
+        ...
+
+Claiming is a compare-and-swap: a worker picks the best candidate and
+flips it from queued to running with an UPDATE that only matches while
+the row is still queued, so two workers can never both win the same job,
+on any database backend and without holding locks. Jobs run in priority
+order (higher first), then by ``run_after``. A failing job is retried
+with exponential backoff until ``max_attempts``. While a job runs, its
+worker refreshes ``locked_at`` every JOB_HEARTBEAT_SECONDS; a job whose
+worker died is put back once that heartbeat is older than
+``JOB_LOCK_TIMEOUT_SECONDS``, so long jobs are never run twice. A
+job runs with the school it was queued under as the current school (see
+novae_app.tenancy).
+"""
+import logging
+import os
+import socket
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+from .profiling import query_origin
+from .tenancy import use_school
+
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+
+@dataclass
+class Task:
+    name: str
+    func: object
+    concurrency: int = None
+
+
+TASKS = {}
+
+
+def task(name, concurrency=None):
+    """Register the decorated function as task ``name``."""
+    def register(func):
+        TASKS[name] = Task(name, func, concurrency)
+        return func
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts`` (1, 2, ...)."""
+    base = getattr(settings, 'JOB_RETRY_BACKOFF_SECONDS', 30)
+    ceiling = getattr(settings, 'JOB_RETRY_BACKOFF_MAX_SECONDS', 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), ceiling))
+
+
+def _saturated_tasks():
+    """Tasks already running as many jobs as their concurrency allows."""
+    limited = {name: spec.concurrency for name, spec in TASKS.items() if spec.concurrency}
+    if not limited:
+        return []
+    running = (
+        Job.objects.filter(status=Job.RUNNING, task__in=limited)
+        .values('task')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    return [row['task'] for row in running if row['n'] >= limited[row['task']]]
+
+
+def claim(worker, tasks=None):
+    """Claim the next runnable job for ``worker``, or return None."""
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+    if tasks:
+        candidates = candidates.filter(task__in=tasks)
+    saturated = _saturated_tasks()
+    if saturated:
+        candidates = candidates.exclude(task__in=saturated)
+
+    for job_id in candidates.order_by('-priority', 'run_after', 'id').values_list(
+        'id', flat=True
+    )[:CLAIM_CANDIDATES]:
+        won = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if not won:
+            continue  # another worker got there first
+        job = Job.objects.select_related('school').get(id=job_id)
+        spec = TASKS.get(job.task)
+        if spec and spec.concurrency and Job.objects.filter(
+            status=Job.RUNNING, task=job.task
+        ).count() > spec.concurrency:
+            # Lost a race for the last slot; hand the job back untouched.
+            Job.objects.filter(id=job_id, locked_by=worker).update(
+                status=Job.QUEUED,
+                locked_by='',
+                locked_at=None,
+                attempts=F('attempts') - 1,
+            )
+            continue
+        return job
+    return None
+
+
+def heartbeat_interval():
+    return getattr(settings, 'JOB_HEARTBEAT_SECONDS', 60)
+
+
+class Heartbeat:
+    """
+    Keeps a running job's ``locked_at`` fresh from a side thread, so
+    release_stale only takes back jobs whose worker has stopped, however
+    long the job itself runs.
+    """
+
+    def __init__(self, job, interval):
+        self.job = job
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job.id}', daemon=True)
+
+    def beat(self):
+        Job.objects.filter(id=self.job.id, status=Job.RUNNING, locked_by=self.job.locked_by).update(
+            locked_at=timezone.now()
+        )
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    self.beat()
+                except DatabaseError:
+                    # Busy database: the next beat tries again well within the timeout.
+                    logger.warning("Heartbeat of job %s failed", self.job.id, exc_info=True)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run(job):
+    """Run a claimed job and record the outcome."""
+    spec = TASKS.get(job.task)
+    try:
+        if spec is None:
+            raise LookupError(f"unknown task {job.task!r}")
+        with Heartbeat(job, heartbeat_interval()):
+            with use_school(job.school), query_origin(f'task:{job.task}'):
+                spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s failed (attempt %s/%s)", job, job.attempts, job.max_attempts)
+        if spec is None or job.attempts >= job.max_attempts:
+            _finish(job, Job.FAILED, last_error=error)
+        else:
+            _finish(
+                job,
+                Job.QUEUED,
+                last_error=error,
+                run_after=timezone.now() + backoff(job.attempts),
+                finished_at=None,
+            )
+        return False
+    _finish(job, Job.DONE, last_error='')
+    return True
+
+
+def _finish(job, status, **fields):
+    fields.setdefault('finished_at', timezone.now())
+    # Only the worker holding the lock may record a result.
+    Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=job.locked_by).update(
+        status=status, locked_by='', locked_at=None, **fields
+    )
+
+
+def release_stale(timeout=None):
+    """
+    Requeue jobs whose worker stopped without finishing them (or fail them
+    when out of attempts): running jobs whose heartbeat is older than
+    ``timeout``. Returns the number of jobs released.
+    """
+    if timeout is None:
+        timeout = timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT_SECONDS', 600))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=timezone.now() - timeout)
+    released = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, locked_by='', locked_at=None, last_error='worker lock expired'
+    )
+    released += stale.update(
+        status=Job.FAILED,
+        locked_by='',
+        locked_at=None,
+        last_error='worker lock expired',
+        finished_at=timezone.now(),
+    )
+    return released
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from novae_app.item_analysis import (
+    DEFAULT_CHUNK_SIZE,
+    analyzable_assignment_ids,
+    analyze_assignment,
+    save_question_stats,
+)
+from novae_app.tenancy import maintenance_schools
+
+
+class Command(BaseCommand):
+    help = "Compute difficulty, discrimination and distractor counts per question."
+
+    def add_arguments(self, parser):
+        parser.add_argument('assignment_ids', nargs='*', type=int,
+                            help="Limit the analysis to these assignments.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Answers fetched per round trip.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        assignment_ids = options['assignment_ids'] or analyzable_assignment_ids()
+        # Question stats are shared, so every school's answers count.
+        schools = maintenance_schools()
+        questions = 0
+        for assignment_id in assignment_ids:
+            stats = analyze_assignment(
+                assignment_id, chunk_size=options['chunk_size'], schools=schools
+            )
+            if stats:
+                save_question_stats(stats)
+                questions += len(stats)
+        self.stdout.write(self.style.SUCCESS(
+            f"Analysed {questions} questions in {time.monotonic() - started:.1f}s."
+        ))
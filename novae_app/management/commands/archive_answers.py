@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from novae_app.archive import archive_answers, default_cutoff, rehydrate
+from novae_app.models import AssignmentInstance
+from novae_app.tenancy import add_school_argument, maintenance_schools, use_school
+
+
+class Command(BaseCommand):
+    help = (
+        "Move answers of completed assignments older than the retention "
+        "horizon to compressed files in ANSWER_ARCHIVE_DIR, or restore them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days',
+            type=int,
+            help="Retention horizon; defaults to ANSWER_RETENTION_DAYS.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would move.")
+        parser.add_argument(
+            '--restore',
+            type=int,
+            action='append',
+            metavar='INSTANCE_ID',
+            help="Bring an assignment instance's answers back from the archive (repeatable).",
+        )
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        schools = maintenance_schools(options['school'])
+        if options['restore']:
+            return self.restore(options['restore'], schools)
+
+        cutoff = default_cutoff()
+        if options['older_than_days'] is not None:
+            if options['older_than_days'] < 0:
+                raise CommandError("--older-than-days must not be negative.")
+            cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+
+        def progress(path, result):
+            self.stdout.write(f"  wrote {path} ({result.answers} answers so far)")
+
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        for school in schools:
+            with use_school(school):
+                result = archive_answers(cutoff, dry_run=options['dry_run'], progress=progress)
+            where = f"{school.slug}: " if school else ''
+            self.stdout.write(
+                f"{where}{verb} {result.answers} answer(s) from {result.instances} instance(s) "
+                f"submitted before {cutoff:%Y-%m-%d}."
+            )
+
+    def restore(self, instance_ids, schools):
+        # Instance ids are per database: find each one's school first.
+        found = {}
+        for school in schools:
+            with use_school(school):
+                for instance_id in AssignmentInstance.objects.in_bulk(instance_ids):
+                    found.setdefault(instance_id, []).append(school)
+        for instance_id in instance_ids:
+            if instance_id not in found:
+                raise CommandError(f"Assignment instance {instance_id} does not exist.")
+            if len(found[instance_id]) > 1:
+                raise CommandError(
+                    f"Assignment instance {instance_id} exists in several school databases; "
+                    "pick one with --school."
+                )
+        for instance_id in instance_ids:
+            with use_school(found[instance_id][0]):
+                restored = rehydrate(AssignmentInstance.objects.get(id=instance_id))
+            self.stdout.write(f"Restored {restored} answer(s) for instance {instance_id}.")
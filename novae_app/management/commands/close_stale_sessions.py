@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from novae_app.achievements import record_study_time
+from novae_app.models import StudySession
+from novae_app.tenancy import (
+    add_school_argument,
+    atomic_student_data,
+    maintenance_schools,
+    use_school,
+)
+
+
+class Command(BaseCommand):
+    help = "Close study sessions that stopped sending heartbeats."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--idle-minutes',
+            type=int,
+            default=getattr(settings, 'STUDY_SESSION_IDLE_MINUTES', 30),
+            help="Close open sessions idle for longer than this.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Sessions closed and credited per batch.",
+        )
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['idle_minutes'])
+        closed = 0
+        for school in maintenance_schools(options['school']):
+            with use_school(school):
+                closed += self.close(cutoff, options['batch_size'])
+        self.stdout.write(f"Closed {closed} stale study session(s).")
+
+    def close(self, cutoff, batch_size):
+        stale_ids = list(
+            StudySession.objects.stale(cutoff).order_by('id').values_list('id', flat=True)
+        )
+        closed = 0
+        for start in range(0, len(stale_ids), batch_size):
+            with atomic_student_data():
+                # Re-check under lock: a session may have been closed by a
+                # logout (and credited there) since the ids were read.
+                ids = list(
+                    StudySession.objects.stale(cutoff)
+                    .select_for_update()
+                    .filter(id__in=stale_ids[start:start + batch_size])
+                    .values_list('id', flat=True)
+                )
+                batch = StudySession.objects.filter(id__in=ids)
+                closed += batch.close_stale(cutoff)
+                record_study_time(batch)
+        return closed
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from novae_app.importers import DEFAULT_CHUNK_SIZE, import_assignments
+
+
+class Command(BaseCommand):
+    help = "Import assignments with nested questions from a JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON Lines file, one assignment per line.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        def report(result):
+            self.stdout.write(
+                f"  {result.assignments} assignments, "
+                f"{result.questions} questions imported..."
+            )
+
+        try:
+            with open(options['path'], encoding='utf-8') as stream:
+                result = import_assignments(
+                    stream,
+                    chunk_size=options['chunk_size'],
+                    progress=report,
+                )
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line_number, message in result.errors:
+            self.stderr.write(f"line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.assignments} assignments and "
+            f"{result.questions} questions ({len(result.errors)} lines skipped)."
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from novae_app.models import School
+from novae_app.roster import import_roster
+
+
+class Command(BaseCommand):
+    help = "Create parent and student accounts in bulk from a roster CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Roster CSV, one row per child.")
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Processes used for password hashing (default: CPU count).",
+        )
+        parser.add_argument(
+            '--school', metavar='SLUG',
+            help="School the parents and students join (default: none).",
+        )
+
+    def handle(self, *args, **options):
+        school = None
+        if options['school']:
+            school = School.objects.filter(slug=options['school']).first()
+            if school is None:
+                raise CommandError(f"Unknown school: {options['school']}")
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                result = import_roster(stream, workers=options['workers'], school=school)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        for line_number, message in result.errors:
+            prefix = f"line {line_number}: " if line_number else ""
+            self.stderr.write(prefix + message)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.parents} families with {result.students} students "
+            f"({len(result.errors)} problem(s))."
+        ))
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+
+from novae_app.models import School
+from novae_app.tenancy import migrate_school, tenancy_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Create and migrate every school's database (TENANT_DATABASES), "
+        "several schools at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--school',
+            action='append',
+            metavar='SLUG',
+            help="Only this school (repeatable).",
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=4,
+            help="Schools migrated in parallel (default 4).",
+        )
+        parser.add_argument(
+            '--seed',
+            action='store_true',
+            help="Also give each school's students their assignment instances.",
+        )
+
+    def handle(self, *args, **options):
+        if not tenancy_enabled():
+            raise CommandError("TENANT_DATABASES is off; there are no school databases.")
+        if options['jobs'] < 1:
+            raise CommandError("--jobs must be at least 1.")
+
+        schools = School.objects.order_by('slug')
+        if options['school']:
+            schools = schools.filter(slug__in=options['school'])
+            missing = set(options['school']) - {school.slug for school in schools}
+            if missing:
+                raise CommandError(f"Unknown school(s): {', '.join(sorted(missing))}")
+        schools = list(schools)
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=options['jobs']) as pool:
+            futures = {
+                pool.submit(migrate_school, school, options['seed']): school
+                for school in schools
+            }
+            for future in as_completed(futures):
+                school = futures[future]
+                try:
+                    output = future.result()
+                except Exception as exc:
+                    failed.append(school.slug)
+                    self.stderr.write(f"{school.slug}: failed: {exc}")
+                    continue
+                if options['verbosity'] > 1:
+                    self.stdout.write(output)
+                self.stdout.write(f"{school.slug}: up to date.")
+
+        if failed:
+            raise CommandError(f"{len(failed)} school database(s) failed: {', '.join(sorted(failed))}")
+        self.stdout.write(f"Migrated {len(schools)} school database(s).")
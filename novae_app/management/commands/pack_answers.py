@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from novae_app.answers import pack_answers
+from novae_app.tenancy import add_school_argument, maintenance_schools, use_school
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert per-question StudentAnswer rows into one packed AnswerSet per "
+        "submission. Use together with PACKED_ANSWER_STORAGE = True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Instances per transaction.")
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        packed = 0
+        for school in maintenance_schools(options['school']):
+            with use_school(school):
+                packed += pack_answers(batch_size=options['batch_size'])
+        self.stdout.write(f"Packed {packed} submitted attempt(s).")
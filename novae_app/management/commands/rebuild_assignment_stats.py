@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from novae_app.models import HISTOGRAM_BUCKETS, AssignmentStats
+from novae_app.stats import compute_all_stats, stats_differ
+
+
+class Command(BaseCommand):
+    help = "Recompute per-assignment statistics and report drift from the running values."
+
+    def add_arguments(self, parser):
+        parser.add_argument('assignment_ids', nargs='*', type=int)
+        parser.add_argument('--check', action='store_true',
+                            help="Only report differences; do not write.")
+
+    def handle(self, *args, **options):
+        ids = options['assignment_ids'] or None
+        fresh = compute_all_stats(ids)
+        stored = AssignmentStats.objects.all()
+        if ids:
+            stored = stored.filter(assignment_id__in=ids)
+        stored = {stats.assignment_id: stats for stats in stored}
+
+        drifted = []
+        for assignment_id in sorted(set(fresh) | set(stored)):
+            expected = fresh.get(assignment_id) or AssignmentStats(
+                assignment_id=assignment_id, histogram=[0] * HISTOGRAM_BUCKETS
+            )
+            current = stored.get(assignment_id)
+            if current is None or stats_differ(current, expected):
+                drifted.append(expected)
+                self.stdout.write(f"assignment {assignment_id}: stats out of date")
+
+        if drifted and not options['check']:
+            with transaction.atomic():
+                AssignmentStats.objects.filter(
+                    assignment_id__in=[stats.assignment_id for stats in drifted]
+                ).delete()
+                AssignmentStats.objects.bulk_create(drifted)
+
+        if options['check'] and drifted:
+            raise CommandError(f"{len(drifted)} assignment stat row(s) are out of date.")
+        verb = "Checked" if options['check'] else "Rebuilt"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} stats; {len(drifted)} row(s) were out of date."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from novae_app.search import install_triggers, is_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from the source tables."
+
+    def handle(self, *args, **options):
+        if not is_available():
+            self.stdout.write("Full-text search needs SQLite FTS5; nothing to do.")
+            return
+        install_triggers()
+        rows = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {rows} rows."))
@@ -0,0 +1,49 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from novae_app.grading import regrade_report_rows, regrade_schools
+from novae_app.models import Question
+from novae_app.tenancy import add_school_argument, maintenance_schools
+
+
+class Command(BaseCommand):
+    help = "Recompute scores of graded work after an answer key changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('assignment_ids', nargs='*', type=int)
+        parser.add_argument(
+            '--question', type=int, action='append', default=[],
+            help="Regrade the assignment this question belongs to (repeatable).",
+        )
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Report changes without writing them.")
+        parser.add_argument('--report', help="Write the changed scores to this CSV file.")
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        assignment_ids = set(options['assignment_ids'])
+        if options['question']:
+            assignment_ids.update(
+                Question.objects.filter(id__in=options['question'])
+                .values_list('assignment_id', flat=True)
+            )
+        if not assignment_ids:
+            raise CommandError("Give at least one assignment id or --question.")
+
+        changes = regrade_schools(
+            assignment_ids, maintenance_schools(options['school']), dry_run=options['dry_run']
+        )
+
+        if options['report']:
+            with open(options['report'], 'w', newline='', encoding='utf-8') as handle:
+                csv.writer(handle).writerows(regrade_report_rows(changes))
+        else:
+            for school, change in changes:
+                where = f"{school.slug}: " if school else ''
+                self.stdout.write(
+                    f"{where}instance {change.instance_id}: {change.old_score} -> {change.new_score}"
+                )
+
+        verb = "Would change" if options['dry_run'] else "Changed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(changes)} score(s)."))
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from novae_app import jobs
+
+
+# How often (seconds) a worker looks for jobs abandoned by dead workers.
+RELEASE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs. Start several for more throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--task',
+            action='append',
+            dest='tasks',
+            help="Only run this task (repeatable).",
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help="Exit once no job is ready instead of waiting for more.",
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help="Exit after running this many jobs (0 = no limit).",
+        )
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        verbosity = options['verbosity']
+        processed = 0
+        last_release = 0.0
+        self.stdout.write(f"Worker {worker} started.")
+        try:
+            while not options['max_jobs'] or processed < options['max_jobs']:
+                close_old_connections()
+                if time.monotonic() - last_release > RELEASE_INTERVAL:
+                    jobs.release_stale()
+                    last_release = time.monotonic()
+                job = jobs.claim(worker, options['tasks'])
+                if job is None:
+                    if options['burst']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                ok = jobs.run(job)
+                processed += 1
+                if verbosity > 1:
+                    self.stdout.write(f"  {job} {'done' if ok else 'failed'}")
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Worker {worker} stopped after {processed} job(s).")
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from novae_app.digests import DEFAULT_BATCH_SIZE, send_parent_digests
+from novae_app.tenancy import add_school_argument, maintenance_schools
+
+
+class Command(BaseCommand):
+    help = (
+        "Email every parent a digest of last week's progress. Safe to re-run: "
+        "parents who already received the week's digest are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--week-start',
+            help="Monday (YYYY-MM-DD) of the week to report; defaults to last week.",
+        )
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        period_start = None
+        if options['week_start']:
+            try:
+                period_start = datetime.strptime(options['week_start'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['week_start']!r} (expected YYYY-MM-DD)")
+
+        # Children's figures are always read from their own school's
+        # database; --school only limits which parents are emailed.
+        schools = maintenance_schools(options['school']) if options['school'] else None
+        verbosity = options['verbosity']
+
+        def progress(result):
+            if verbosity > 1:
+                self.stdout.write(f"  {result.sent} sent so far")
+
+        result = send_parent_digests(period_start, options['batch_size'], progress, schools)
+        self.stdout.write(
+            f"Sent {result.sent} digest(s); {result.skipped} parent(s) without children skipped."
+        )
@@ -0,0 +1,45 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from novae_app.models import StudySession, User
+from novae_app.tenancy import add_school_argument, maintenance_schools, use_school
+
+
+class Command(BaseCommand):
+    help = "Print total study time per student, aggregated in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="Only sessions started on/after YYYY-MM-DD.")
+        parser.add_argument('--until', help="Only sessions started before YYYY-MM-DD.")
+        add_school_argument(parser)
+
+    def handle(self, *args, **options):
+        sessions = StudySession.objects.all()
+        if options['since']:
+            sessions = sessions.filter(login_time__gte=self._parse(options['since']))
+        if options['until']:
+            sessions = sessions.filter(login_time__lt=self._parse(options['until']))
+
+        # Each student's sessions are in their school's database.
+        totals = []
+        for school in maintenance_schools(options['school']):
+            with use_school(school):
+                totals += sessions.totals_by_student()
+        names = dict(
+            User.objects.filter(id__in=[row['student'] for row in totals])
+            .values_list('id', 'username')
+        )
+        for row in totals:
+            self.stdout.write(
+                f"{names.get(row['student'], row['student'])}\t"
+                f"{row['sessions']}\t{row['total_time']}"
+            )
+
+    def _parse(self, value):
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Invalid date: {value!r} (expected YYYY-MM-DD)")
+        return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,207 @@
+"""
+Serving uploaded Material files and rendering their previews.
+
+Downloads never load a file into memory. By default the file is streamed
+from disk in blocks, with single-range ``Range`` requests answered by a
+206 so PDF viewers can fetch pages on demand and interrupted downloads
+can resume. The content hash in the stored name is the ETag. With
+``MEDIA_OFFLOAD`` set, Django only checks permissions and hands the
+transfer to the front-end server:
+
+* ``'x-accel-redirect'`` (nginx): ``X-Accel-Redirect`` points at
+  ``MEDIA_OFFLOAD_PREFIX`` + the stored name, an ``internal`` location
+  aliased to MEDIA_ROOT;
+* ``'x-sendfile'`` (Apache mod_xsendfile, lighttpd): ``X-Sendfile`` holds
+  the absolute path.
+
+Previews are rendered by a worker (the ``render_material_preview`` task),
+queued whenever a saved material's file has no preview yet. The first page
+of a PDF goes through poppler's ``pdftoppm``, which reads only that page;
+images are thumbnailed with Pillow. Neither is required: without them a
+material simply has no preview.
+"""
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+
+from .models import Job, Material
+from .storage import content_hash
+
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+PREVIEW_SIZE = 480
+PREVIEW_TIMEOUT_SECONDS = 60
+IMAGE_EXTENSIONS = {'.gif', '.jpeg', '.jpg', '.png', '.webp'}
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# ---------------------------
+# Downloads
+# ---------------------------
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single-range ``Range`` header, or
+    None when the header should be ignored (absent, malformed or
+    multi-range: the whole file is sent). Raises ValueError if the range
+    cannot be satisfied.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or end < start:
+        raise ValueError(f"range not satisfiable for {size} bytes")
+    return start, end
+
+
+def _stream(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def serve_file(request, field_file, filename=None, as_attachment=False):
+    """Response for a stored file, honouring conditional and range requests."""
+    name = field_file.name
+    content_type = mimetypes.guess_type(filename or name)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(name)
+    etag = quote_etag(content_hash(name))
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    offload = getattr(settings, 'MEDIA_OFFLOAD', None)
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            prefix = getattr(settings, 'MEDIA_OFFLOAD_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + name
+        else:
+            response['X-Sendfile'] = field_file.path
+    else:
+        path = field_file.path
+        size = os.path.getsize(path)
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _stream(path, start, end - start + 1), status=206, content_type=content_type
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+
+# ---------------------------
+# Previews
+# ---------------------------
+def preview_name(file_name):
+    return f'previews/{content_hash(file_name)}.png'
+
+
+@receiver(post_save, sender=Material)
+def queue_preview(sender, instance, **kwargs):
+    if instance.file and instance.preview.name != preview_name(instance.file.name):
+        Job.objects.enqueue(
+            'render_material_preview',
+            {'material_id': instance.id},
+            key=f'preview:{instance.id}:{content_hash(instance.file.name)}',
+        )
+
+
+def _render_pdf(source, target):
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        logger.info("pdftoppm is not installed; skipping PDF preview of %s", source)
+        return False
+    subprocess.run(
+        [pdftoppm, '-f', '1', '-l', '1', '-png', '-singlefile',
+         '-scale-to', str(PREVIEW_SIZE), source, target[:-len('.png')]],
+        check=True,
+        capture_output=True,
+        timeout=PREVIEW_TIMEOUT_SECONDS,
+    )
+    return True
+
+
+def _render_image(source, target):
+    try:
+        from PIL import Image
+    except ImportError:
+        logger.info("Pillow is not installed; skipping image preview of %s", source)
+        return False
+    with Image.open(source) as image:
+        image.draft('RGB', (PREVIEW_SIZE, PREVIEW_SIZE))  # decode JPEGs at reduced size
+        image.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+        image.save(target, 'PNG')
+    return True
+
+
+def write_preview(material):
+    """
+    Render ``material``'s preview unless a file with the same content
+    already has one. Returns the preview name, or None if none can be made.
+    """
+    if not material.file:
+        return None
+    name = preview_name(material.file.name)
+    storage = material.preview.storage
+    if not storage.exists(name):
+        extension = os.path.splitext(material.file.name)[1].lower()
+        if extension == '.pdf':
+            render = _render_pdf
+        elif extension in IMAGE_EXTENSIONS:
+            render = _render_image
+        else:
+            return None
+        target = storage.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(target)) as scratch:
+            partial = os.path.join(scratch, 'preview.png')
+            if not render(material.file.path, partial):
+                return None
+            os.replace(partial, target)
+    # Only if the file was not replaced meanwhile.
+    Material.objects.filter(id=material.id, file=material.file.name).update(preview=name)
+    return name
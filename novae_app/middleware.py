@@ -0,0 +1,88 @@
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import profiling, tenancy
+from .models import STUDY_HEARTBEAT_KEY, STUDY_SESSION_KEY, StudySession
+
+
+# ---------------------------
+# School of the request
+# ---------------------------
+class TenantMiddleware:
+    """
+    Make the request's school current (see novae_app.tenancy). Goes after
+    AuthenticationMiddleware and before anything touching student data.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = tenancy.activate_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            tenancy.deactivate(token)
+
+
+# ---------------------------
+# Study session heartbeat
+# ---------------------------
+class StudySessionHeartbeatMiddleware:
+    """
+    Keep the open StudySession of a logged-in student alive.
+
+    The heartbeat is throttled through the session so an active student
+    costs at most one UPDATE per ``STUDY_SESSION_HEARTBEAT_SECONDS``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.interval = getattr(settings, 'STUDY_SESSION_HEARTBEAT_SECONDS', 60)
+
+    def __call__(self, request):
+        session = getattr(request, 'session', None)
+        if session is not None:
+            session_id = session.get(STUDY_SESSION_KEY)
+            if session_id:
+                now = timezone.now()
+                last = session.get(STUDY_HEARTBEAT_KEY, 0)
+                if now.timestamp() - last >= self.interval:
+                    StudySession.objects.open().filter(id=session_id).update(
+                        last_heartbeat=now
+                    )
+                    session[STUDY_HEARTBEAT_KEY] = now.timestamp()
+        return self.get_response(request)
+
+
+# ---------------------------
+# Profiling and query origin
+# ---------------------------
+class ProfilingMiddleware:
+    """
+    Tag the request's queries with its view for the slow-query log, and
+    run it under a profiler when a staff member asks for one (see
+    novae_app.profiling). Goes right after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with profiling.query_origin(request.path):
+            mode = profiling.requested_mode(request)
+            if mode is None or not request.user.is_staff:
+                return self.get_response(request)
+
+            response, path = profiling.profile_request(request, self.get_response, mode)
+            if profiling.wants_download(request):
+                return profiling.profile_download(path)
+            response['X-Profile-File'] = os.path.basename(path)
+            return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        profiling.set_query_origin(match.view_name if match else request.path)
+        return None
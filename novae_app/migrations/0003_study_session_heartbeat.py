@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0002_course_assignment_is_demo_assignment_is_sample_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studysession',
+            name='last_heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='assignment',
+            name='course',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='novae_app.course'),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['student', 'login_time'], name='novae_app_s_student_e60e79_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studysession',
+            index=models.Index(fields=['logout_time', 'last_heartbeat'], name='novae_app_s_logout__451547_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE IF NOT EXISTS novae_search USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    grade UNINDEXED,
+    is_free UNINDEXED,
+    owner_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# The triggers that keep the index current are (re)installed after every
+# migrate by novae_app.search.install_triggers.
+
+
+def drop_triggers(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'trigger' AND name LIKE 'novae_app_%_search_%'"
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    for name in names:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+POPULATE = [
+    "INSERT INTO novae_search (rowid, kind, object_id, title, body, grade, is_free, owner_id) "
+    "SELECT id * 8 + 1, 'course', id, title, description, grade_level, is_demo, NULL "
+    "FROM novae_app_course",
+    "INSERT INTO novae_search (rowid, kind, object_id, title, body, grade, is_free, owner_id) "
+    "SELECT l.id * 8 + 2, 'lesson', l.id, l.title, l.content, c.grade_level, l.is_sample, NULL "
+    "FROM novae_app_lesson l JOIN novae_app_course c ON c.id = l.course_id",
+    "INSERT INTO novae_search (rowid, kind, object_id, title, body, grade, is_free, owner_id) "
+    "SELECT id * 8 + 3, 'assignment', id, title, COALESCE(description, ''), grade_level, "
+    "(is_demo OR is_sample), NULL FROM novae_app_assignment",
+    "INSERT INTO novae_search (rowid, kind, object_id, title, body, grade, is_free, owner_id) "
+    "SELECT id * 8 + 4, 'material', id, title, '', grade_level, (is_demo OR is_sample), NULL "
+    "FROM novae_app_material",
+    "INSERT INTO novae_search (rowid, kind, object_id, title, body, grade, is_free, owner_id) "
+    "SELECT id * 8 + 5, 'studyplan', id, title, "
+    "subject || ' ' || class_name || ' ' || content || ' ' || notes, NULL, 0, user_id "
+    "FROM novae_app_studyplan",
+]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE)
+    for statement in POPULATE:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    drop_triggers(schema_editor)
+    schema_editor.execute("DROP TABLE IF EXISTS novae_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0003_study_session_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0004_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'order', 'id'], name='novae_app_l_course__bf704a_idx'),
+        ),
+    ]
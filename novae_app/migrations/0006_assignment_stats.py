@@ -0,0 +1,58 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_stats(apps, schema_editor):
+    AssignmentInstance = apps.get_model('novae_app', 'AssignmentInstance')
+    AssignmentStats = apps.get_model('novae_app', 'AssignmentStats')
+
+    stats = {}
+    scores = (
+        AssignmentInstance.objects.filter(score__isnull=False)
+        .values_list('assignment_id', 'score')
+        .iterator()
+    )
+    for assignment_id, score in scores:
+        row = stats.get(assignment_id)
+        if row is None:
+            row = stats[assignment_id] = AssignmentStats(
+                assignment_id=assignment_id, histogram=[0] * 10
+            )
+        value = float(score)
+        row.count += 1
+        row.score_sum += value
+        row.score_sq_sum += value * value
+        row.histogram[min(int(score // 10), 9)] += 1
+        row.min_score = score if row.min_score is None else min(row.min_score, score)
+        row.max_score = score if row.max_score is None else max(row.max_score, score)
+    AssignmentStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0005_lesson_course_order_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('score_sq_sum', models.FloatField(default=0)),
+                ('min_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('max_score', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('histogram', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='novae_app.assignment')),
+            ],
+            options={
+                'verbose_name_plural': 'assignment stats',
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
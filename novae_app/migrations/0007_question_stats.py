@@ -0,0 +1,32 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0006_assignment_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('p_value', models.FloatField(blank=True, null=True)),
+                ('point_biserial', models.FloatField(blank=True, null=True)),
+                ('option_a_count', models.PositiveIntegerField(default=0)),
+                ('option_b_count', models.PositiveIntegerField(default=0)),
+                ('option_c_count', models.PositiveIntegerField(default=0)),
+                ('option_d_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='item_stats', to='novae_app.question')),
+            ],
+            options={
+                'verbose_name_plural': 'question stats',
+            },
+        ),
+    ]
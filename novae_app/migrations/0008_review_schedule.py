@@ -0,0 +1,31 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0007_question_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('easiness', models.FloatField(default=2.5)),
+                ('interval_days', models.PositiveIntegerField(default=0)),
+                ('repetitions', models.PositiveIntegerField(default=0)),
+                ('due_date', models.DateField()),
+                ('last_reviewed', models.DateField(blank=True, null=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='novae_app.question')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_schedule', to='novae_app.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'due_date'], name='novae_app_r_student_a9d5a3_idx')],
+                'unique_together': {('student', 'question')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0008_review_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('value', models.BigIntegerField(default=0)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='novae_app.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentBadge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=50)),
+                ('earned_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='badges', to='novae_app.studentprofile')),
+            ],
+            options={
+                'unique_together': {('student', 'code')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0009_achievements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParentDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='assignmentinstance',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assignmentinstance',
+            index=models.Index(fields=['student', 'completed_at'], name='novae_app_a_student_697a5f_idx'),
+        ),
+        migrations.AddField(
+            model_name='parentdigest',
+            name='parent',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digests', to='novae_app.parentprofile'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='parentdigest',
+            unique_together={('parent', 'period_start')},
+        ),
+    ]
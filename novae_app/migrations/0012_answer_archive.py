@@ -0,0 +1,34 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0011_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerArchiveEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+                ('answer_count', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='studentanswer',
+            index=models.Index(fields=['submitted_at'], name='novae_app_s_submitt_a9f68a_idx'),
+        ),
+        migrations.AddField(
+            model_name='answerarchiveentry',
+            name='assignment_instance',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archive_entries', to='novae_app.assignmentinstance'),
+        ),
+    ]
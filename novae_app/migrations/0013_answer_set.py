@@ -0,0 +1,85 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 500
+
+
+def pack_existing_answers(apps, schema_editor):
+    # Only when packed storage is switched on; otherwise run
+    # ``manage.py pack_answers`` whenever it is enabled later. Answers are
+    # not numbered by attempt yet: each instance gets one set, attempt 1.
+    if not getattr(settings, 'PACKED_ANSWER_STORAGE', False):
+        return
+    StudentAnswer = apps.get_model('novae_app', 'StudentAnswer')
+    AnswerSet = apps.get_model('novae_app', 'AnswerSet')
+    db = schema_editor.connection.alias
+    last_id = 0
+    while True:
+        instance_ids = list(
+            StudentAnswer.objects.using(db).filter(assignment_instance_id__gt=last_id)
+            .order_by('assignment_instance_id')
+            .values_list('assignment_instance_id', flat=True)
+            .distinct()[:BATCH_SIZE]
+        )
+        if not instance_ids:
+            return
+        last_id = instance_ids[-1]
+
+        packed = {}
+        rows = StudentAnswer.objects.using(db).filter(
+            assignment_instance_id__in=instance_ids
+        ).values_list(
+            'assignment_instance_id', 'student_id', 'question_id',
+            'selected_option', 'text_answer', 'submitted_at',
+        ).order_by('id')
+        for instance_id, student_id, question_id, selected, text, submitted_at in rows:
+            entry = packed.setdefault(instance_id, {
+                'student_id': student_id, 'answers': {}, 'submitted_at': submitted_at,
+            })
+            entry['answers'][str(question_id)] = selected if selected is not None else text
+            entry['submitted_at'] = max(entry['submitted_at'], submitted_at)
+
+        AnswerSet.objects.using(db).bulk_create([
+            AnswerSet(
+                assignment_instance_id=instance_id,
+                student_id=entry['student_id'],
+                attempt=1,
+                answers=entry['answers'],
+            )
+            for instance_id, entry in packed.items()
+        ])
+        # bulk_create stamps auto_now_add; keep the original submission time.
+        sets = list(AnswerSet.objects.using(db).filter(assignment_instance_id__in=instance_ids))
+        for answer_set in sets:
+            answer_set.submitted_at = packed[answer_set.assignment_instance_id]['submitted_at']
+        AnswerSet.objects.using(db).bulk_update(sets, ['submitted_at'], batch_size=BATCH_SIZE)
+        StudentAnswer.objects.using(db).filter(assignment_instance_id__in=instance_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0012_answer_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt', models.PositiveIntegerField(default=1)),
+                ('answers', models.JSONField(default=dict)),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+                ('assignment_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_sets', to='novae_app.assignmentinstance')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='novae_app.studentprofile')),
+            ],
+            options={
+                'unique_together': {('assignment_instance', 'attempt')},
+            },
+        ),
+        migrations.RunPython(pack_existing_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:34
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+import django.db.models.deletion
+
+
+BATCH_SIZE = 500
+
+
+def backfill_attempts(apps, schema_editor):
+    # Every instance with submitted answers (in any layout, archived ones
+    # included) is on its last stored attempt: 1 for per-question rows,
+    # which had no number yet. Without this, an instance in the middle of
+    # a retake would start over at attempt 1 and mix two sets of answers.
+    # Graded instances also get one recorded attempt carrying their score.
+    AssignmentInstance = apps.get_model('novae_app', 'AssignmentInstance')
+    AssignmentAttempt = apps.get_model('novae_app', 'AssignmentAttempt')
+    AnswerSet = apps.get_model('novae_app', 'AnswerSet')
+    Question = apps.get_model('novae_app', 'Question')
+
+    question_counts = dict(
+        Question.objects.values('assignment_id').annotate(n=Count('id')).values_list('assignment_id', 'n')
+    )
+    packed_attempts = dict(
+        AnswerSet.objects.values('assignment_instance_id')
+        .annotate(last=Max('attempt'))
+        .values_list('assignment_instance_id', 'last')
+    )
+    started = AssignmentInstance.objects.filter(
+        Q(score__isnull=False)
+        | Q(answers__isnull=False)
+        | Q(answer_sets__isnull=False)
+        | Q(archive_entries__isnull=False)
+    ).distinct().order_by('id')
+    last_id = 0
+    while True:
+        batch = list(started.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            return
+        attempts = []
+        for instance in batch:
+            instance.attempt_count = packed_attempts.get(instance.id, 1)
+            if instance.score is None:
+                continue
+            instance.latest_score = instance.best_score = instance.score
+            total = question_counts.get(instance.assignment_id, 0)
+            attempts.append(AssignmentAttempt(
+                instance_id=instance.id,
+                number=instance.attempt_count,
+                score=instance.score,
+                correct_count=round(instance.score * total / 100),
+                question_count=total,
+            ))
+        AssignmentInstance.objects.bulk_update(batch, ['attempt_count', 'latest_score', 'best_score'])
+        AssignmentAttempt.objects.bulk_create(attempts)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0013_answer_set'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('score', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('correct_count', models.PositiveIntegerField()),
+                ('question_count', models.PositiveIntegerField()),
+                ('submitted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='assignmentinstance',
+            name='attempt_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='assignmentinstance',
+            name='best_score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='assignmentinstance',
+            name='latest_score',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentanswer',
+            name='attempt',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='studentanswer',
+            index=models.Index(fields=['assignment_instance', 'attempt'], name='novae_app_s_assignm_b70fb2_idx'),
+        ),
+        migrations.AddField(
+            model_name='assignmentattempt',
+            name='instance',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_history', to='novae_app.assignmentinstance'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='assignmentattempt',
+            unique_together={('instance', 'number')},
+        ),
+        migrations.RunPython(backfill_attempts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:37
+
+from django.db import migrations, models
+
+
+GRADES = ['K', '1st', '2nd', '3rd', '4th', '5th', '6th', '7th', '8th', '9th', '10th', '11th', '12th']
+
+
+def fill_grade_ordinals(apps, schema_editor):
+    # One UPDATE per grade and model.
+    StudentProfile = apps.get_model('novae_app', 'StudentProfile')
+    catalog = [apps.get_model('novae_app', name) for name in ('Course', 'Assignment', 'Material')]
+    for ordinal, grade in enumerate(GRADES):
+        StudentProfile.objects.filter(grade=grade).update(grade_ordinal=ordinal)
+        for model in catalog:
+            model.objects.filter(grade_level=grade).update(min_grade=ordinal, max_grade=ordinal)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0014_assignment_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignment',
+            name='max_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Highest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='min_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Lowest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='max_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Highest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='min_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Lowest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='max_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Highest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='min_grade',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Lowest grade (K = 0). Filled from the grade level.', null=True),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='grade_ordinal',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['min_grade', 'max_grade'], name='novae_app_assignment_grades'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['min_grade', 'max_grade'], name='novae_app_course_grades'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['min_grade', 'max_grade'], name='novae_app_game_grades'),
+        ),
+        migrations.AddIndex(
+            model_name='material',
+            index=models.Index(fields=['min_grade', 'max_grade'], name='novae_app_material_grades'),
+        ),
+        migrations.RunPython(fill_grade_ordinals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0015_grade_ordinals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='School',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(help_text="Names the school's database file when TENANT_DATABASES is on.", unique=True)),
+                ('domain', models.CharField(blank=True, help_text='Host name served for this school, e.g. lincoln.novaeclass.com.', max_length=255, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='replaces',
+            field=models.ForeignKey(blank=True, help_text="Shared row this school's row is shown instead of.", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='novae_app.assignment'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='replaces',
+            field=models.ForeignKey(blank=True, help_text="Shared row this school's row is shown instead of.", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='novae_app.course'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='replaces',
+            field=models.ForeignKey(blank=True, help_text="Shared row this school's row is shown instead of.", null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='novae_app.material'),
+        ),
+        migrations.AlterField(
+            model_name='answerset',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='novae_app.studentprofile'),
+        ),
+        migrations.AlterField(
+            model_name='assignmentinstance',
+            name='assignment',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='instances', to='novae_app.assignment'),
+        ),
+        migrations.AlterField(
+            model_name='assignmentinstance',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='novae_app.studentprofile'),
+        ),
+        migrations.AlterField(
+            model_name='studentanswer',
+            name='question',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='novae_app.question'),
+        ),
+        migrations.AlterField(
+            model_name='studentanswer',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='novae_app.studentprofile'),
+        ),
+        migrations.AlterField(
+            model_name='studentdailytime',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='novae_app.studentprofile'),
+        ),
+        migrations.AlterField(
+            model_name='studysession',
+            name='student',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='assignment',
+            name='school',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for content shared by every school.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='novae_app.school'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='school',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for content shared by every school.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='novae_app.school'),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='school',
+            field=models.ForeignKey(blank=True, help_text='School whose database the job runs against.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='novae_app.school'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='school',
+            field=models.ForeignKey(blank=True, help_text='Leave empty for content shared by every school.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)ss', to='novae_app.school'),
+        ),
+        migrations.AddField(
+            model_name='parentprofile',
+            name='school',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='parents', to='novae_app.school'),
+        ),
+        migrations.AddField(
+            model_name='studentprofile',
+            name='school',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='students', to='novae_app.school'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.21 on 2026-10-19 04:43
+
+from django.db import migrations, models
+import novae_app.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0016_schools'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='material',
+            name='file',
+            field=models.FileField(blank=True, help_text='Upload the file instead of linking to it. Identical files are stored once.', storage=novae_app.storage.ContentHashStorage(), upload_to='materials'),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='material',
+            name='preview',
+            field=models.FileField(blank=True, editable=False, help_text='First-page thumbnail, rendered in the background (novae_app.materials).', upload_to='previews'),
+        ),
+        migrations.AlterField(
+            model_name='material',
+            name='file_url',
+            field=models.URLField(blank=True),
+        ),
+    ]
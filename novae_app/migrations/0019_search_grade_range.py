@@ -0,0 +1,77 @@
+from importlib import import_module
+
+from django.db import migrations
+
+
+# FTS5 tables cannot gain columns, so the index is rebuilt with the grade
+# range (min_grade/max_grade ordinals) in place of the grade level string.
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE novae_search USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    min_grade UNINDEXED,
+    max_grade UNINDEXED,
+    is_free UNINDEXED,
+    owner_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+COLUMNS = "(rowid, kind, object_id, title, body, min_grade, max_grade, is_free, owner_id)"
+
+POPULATE = [
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 1, 'course', id, title, description, min_grade, max_grade, is_demo, NULL "
+    "FROM novae_app_course",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT l.id * 8 + 2, 'lesson', l.id, l.title, l.content, c.min_grade, c.max_grade, "
+    "l.is_sample, NULL FROM novae_app_lesson l JOIN novae_app_course c ON c.id = l.course_id",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 3, 'assignment', id, title, COALESCE(description, ''), min_grade, "
+    "max_grade, (is_demo OR is_sample), NULL FROM novae_app_assignment",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 4, 'material', id, title, '', min_grade, max_grade, "
+    "(is_demo OR is_sample), NULL FROM novae_app_material",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 5, 'studyplan', id, title, "
+    "subject || ' ' || class_name || ' ' || content || ' ' || notes, NULL, NULL, 0, user_id "
+    "FROM novae_app_studyplan",
+]
+
+# The triggers are reinstalled for the new columns after migrate by
+# novae_app.search.install_triggers.
+search_index = import_module('novae_app.migrations.0004_search_index')
+
+
+def rebuild(schema_editor, create_table, populate):
+    search_index.drop_triggers(schema_editor)
+    schema_editor.execute("DROP TABLE IF EXISTS novae_search")
+    schema_editor.execute(create_table)
+    for statement in populate:
+        schema_editor.execute(statement)
+
+
+def index_grade_range(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    rebuild(schema_editor, CREATE_TABLE, POPULATE)
+
+
+def index_grade_level(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    rebuild(schema_editor, search_index.CREATE_TABLE, search_index.POPULATE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0018_student_data_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_grade_range, index_grade_level),
+    ]
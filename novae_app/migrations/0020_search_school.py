@@ -0,0 +1,72 @@
+from importlib import import_module
+
+from django.db import migrations
+
+
+# Rebuilt again with the owning school of each catalog row (a lesson's is
+# its course's), so search applies the same per-school visibility as
+# CatalogQuerySet.for_school.
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE novae_search USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    min_grade UNINDEXED,
+    max_grade UNINDEXED,
+    school_id UNINDEXED,
+    is_free UNINDEXED,
+    owner_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+COLUMNS = (
+    "(rowid, kind, object_id, title, body, min_grade, max_grade, school_id, is_free, owner_id)"
+)
+
+POPULATE = [
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 1, 'course', id, title, description, min_grade, max_grade, school_id, "
+    "is_demo, NULL FROM novae_app_course",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT l.id * 8 + 2, 'lesson', l.id, l.title, l.content, c.min_grade, c.max_grade, "
+    "c.school_id, l.is_sample, NULL "
+    "FROM novae_app_lesson l JOIN novae_app_course c ON c.id = l.course_id",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 3, 'assignment', id, title, COALESCE(description, ''), min_grade, "
+    "max_grade, school_id, (is_demo OR is_sample), NULL FROM novae_app_assignment",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 4, 'material', id, title, '', min_grade, max_grade, school_id, "
+    "(is_demo OR is_sample), NULL FROM novae_app_material",
+    f"INSERT INTO novae_search {COLUMNS} "
+    "SELECT id * 8 + 5, 'studyplan', id, title, "
+    "subject || ' ' || class_name || ' ' || content || ' ' || notes, NULL, NULL, NULL, 0, "
+    "user_id FROM novae_app_studyplan",
+]
+
+grade_range = import_module('novae_app.migrations.0019_search_grade_range')
+
+
+def index_school(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    grade_range.rebuild(schema_editor, CREATE_TABLE, POPULATE)
+
+
+def unindex_school(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    grade_range.rebuild(schema_editor, grade_range.CREATE_TABLE, grade_range.POPULATE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0019_search_grade_range'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_school, unindex_school),
+    ]
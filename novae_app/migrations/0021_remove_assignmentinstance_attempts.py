@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-19 05:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('novae_app', '0020_search_school'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='assignmentinstance',
+            name='attempts',
+        ),
+    ]
@@ -1,10 +1,16 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.exceptions import ValidationError
+from django.db.models import Count, ExpressionWrapper, F, Q, Sum
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
+from django.urls import reverse
 from django.utils import timezone
-from datetime import date
+from datetime import date, timedelta
+
+from .storage import ContentHashStorage
 
 # ---------------------------
 # User
@@ -65,12 +71,150 @@ GRADE_LEVEL_CHOICES = [
     ('11th', '11th Grade'),
     ('12th', '12th Grade'),
 ]
+GRADE_ORDINALS = {code: ordinal for ordinal, (code, _) in enumerate(GRADE_LEVEL_CHOICES)}
+
+
+def ordinal_for_grade(grade):
+    """Position of a grade code in GRADE_LEVEL_CHOICES (K = 0), or None."""
+    return GRADE_ORDINALS.get(grade)
+
+
+class GradeRangeQuerySet(models.QuerySet):
+    def for_grade(self, ordinal):
+        """Rows whose grade range covers ``ordinal``."""
+        if ordinal is None:
+            return self.none()
+        return self.filter(min_grade__lte=ordinal, max_grade__gte=ordinal)
+
+    def for_grades(self, low, high):
+        """Rows meant for any grade from ``low`` to ``high`` (ordinals)."""
+        return self.filter(min_grade__lte=high, max_grade__gte=low)
+
+
+class GradeRangeModel(models.Model):
+    """
+    Catalog content with a grade range. Subclasses define ``grade_level``;
+    ``min_grade``/``max_grade`` are its indexed ordinals, which catalog
+    queries filter on. Saving keeps them covering ``grade_level``, and
+    single-grade content follows its grade level when that changes. Widen
+    the range by hand for mixed-grade content. ``QuerySet.update()`` and
+    ``bulk_create()`` skip this; call ``sync_grade_range()`` first.
+    """
+    min_grade = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text="Lowest grade (K = 0). Filled from the grade level."
+    )
+    max_grade = models.PositiveSmallIntegerField(
+        null=True, blank=True, help_text="Highest grade (K = 0). Filled from the grade level."
+    )
+
+    objects = GradeRangeQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['min_grade', 'max_grade'], name='%(app_label)s_%(class)s_grades'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_grade_level = instance.__dict__.get('grade_level')
+        return instance
+
+    def sync_grade_range(self):
+        if 'grade_level' in self.get_deferred_fields():
+            return
+        ordinal = ordinal_for_grade(self.grade_level)
+        loaded = ordinal_for_grade(getattr(self, '_loaded_grade_level', None))
+        if loaded is not None and self.min_grade == self.max_grade == loaded:
+            self.min_grade = self.max_grade = ordinal
+        if ordinal is not None:
+            self.min_grade = ordinal if self.min_grade is None else min(self.min_grade, ordinal)
+            self.max_grade = ordinal if self.max_grade is None else max(self.max_grade, ordinal)
+
+    def save(self, *args, **kwargs):
+        self.sync_grade_range()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'grade_level' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'min_grade', 'max_grade'}
+        super().save(*args, **kwargs)
+        self._loaded_grade_level = self.grade_level
+
+
+# ---------------------------
+# School (tenant)
+# ---------------------------
+class School(models.Model):
+    """
+    A school owning its parents and students, and optionally catalog rows
+    of its own. See novae_app.tenancy.
+    """
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(
+        unique=True,
+        help_text="Names the school's database file when TENANT_DATABASES is on."
+    )
+    domain = models.CharField(
+        max_length=255,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Host name served for this school, e.g. lincoln.novaeclass.com."
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class CatalogQuerySet(GradeRangeQuerySet):
+    def for_school(self, school):
+        """
+        The catalog as ``school`` (a School, an id or None) sees it: shared
+        rows, minus those the school replaces, plus the school's own.
+        """
+        if school is None:
+            return self.filter(school__isnull=True)
+        replaced = self.model.objects.filter(
+            school=school, replaces__isnull=False
+        ).values('replaces')
+        return self.filter(
+            Q(school__isnull=True) | Q(school=school)
+        ).exclude(id__in=replaced)
+
+
+class CatalogModel(GradeRangeModel):
+    """
+    Shared catalog content (``school`` empty) or a school's own, which may
+    stand in for a shared row through ``replaces``.
+    """
+    school = models.ForeignKey(
+        School,
+        on_delete=models.CASCADE,
+        related_name='%(class)ss',
+        null=True,
+        blank=True,
+        help_text="Leave empty for content shared by every school."
+    )
+    replaces = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        help_text="Shared row this school's row is shown instead of."
+    )
+
+    objects = CatalogQuerySet.as_manager()
+
+    class Meta(GradeRangeModel.Meta):
+        abstract = True
 
 
 # ---------------------------
 # Course
 # ---------------------------
-class Course(models.Model):
+class Course(CatalogModel):
     title = models.CharField(max_length=200)
     description = models.TextField()
     grade_level = models.CharField(
@@ -86,6 +230,21 @@ class Course(models.Model):
         return f"{self.title} ({'Demo' if self.is_demo else 'Paid'})"
 
 
+FREE_TRIAL_COURSE_TITLE = "Free Trial"
+
+
+def get_free_trial_course():
+    """
+    Course that demo/sample assignments are filed under. Falls back to any
+    course when no "Free Trial" course exists; returns None if there are
+    no courses at all.
+    """
+    try:
+        return Course.objects.get(title=FREE_TRIAL_COURSE_TITLE)
+    except Course.DoesNotExist:
+        return Course.objects.first()
+
+
 # ---------------------------
 # Lesson
 # ---------------------------
@@ -105,6 +264,9 @@ class Lesson(models.Model):
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            models.Index(fields=['course', 'order', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
@@ -127,13 +289,36 @@ class StudentProfile(models.Model):
         null=True,
     )
 
+    grade_ordinal = models.PositiveSmallIntegerField(
+        null=True, blank=True, editable=False, db_index=True
+    )
+    school = models.ForeignKey(
+        School,
+        on_delete=models.SET_NULL,
+        related_name='students',
+        null=True,
+        blank=True
+    )
+
     daily_time_seconds = models.PositiveIntegerField(default=0)
     last_active_date = models.DateField(default=date.today)
     is_demo = models.BooleanField(default=False)
 
+    # Moved on whenever the student's pages change (novae_app.conditional).
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
+    data_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        if 'grade' not in self.get_deferred_fields():
+            self.grade_ordinal = ordinal_for_grade(self.grade)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'grade' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'grade_ordinal'}
+        super().save(*args, **kwargs)
+
 
 # ---------------------------
 # Parent Profile
@@ -145,6 +330,13 @@ class ParentProfile(models.Model):
         related_name='parent_profile'
     )
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+    school = models.ForeignKey(
+        School,
+        on_delete=models.SET_NULL,
+        related_name='parents',
+        null=True,
+        blank=True
+    )
     children = models.ManyToManyField(
         StudentProfile,
         related_name='parents'
@@ -159,7 +351,7 @@ class ParentProfile(models.Model):
 # ---------------------------
 
 
-class Assignment(models.Model):
+class Assignment(CatalogModel):
     course = models.ForeignKey(
         Course,
         on_delete=models.CASCADE,
@@ -187,15 +379,19 @@ class Assignment(models.Model):
 # Assignment Instance
 # ---------------------------
 class AssignmentInstance(models.Model):
+    # Student data may live in a school's own database (novae_app.tenancy),
+    # so references to shared tables carry no database constraint.
     assignment = models.ForeignKey(
         Assignment,
         on_delete=models.CASCADE,
-        related_name='instances'
+        related_name='instances',
+        db_constraint=False
     )
     student = models.ForeignKey(
         StudentProfile,
         on_delete=models.CASCADE,
-        related_name='assignments'
+        related_name='assignments',
+        db_constraint=False
     )
     completed = models.BooleanField(default=False)
     score = models.DecimalField(
@@ -205,23 +401,109 @@ class AssignmentInstance(models.Model):
         blank=True
     )
     feedback = models.TextField(blank=True, null=True)
-    attempts = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    # Denormalised from AssignmentAttempt, updated with each submission.
+    attempt_count = models.PositiveIntegerField(default=0)
+    latest_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    best_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
 
     class Meta:
         unique_together = ('assignment', 'student')
+        indexes = [
+            models.Index(fields=['student', 'completed_at']),
+        ]
 
     def __str__(self):
         return f"{self.assignment.title} - {self.student.user.username}"
 
+    @property
+    def attempts(self):
+        """Submitted attempts; kept for code written against the old counter."""
+        return self.attempt_count
+
     def retake_allowed(self):
         return self.score is not None and self.score < 75
 
     def start_retake(self):
+        # Earlier attempts stay in AssignmentAttempt; the last score is
+        # kept until the retake is submitted.
         self.completed = False
-        self.score = None
-        self.feedback = ""
-        self.attempts += 1
-        self.save()
+        self.completed_at = None
+        self.save(update_fields=['completed', 'completed_at'])
+
+
+class AssignmentAttempt(models.Model):
+    """
+    One submitted attempt at an assignment. Rows are only ever added: a
+    retake gets a new ``number`` and its own StudentAnswer rows. Only a
+    regrade rescores them in place.
+    """
+    instance = models.ForeignKey(
+        AssignmentInstance,
+        on_delete=models.CASCADE,
+        related_name='attempt_history'
+    )
+    number = models.PositiveIntegerField()
+    score = models.DecimalField(max_digits=5, decimal_places=2)
+    correct_count = models.PositiveIntegerField()
+    question_count = models.PositiveIntegerField()
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('instance', 'number')
+
+    def __str__(self):
+        return f"{self.instance_id} attempt {self.number}: {self.score}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            raise ValueError("Assignment attempts are append-only.")
+        super().save(*args, **kwargs)
+
+
+# ---------------------------
+# Assignment Statistics
+# ---------------------------
+HISTOGRAM_BUCKETS = 10
+
+
+class AssignmentStats(models.Model):
+    """
+    Running score statistics for one assignment, kept up to date by
+    novae_app.stats as instances are graded, so reading a class average
+    never needs an aggregate over AssignmentInstance.
+    """
+    assignment = models.OneToOneField(
+        Assignment,
+        on_delete=models.CASCADE,
+        related_name='stats'
+    )
+    count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_sq_sum = models.FloatField(default=0)
+    min_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    max_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    # Counts per 10-point band; the last band also holds 100.
+    histogram = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'assignment stats'
+
+    def __str__(self):
+        return f"{self.assignment} ({self.count} graded)"
+
+    @property
+    def mean(self):
+        return self.score_sum / self.count if self.count else None
+
+    @property
+    def variance(self):
+        if not self.count:
+            return None
+        mean = self.score_sum / self.count
+        return max(self.score_sq_sum / self.count - mean * mean, 0.0)
 
 
 # ---------------------------
@@ -270,6 +552,13 @@ class Game(models.Model):
     max_grade = models.IntegerField()
     is_demo = models.BooleanField(default=False)  # ✅ add this if you need it
 
+    objects = GradeRangeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['min_grade', 'max_grade'], name='novae_app_game_grades'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -279,8 +568,8 @@ class Game(models.Model):
 # Student Answer
 # ---------------------------
 class StudentAnswer(models.Model):
-    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
-    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, db_constraint=False)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, db_constraint=False)
     assignment_instance = models.ForeignKey(
         AssignmentInstance,
         on_delete=models.CASCADE,
@@ -288,44 +577,482 @@ class StudentAnswer(models.Model):
     )
     text_answer = models.TextField(blank=True, null=True)
     selected_option = models.CharField(max_length=1, blank=True, null=True)
+    attempt = models.PositiveIntegerField(default=1)
+    submitted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['submitted_at']),
+            models.Index(fields=['assignment_instance', 'attempt']),
+        ]
+
+
+class AnswerSet(models.Model):
+    """
+    A whole submission packed into one row: ``answers`` maps question id
+    to the chosen letter (or the text, for TEXT questions). Written
+    instead of StudentAnswer rows when PACKED_ANSWER_STORAGE is on; see
+    novae_app.answers.
+    """
+    assignment_instance = models.ForeignKey(
+        AssignmentInstance,
+        on_delete=models.CASCADE,
+        related_name='answer_sets'
+    )
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, db_constraint=False)
+    attempt = models.PositiveIntegerField(default=1)
+    answers = models.JSONField(default=dict)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        unique_together = ('assignment_instance', 'attempt')
+
+    def __str__(self):
+        return f"{self.assignment_instance_id} attempt {self.attempt} ({len(self.answers)} answers)"
+
+
+class AnswerArchiveEntry(models.Model):
+    """
+    Where an instance's archived answers live in cold storage: a gzip
+    member at ``offset``/``length`` inside ``path`` (relative to
+    ANSWER_ARCHIVE_DIR). See novae_app.archive.
+    """
+    assignment_instance = models.ForeignKey(
+        AssignmentInstance,
+        on_delete=models.CASCADE,
+        related_name='archive_entries'
+    )
+    path = models.CharField(max_length=255)
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+    answer_count = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.assignment_instance_id} -> {self.path}@{self.offset}"
+
 
 
 
 
+# ---------------------------
+# Spaced Repetition
+# ---------------------------
+class ReviewSchedule(models.Model):
+    """
+    When a student should next see a question, scheduled with SM-2.
+    ``(student, due_date)`` is indexed so the next review is the first row
+    of an index range scan.
+    """
+    MIN_EASINESS = 1.3
+
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='review_schedule'
+    )
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    easiness = models.FloatField(default=2.5)
+    interval_days = models.PositiveIntegerField(default=0)
+    repetitions = models.PositiveIntegerField(default=0)
+    due_date = models.DateField()
+    last_reviewed = models.DateField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('student', 'question')
+        indexes = [
+            models.Index(fields=['student', 'due_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.question} (due {self.due_date})"
+
+    def record_review(self, quality, today=None):
+        """
+        Apply one SM-2 step for a recall ``quality`` from 0 (blackout) to
+        5 (perfect) and move ``due_date`` accordingly. Does not save.
+        """
+        today = today or date.today()
+        if quality >= 3:
+            if self.repetitions == 0:
+                self.interval_days = 1
+            elif self.repetitions == 1:
+                self.interval_days = 6
+            else:
+                self.interval_days = round(self.interval_days * self.easiness)
+            self.repetitions += 1
+        else:
+            self.repetitions = 0
+            self.interval_days = 1
+        self.easiness = max(
+            self.MIN_EASINESS,
+            self.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02),
+        )
+        self.last_reviewed = today
+        self.due_date = today + timedelta(days=self.interval_days)
+
+
+# ---------------------------
+# Background Jobs
+# ---------------------------
+class JobQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(status__in=[Job.QUEUED, Job.RUNNING])
+
+    def enqueue(self, task, payload=None, priority=0, delay=None, max_attempts=5, key=''):
+        """
+        Queue ``task`` to be run by a worker. With a ``key``, nothing is
+        queued while a job with the same key is still waiting or running,
+        and that job is returned instead.
+        """
+        from .tenancy import current_school  # avoids a circular import
+        if key:
+            existing = self.active().filter(key=key).first()
+            if existing is not None:
+                return existing
+        return self.create(
+            task=task,
+            payload=payload or {},
+            priority=priority,
+            max_attempts=max_attempts,
+            run_after=timezone.now() + (delay or timedelta()),
+            key=key,
+            school=current_school(),
+        )
+
+
+class Job(models.Model):
+    """
+    A unit of background work, claimed and run by ``manage.py run_worker``.
+    See novae_app.jobs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, blank=True, db_index=True)
+    school = models.ForeignKey(
+        School,
+        on_delete=models.CASCADE,
+        related_name='+',
+        null=True,
+        blank=True,
+        help_text="School whose database the job runs against."
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.SmallIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['status', 'task']),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.id} ({self.status})"
+
+
+# ---------------------------
+# Parent Digests
+# ---------------------------
+class ParentDigest(models.Model):
+    """
+    One row per weekly digest sent, so an interrupted run can pick up
+    where it stopped without emailing anyone twice.
+    """
+    parent = models.ForeignKey(
+        ParentProfile,
+        on_delete=models.CASCADE,
+        related_name='digests'
+    )
+    period_start = models.DateField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('parent', 'period_start')
+
+    def __str__(self):
+        return f"{self.parent} - week of {self.period_start}"
+
+
+# ---------------------------
+# Achievements
+# ---------------------------
+class StudentCounter(models.Model):
+    """
+    A running per-student total (assignments completed, seconds studied,
+    ...) incremented as events happen; see novae_app.achievements.
+    """
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='counters'
+    )
+    name = models.CharField(max_length=50)
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('student', 'name')
+
+    def __str__(self):
+        return f"{self.student} - {self.name}: {self.value}"
+
+
+class StudentBadge(models.Model):
+    student = models.ForeignKey(
+        StudentProfile,
+        on_delete=models.CASCADE,
+        related_name='badges'
+    )
+    code = models.CharField(max_length=50)
+    earned_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('student', 'code')
+
+    def __str__(self):
+        return f"{self.student} - {self.code}"
+
+
+# ---------------------------
+# Item Analysis
+# ---------------------------
+class QuestionStats(models.Model):
+    """
+    Psychometric statistics for one question, written in batch by the
+    ``analyze_items`` command.
+    """
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        related_name='item_stats'
+    )
+    responses = models.PositiveIntegerField(default=0)
+    # Share of responses that were correct (classical item difficulty).
+    p_value = models.FloatField(null=True, blank=True)
+    # Correlation between getting this item right and the rest score.
+    point_biserial = models.FloatField(null=True, blank=True)
+    option_a_count = models.PositiveIntegerField(default=0)
+    option_b_count = models.PositiveIntegerField(default=0)
+    option_c_count = models.PositiveIntegerField(default=0)
+    option_d_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'question stats'
+
+    def __str__(self):
+        return f"Stats for {self.question}"
+
+
 # ---------------------------
 # Auto-assign Assignments
 # ---------------------------
+def provision_assignments(students, batch_size=1000):
+    """
+    Give each student an AssignmentInstance for every assignment of their
+    school's catalog whose grade range covers their grade. Works on any
+    number of students with one read and batched inserts; instances that
+    already exist are left alone.
+    """
+    grades = {student.grade_ordinal for student in students} - {None}
+    if not grades:
+        return
+    schools = {student.school_id for student in students}
+    rows = list(Assignment.objects.for_grades(min(grades), max(grades)).filter(
+        Q(school__isnull=True) | Q(school__in=schools - {None})
+    ).values_list('id', 'min_grade', 'max_grade', 'school_id', 'replaces_id'))
+
+    by_grade = {}
+    for school_id in schools:
+        replaced = {
+            replaces for _, _, _, owner, replaces in rows
+            if school_id is not None and owner == school_id
+        }
+        for assignment_id, low, high, owner, _ in rows:
+            if owner not in (None, school_id) or assignment_id in replaced:
+                continue
+            for grade in grades.intersection(range(low, high + 1)):
+                by_grade.setdefault((school_id, grade), []).append(assignment_id)
+
+    AssignmentInstance.objects.bulk_create(
+        [
+            AssignmentInstance(assignment_id=assignment_id, student_id=student.id)
+            for student in students
+            for assignment_id in by_grade.get((student.school_id, student.grade_ordinal), ())
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    from .conditional import bump_students  # avoids a circular import
+    bump_students([student.id for student in students])
+
+
+@receiver(post_init, sender=StudentProfile)
+def remember_loaded_grade(sender, instance, **kwargs):
+    instance._loaded_grade = instance.__dict__.get('grade')
+
+
 @receiver(post_save, sender=StudentProfile)
-def auto_assign_assignments(sender, instance, **kwargs):
-    if instance.grade:
-        assignments = Assignment.objects.filter(
-            grade_level=instance.grade
+def auto_assign_assignments(sender, instance, created, **kwargs):
+    grade_changed = instance.grade != instance._loaded_grade
+    instance._loaded_grade = instance.grade
+    if instance.grade and (created or grade_changed):
+        # Run by a worker (see novae_app.tasks) rather than in the request.
+        Job.objects.enqueue(
+            'provision_assignments',
+            {'student_ids': [instance.id]},
+            key=f'provision:{instance.id}:{instance.grade}',
         )
-        for assignment in assignments:
-            AssignmentInstance.objects.get_or_create(
-                assignment=assignment,
-                student=instance
-            )
 
 
 # ---------------------------
 # Time Tracking
 # ---------------------------
+class StudySessionQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(logout_time__isnull=True)
+
+    def stale(self, cutoff):
+        """Open sessions whose last sign of life is older than ``cutoff``."""
+        return self.open().filter(
+            Q(last_heartbeat__lt=cutoff)
+            | Q(last_heartbeat__isnull=True, login_time__lt=cutoff)
+        )
+
+    def close_stale(self, cutoff):
+        """
+        Close every open session whose last sign of life is older than
+        ``cutoff``. Runs as two UPDATE statements no matter how many rows
+        match; the logout time is the last heartbeat (or the login time
+        for sessions that never sent one). Returns the number closed.
+        """
+        stale = self.stale(cutoff)
+        closed = stale.filter(last_heartbeat__isnull=False).update(
+            logout_time=F('last_heartbeat')
+        )
+        closed += stale.filter(last_heartbeat__isnull=True).update(
+            logout_time=F('login_time')
+        )
+        return closed
+
+    def totals_by_student(self):
+        """
+        Per-user study totals computed in SQL, one row per student:
+        ``{'student': id, 'sessions': n, 'total_time': timedelta}``.
+        Only closed sessions are counted.
+        """
+        return (
+            self.filter(logout_time__isnull=False)
+            .values('student')
+            .annotate(
+                sessions=Count('id'),
+                total_time=Sum(
+                    ExpressionWrapper(
+                        F('logout_time') - F('login_time'),
+                        output_field=models.DurationField(),
+                    )
+                ),
+            )
+            .order_by('student')
+        )
+
+
 class StudySession(models.Model):
-    student = models.ForeignKey(User, on_delete=models.CASCADE)
+    student = models.ForeignKey(User, on_delete=models.CASCADE, db_constraint=False)
     login_time = models.DateTimeField()
     logout_time = models.DateTimeField(null=True, blank=True)
+    last_heartbeat = models.DateTimeField(null=True, blank=True)
+
+    objects = StudySessionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'login_time']),
+            models.Index(fields=['logout_time', 'last_heartbeat']),
+        ]
 
     @property
     def duration_seconds(self):
         if self.logout_time:
             return (self.logout_time - self.login_time).total_seconds()
         return 0
-class Material(models.Model):
+
+
+STUDY_SESSION_KEY = 'study_session_id'
+STUDY_HEARTBEAT_KEY = 'study_heartbeat_at'
+
+
+@receiver(user_logged_in)
+def open_study_session(sender, request, user, **kwargs):
+    if not user.is_student():
+        return
+    now = timezone.now()
+    session = StudySession.objects.create(
+        student=user,
+        login_time=now,
+        last_heartbeat=now,
+    )
+    if request is not None and hasattr(request, 'session'):
+        request.session[STUDY_SESSION_KEY] = session.id
+        request.session[STUDY_HEARTBEAT_KEY] = now.timestamp()
+
+
+@receiver(user_logged_out)
+def close_study_session(sender, request, user, **kwargs):
+    if user is None or not user.is_student():
+        return
+    sessions = StudySession.objects.open().filter(student=user)
+    session_id = None
+    if request is not None and hasattr(request, 'session'):
+        session_id = request.session.get(STUDY_SESSION_KEY)
+    if session_id:
+        sessions = sessions.filter(id=session_id)
+    closing = list(sessions.values_list('id', flat=True))
+    if not closing:
+        return
+    closed = StudySession.objects.filter(id__in=closing)
+    closed.update(logout_time=timezone.now())
+
+    from .achievements import record_study_time  # avoids a circular import
+    record_study_time(closed)
+
+
+class Material(CatalogModel):
     title = models.CharField(max_length=200)
-    file_url = models.URLField()
+    file_url = models.URLField(blank=True)
+    file = models.FileField(
+        upload_to='materials',
+        storage=ContentHashStorage(),
+        blank=True,
+        help_text="Upload the file instead of linking to it. Identical files are stored once."
+    )
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    preview = models.FileField(
+        upload_to='previews',
+        blank=True,
+        editable=False,
+        help_text="First-page thumbnail, rendered in the background (novae_app.materials)."
+    )
     is_demo = models.BooleanField(default=False)
     is_sample = models.BooleanField(default=False)
 
@@ -338,32 +1065,37 @@ class Material(models.Model):
     def __str__(self):
         return f"{self.title} ({self.get_grade_level_display()})"
 
+    def get_absolute_url(self):
+        if self.file:
+            return reverse('material_download', args=[self.id])
+        return self.file_url
+
+    def clean(self):
+        if not self.file and not self.file_url:
+            raise ValidationError("Upload a file or give a link.")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_file = instance.__dict__.get('file')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if 'file' not in self.get_deferred_fields():
+            if not self.file:
+                self.file_size = None
+                self.preview = ''
+            elif self.file_size is None or self.file.name != getattr(self, '_loaded_file', None):
+                self.file_size = self.file.size
+        super().save(*args, **kwargs)
+        self._loaded_file = self.file.name
+
+
 class StudentDailyTime(models.Model):
-    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, db_constraint=False)
     date = models.DateField()
     time_seconds = models.PositiveIntegerField(default=0)
 
-    # ---------------------------
-    # Retake logic
-    # ---------------------------
-    def retake_allowed(self):
-        """
-        Return True if student can retake this assignment (score < 75).
-        """
-        return self.score is not None and self.score < 75
-
-    def start_retake(self):
-        """
-        Prepare this instance for a retake.
-        """
-        self.completed = False
-        self.score = None
-        self.feedback = ""
-        self.attempts += 1
-        self.save()
-
-from django.db import models
-from django.conf import settings
 
 class StudyPlan(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
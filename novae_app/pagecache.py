@@ -0,0 +1,152 @@
+"""
+Whole-page cache for anonymous visitors.
+
+Marketing pages and assignment previews are the same for every anonymous
+visitor, so ``@cache_anonymous_page`` keeps the rendered response in the
+cache, keyed by host and path. The query string is ignored, so campaign
+links share one entry. A hit costs two cache reads and no database
+queries. Logged-in users always get a fresh page, marked private.
+
+Entries belong to a scope ("site" by default, ``assignment:<id>`` for
+previews) whose version is part of the key. Saving or deleting an
+Assignment or one of its Questions moves that assignment's version on, so
+stale previews simply stop being found. Any catalog change also moves
+the "catalog" scope, which novae_app.conditional folds into the ETags of
+student pages. Versions are timestamps, so a version lost from the cache
+can never come back as an older one.
+
+A response is never stored if it used the CSRF token or set a cookie,
+because it would hand one visitor's token or cookie to everybody.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from .models import Assignment, Course, Material, Question
+
+
+SITE_SCOPE = 'site'
+CATALOG_SCOPE = 'catalog'
+CACHEABLE_STATUSES = {200, 301, 302}
+STORED_HEADERS = ('Content-Type', 'Location')
+
+
+def page_cache_timeout():
+    return getattr(settings, 'PAGE_CACHE_TIMEOUT', 10 * 60)
+
+
+def page_max_age():
+    return getattr(settings, 'PAGE_CACHE_MAX_AGE', 5 * 60)
+
+
+def scope_key(scope):
+    return f'page-version:{scope}'
+
+
+def scope_version(scope):
+    key = scope_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_scope(scope):
+    cache.set(scope_key(scope), time.time_ns(), None)
+
+
+def _page_key(request, scope):
+    location = hashlib.sha256(f'{request.get_host()}{request.path}'.encode('utf-8')).hexdigest()
+    return f'page:{scope}:{scope_version(scope)}:{location}'
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code in CACHEABLE_STATUSES
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _public(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=page_max_age())
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _from_entry(request, entry):
+    status, content, headers, etag = entry
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        return _public(HttpResponseNotModified(), etag)
+    response = HttpResponse(content, status=status)
+    for name, value in headers.items():
+        response[name] = value
+    return _public(response, etag)
+
+
+def cache_anonymous_page(scope=None):
+    """
+    Cache the view's response for anonymous GET/HEAD requests. ``scope``
+    maps the view's arguments to a scope name; it defaults to "site".
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                response = view(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                return response
+
+            key = _page_key(request, scope(*args, **kwargs) if scope else SITE_SCOPE)
+            entry = cache.get(key)
+            if entry is not None:
+                return _from_entry(request, entry)
+
+            response = view(request, *args, **kwargs)
+            if request.method != 'GET' or not _cacheable(request, response):
+                return response
+            etag = quote_etag(hashlib.md5(response.content, usedforsecurity=False).hexdigest())
+            entry = (
+                response.status_code,
+                response.content,
+                {name: response[name] for name in STORED_HEADERS if response.has_header(name)},
+                etag,
+            )
+            cache.set(key, entry, page_cache_timeout())
+            return _public(response, etag)
+        return wrapper
+    return decorator
+
+
+def assignment_scope(assignment_id):
+    return f'assignment:{assignment_id}'
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+def forget_assignment_pages(sender, instance, **kwargs):
+    bump_scope(assignment_scope(instance.id))
+    bump_scope(CATALOG_SCOPE)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def forget_question_pages(sender, instance, **kwargs):
+    if instance.assignment_id:
+        bump_scope(assignment_scope(instance.assignment_id))
+    bump_scope(CATALOG_SCOPE)
+
+
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Material)
+def forget_catalog_pages(sender, instance, **kwargs):
+    bump_scope(CATALOG_SCOPE)
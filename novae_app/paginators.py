@@ -0,0 +1,65 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+# Tables smaller than this are counted exactly; COUNT(*) is cheap there.
+ESTIMATE_THRESHOLD = 10000
+# Filtered changelists stop counting after this many rows.
+COUNT_CAP = 100000
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Cheap row-count estimate for ``model``'s table, or None if the database
+    has no way to give one without scanning.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [table],
+            )
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                "SELECT table_rows FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = %s",
+                [table],
+            )
+        elif connection.vendor == 'sqlite':
+            # MAX() on the integer primary key is a single b-tree lookup.
+            cursor.execute(
+                "SELECT MAX(%s) FROM %s" % (
+                    connection.ops.quote_name(model._meta.pk.column),
+                    connection.ops.quote_name(table),
+                )
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    return max(int(row[0]), 0)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists over very large tables.
+
+    An unfiltered list uses the database's row estimate instead of a full
+    COUNT(*). A filtered list is counted exactly, but only up to COUNT_CAP
+    rows, so a broad filter never turns into a full scan just to draw the
+    page links.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, using=queryset.db)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+            return super().count
+        return queryset.order_by()[:COUNT_CAP].count()
@@ -0,0 +1,268 @@
+"""
+Request profiling and the slow-query log.
+
+Profiles: a staff member adds ``?profile=sample`` (or ``profile=cprofile``)
+to a URL, or sends the same value in an ``X-Profile`` header, and that one
+request runs under a profiler (see ProfilingMiddleware). The profile is
+written to PROFILE_DIR and named in the response's ``X-Profile-File``
+header; with ``profile_download=1`` (or ``X-Profile-Download: 1``) it is
+sent back instead of the page. Only the newest PROFILE_KEEP profiles are
+kept; older ones are deleted as new ones are written.
+
+* ``sample``: a thread reads the request thread's stack every
+  PROFILE_SAMPLE_INTERVAL seconds and counts identical stacks. The result
+  is in the folded format (``outer;inner;leaf <count>`` per line) that
+  flamegraph.pl, speedscope and inferno read directly. Overhead is low
+  and does not distort fast functions.
+* ``cprofile``: cProfile, every call, saved as pstats (``.prof``) for
+  snakeviz, gprof2dot or ``python -m pstats``.
+
+Slow queries: every database connection runs its queries through
+``log_slow_queries``. Anything slower than SLOW_QUERY_SECONDS is logged
+to the ``novae_app.slow_queries`` logger as one JSON line. The line holds
+the SQL, its duration, the query plan (``EXPLAIN QUERY PLAN`` on SQLite),
+where it came from (the view name, or ``task:<name>`` in the worker) and
+the project frames of the stack. Settings send that logger to a rotating
+file.
+"""
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils import timezone
+
+
+slow_query_logger = logging.getLogger('novae_app.slow_queries')
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'X-Profile'
+DOWNLOAD_PARAM = 'profile_download'
+DOWNLOAD_HEADER = 'X-Profile-Download'
+PROFILE_MODES = ('sample', 'cprofile')
+PROFILE_EXTENSIONS = ('.prof', '.folded')
+STACK_FRAMES = 8
+MAX_LOGGED_SQL = 4000
+EXPLAINABLE_RE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b', re.IGNORECASE)
+
+# What the current queries are running for: a view name or a task.
+_origin = ContextVar('novae_query_origin', default=None)
+# Set while the slow-query log runs its own EXPLAIN.
+_explaining = ContextVar('novae_explaining', default=False)
+
+
+@contextmanager
+def query_origin(name):
+    """Attribute the queries run inside the block to ``name``."""
+    token = _origin.set(name)
+    try:
+        yield
+    finally:
+        _origin.reset(token)
+
+
+def set_query_origin(name):
+    _origin.set(name)
+
+
+# ---------------------------
+# Request profiles
+# ---------------------------
+def profile_dir():
+    return getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def profile_keep():
+    return getattr(settings, 'PROFILE_KEEP', 100)
+
+
+def requested_mode(request):
+    """The profiler a request asks for, or None."""
+    mode = request.GET.get(PROFILE_PARAM) or request.headers.get(PROFILE_HEADER)
+    if mode in ('1', 'true'):
+        mode = 'sample'
+    return mode if mode in PROFILE_MODES else None
+
+
+def wants_download(request):
+    return bool(request.GET.get(DOWNLOAD_PARAM) or request.headers.get(DOWNLOAD_HEADER))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', '?')
+    return f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+
+
+class StackSampler:
+    """Counts the folded stacks of one thread, sampled from another."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[';'.join(reversed(labels))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _profile_path(request, extension):
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    os.makedirs(profile_dir(), exist_ok=True)
+    return os.path.join(profile_dir(), f'{stamp}-{slug[:80]}.{extension}')
+
+
+def prune_profiles(keep_path):
+    """Delete all but the newest PROFILE_KEEP profiles, never ``keep_path``."""
+    # Names start with a timestamp, so they sort oldest first.
+    names = sorted(
+        name for name in os.listdir(profile_dir()) if name.endswith(PROFILE_EXTENSIONS)
+    )
+    for name in names[:max(len(names) - profile_keep(), 0)]:
+        path = os.path.join(profile_dir(), name)
+        if path != keep_path:
+            with suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def profile_request(request, get_response, mode):
+    """
+    Run ``get_response(request)`` under the ``mode`` profiler. Returns the
+    response and the path the profile was saved to.
+    """
+    response, path = _run_profiled(request, get_response, mode)
+    prune_profiles(path)
+    return response, path
+
+
+def _run_profiled(request, get_response, mode):
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        path = _profile_path(request, 'prof')
+        profiler.dump_stats(path)
+        return response, path
+
+    interval = getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.001)
+    with StackSampler(threading.get_ident(), interval) as sampler:
+        response = get_response(request)
+    path = _profile_path(request, 'folded')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(sampler.folded())
+    return response, path
+
+
+def profile_download(path):
+    content_type = 'application/octet-stream' if path.endswith('.prof') else 'text/plain; charset=utf-8'
+    with open(path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{os.path.basename(path)}"'
+    return response
+
+
+# ---------------------------
+# Slow queries
+# ---------------------------
+def slow_query_seconds():
+    return getattr(settings, 'SLOW_QUERY_SECONDS', None)
+
+
+def _stack_summary():
+    """The innermost project frames of the current stack, as ``file:line in func``."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root)
+        and frame.filename != __file__
+        and f'{os.sep}site-packages{os.sep}' not in frame.filename
+    ]
+    return [
+        f'{os.path.relpath(frame.filename, root)}:{frame.lineno} in {frame.name}'
+        for frame in frames[-STACK_FRAMES:]
+    ]
+
+
+def _query_plan(connection, sql, params):
+    token = _explaining.set(True)
+    try:
+        # A savepoint keeps a failed EXPLAIN from breaking the caller's transaction.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return [f'(no plan: {exc})']
+    finally:
+        _explaining.reset(token)
+    # SQLite rows are (id, parent, notused, detail); other backends give text.
+    return [row[-1] for row in rows]
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    """Execute wrapper logging queries slower than SLOW_QUERY_SECONDS."""
+    threshold = slow_query_seconds()
+    if threshold is None or _explaining.get():
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - start
+    if duration >= threshold:
+        connection = context['connection']
+        plan = None
+        if not many and EXPLAINABLE_RE.match(sql) and not connection.needs_rollback:
+            plan = _query_plan(connection, sql, params)
+        slow_query_logger.warning(json.dumps({
+            'at': timezone.now().isoformat(),
+            'ms': round(duration * 1000, 1),
+            'database': connection.alias,
+            'origin': _origin.get(),
+            'sql': sql[:MAX_LOGGED_SQL],
+            'params': None if many else repr(params)[:MAX_LOGGED_SQL],
+            'plan': plan,
+            'stack': _stack_summary(),
+        }))
+    return result
+
+
+@receiver(connection_created)
+def install_slow_query_log(sender, connection, **kwargs):
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
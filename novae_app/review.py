@@ -0,0 +1,64 @@
+"""
+Spaced-repetition scheduling for the daily quiz.
+
+Each student has a ReviewSchedule row per question they have seen. The
+next question is the earliest due one, found with an index range scan on
+``(student, due_date)``; when nothing is due the student gets the first
+question they have never seen, picked with an anti-join instead of
+loading the question bank. Answering writes exactly one schedule row,
+locked while it is updated so a double submit cannot insert a second.
+"""
+from datetime import date
+
+from django.db import transaction
+
+from .models import Assignment, Question, ReviewSchedule
+
+
+# SM-2 recall quality for a right / wrong answer on a multiple-choice item.
+QUALITY_CORRECT = 4
+QUALITY_WRONG = 1
+
+
+def quiz_questions(school=None, paid=False):
+    """
+    Questions the daily quiz can ask (it only renders options A-D), taken
+    from the assignments ``school``'s catalog shows; only demo ones unless
+    ``paid``, as on the student dashboard.
+    """
+    assignments = Assignment.objects.for_school(school)
+    if not paid:
+        assignments = assignments.filter(is_demo=True)
+    return Question.objects.filter(
+        question_type='MC', correct_option__isnull=False, assignment__in=assignments
+    )
+
+
+def next_question(student, today=None):
+    """The question ``student`` should review next, or None if none is due."""
+    today = today or date.today()
+    questions = quiz_questions(student.school_id, paid=True)
+    due = (
+        ReviewSchedule.objects.filter(
+            student=student, due_date__lte=today, question__in=questions
+        )
+        .select_related('question')
+        .order_by('due_date', 'id')
+        .first()
+    )
+    if due is not None:
+        return due.question
+    seen = ReviewSchedule.objects.filter(student=student).values('question_id')
+    return questions.exclude(id__in=seen).order_by('id').first()
+
+
+def record_answer(student, question, correct, today=None):
+    """Fold one answer into the student's schedule for ``question``."""
+    today = today or date.today()
+    with transaction.atomic():
+        schedule, _ = ReviewSchedule.objects.select_for_update().get_or_create(
+            student=student, question=question, defaults={'due_date': today}
+        )
+        schedule.record_review(QUALITY_CORRECT if correct else QUALITY_WRONG, today)
+        schedule.save()
+    return schedule
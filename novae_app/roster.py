@@ -0,0 +1,196 @@
+"""
+Bulk roster import for schools.
+
+The CSV has one row per child; parent columns repeat for every child of
+the same family::
+
+    parent_username,parent_email,parent_password,parent_phone,child_username,child_password,child_grade
+
+Passwords are hashed across a process pool (hashing is deliberately slow
+and CPU bound, so it parallelises well), then users, profiles, billing
+profiles and parent-child links are written with ``bulk_create``. That
+skips the per-row post_save receivers, so billing profiles are created
+here and assignments are provisioned in one batched pass at the end.
+
+A file is one school's roster: the caller names the school, and every
+parent and student in it joins that school, with their assignments in
+its database (see novae_app.tenancy).
+"""
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+
+from .models import (
+    GRADE_LEVEL_CHOICES,
+    BillingProfile,
+    ParentProfile,
+    StudentProfile,
+    User,
+    ordinal_for_grade,
+    provision_assignments,
+)
+from .tenancy import atomic_student_data, use_school
+
+
+REQUIRED_COLUMNS = (
+    'parent_username',
+    'parent_email',
+    'parent_password',
+    'child_username',
+    'child_password',
+    'child_grade',
+)
+VALID_GRADES = {value for value, _ in GRADE_LEVEL_CHOICES}
+
+
+@dataclass
+class RosterResult:
+    parents: int = 0
+    students: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured.
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash ``passwords`` in parallel, preserving order."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def read_roster(stream):
+    """
+    Parse and validate the CSV. Returns ``(families, errors)`` where
+    ``families`` maps parent username to ``{'parent': row, 'children': [...]}``.
+    """
+    reader = csv.DictReader(stream)
+    missing = [name for name in REQUIRED_COLUMNS if name not in (reader.fieldnames or ())]
+    if missing:
+        return {}, [(1, f"missing column(s): {', '.join(missing)}")]
+
+    families = {}
+    errors = []
+    seen_children = set()
+    for line_number, row in enumerate(reader, start=2):
+        row = {key: (value or '').strip() for key, value in row.items() if key}
+        empty = [name for name in REQUIRED_COLUMNS if not row.get(name)]
+        if empty:
+            errors.append((line_number, f"empty field(s): {', '.join(empty)}"))
+            continue
+        if row['child_grade'] not in VALID_GRADES:
+            errors.append((line_number, f"unknown grade {row['child_grade']!r}"))
+            continue
+        if row['child_username'] in seen_children or row['child_username'] in families:
+            errors.append((line_number, f"duplicate username {row['child_username']!r}"))
+            continue
+        if row['parent_username'] in seen_children:
+            errors.append((line_number, f"duplicate username {row['parent_username']!r}"))
+            continue
+        seen_children.add(row['child_username'])
+        family = families.setdefault(row['parent_username'], {'parent': row, 'children': []})
+        family['children'].append(row)
+    return families, errors
+
+
+def _drop_existing_usernames(families, errors):
+    usernames = set(families)
+    for family in families.values():
+        usernames.update(child['child_username'] for child in family['children'])
+    taken = set(
+        User.objects.filter(username__in=usernames).values_list('username', flat=True)
+    )
+    if not taken:
+        return families
+    kept = {}
+    for parent_username, family in families.items():
+        clashes = taken.intersection(
+            [parent_username] + [c['child_username'] for c in family['children']]
+        )
+        if clashes:
+            errors.append((None, f"family {parent_username!r} skipped, username(s) "
+                                 f"already taken: {', '.join(sorted(clashes))}"))
+        else:
+            kept[parent_username] = family
+    return kept
+
+
+def import_roster(stream, workers=None, school=None):
+    """
+    Import families from a CSV stream into ``school`` (None for none).
+    Returns a RosterResult.
+    """
+    families, errors = read_roster(stream)
+    result = RosterResult(errors=errors)
+    families = _drop_existing_usernames(families, result.errors)
+    if not families:
+        return result
+
+    parent_rows = [family['parent'] for family in families.values()]
+    child_rows = [child for family in families.values() for child in family['children']]
+    hashes = hash_passwords(
+        [row['parent_password'] for row in parent_rows]
+        + [row['child_password'] for row in child_rows],
+        workers=workers,
+    )
+    parent_hashes, child_hashes = hashes[:len(parent_rows)], hashes[len(parent_rows):]
+
+    with use_school(school), atomic_student_data():
+        parent_users = User.objects.bulk_create([
+            User(
+                username=row['parent_username'],
+                email=row['parent_email'],
+                password=password,
+                role='parent',
+            )
+            for row, password in zip(parent_rows, parent_hashes)
+        ])
+        child_users = User.objects.bulk_create([
+            User(username=row['child_username'], password=password, role='student')
+            for row, password in zip(child_rows, child_hashes)
+        ])
+        BillingProfile.objects.bulk_create(
+            [BillingProfile(user=user) for user in parent_users + child_users]
+        )
+        parents = ParentProfile.objects.bulk_create([
+            ParentProfile(
+                user=user, phone_number=row.get('parent_phone') or None, school=school
+            )
+            for row, user in zip(parent_rows, parent_users)
+        ])
+        students = StudentProfile.objects.bulk_create([
+            StudentProfile(
+                user=user,
+                grade=row['child_grade'],
+                grade_ordinal=ordinal_for_grade(row['child_grade']),
+                school=school,
+            )
+            for row, user in zip(child_rows, child_users)
+        ])
+
+        student_by_username = {
+            row['child_username']: student for row, student in zip(child_rows, students)
+        }
+        Link = ParentProfile.children.through
+        Link.objects.bulk_create([
+            Link(parentprofile_id=parent.id,
+                 studentprofile_id=student_by_username[child['child_username']].id)
+            for parent, family in zip(parents, families.values())
+            for child in family['children']
+        ])
+
+        provision_assignments(students)
+
+    result.parents = len(parents)
+    result.students = len(students)
+    return result
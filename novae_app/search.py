@@ -0,0 +1,293 @@
+"""
+Full-text search over the catalog and students' study plans.
+
+Backed by the SQLite FTS5 table ``novae_search`` (migrations 0004, 0019
+and 0020). Triggers on the source tables (installed after every migrate) keep
+it current, including for ``bulk_create`` and ``QuerySet.update()``, so
+nothing has to be called on save. Each indexed row carries the columns
+the visibility rules need (grade range, owning school, whether it is
+free, owner), so filtering happens inside the one search query.
+
+On other database backends search is disabled and returns no results.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Lesson, Material
+
+
+SEARCH_TABLE = 'novae_search'
+
+# rowid = object id * KIND_SLOTS + kind code, so a source row maps to its
+# index row without a lookup.
+KIND_SLOTS = 8
+KIND_CODES = {
+    'course': 1,
+    'lesson': 2,
+    'assignment': 3,
+    'material': 4,
+    'studyplan': 5,
+}
+
+MAX_TERMS = 8
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+# Per source table: kind, then the SQL for title, body, min_grade,
+# max_grade, school_id, is_free and owner_id in terms of the row (``NEW``).
+SOURCES = {
+    'novae_app_course': (
+        'course', 'NEW.title', 'NEW.description', 'NEW.min_grade', 'NEW.max_grade',
+        'NEW.school_id', 'NEW.is_demo', 'NULL',
+    ),
+    'novae_app_lesson': (
+        'lesson', 'NEW.title', 'NEW.content',
+        '(SELECT min_grade FROM novae_app_course WHERE id = NEW.course_id)',
+        '(SELECT max_grade FROM novae_app_course WHERE id = NEW.course_id)',
+        '(SELECT school_id FROM novae_app_course WHERE id = NEW.course_id)',
+        'NEW.is_sample', 'NULL',
+    ),
+    'novae_app_assignment': (
+        'assignment', 'NEW.title', "COALESCE(NEW.description, '')",
+        'NEW.min_grade', 'NEW.max_grade', 'NEW.school_id',
+        '(NEW.is_demo OR NEW.is_sample)', 'NULL',
+    ),
+    'novae_app_material': (
+        'material', 'NEW.title', "''", 'NEW.min_grade', 'NEW.max_grade',
+        'NEW.school_id', '(NEW.is_demo OR NEW.is_sample)', 'NULL',
+    ),
+    'novae_app_studyplan': (
+        'studyplan', 'NEW.title',
+        "NEW.subject || ' ' || NEW.class_name || ' ' || NEW.content || ' ' || NEW.notes",
+        'NULL', 'NULL', 'NULL', '0', 'NEW.user_id',
+    ),
+}
+INDEX_COLUMNS = (
+    '(rowid, kind, object_id, title, body, min_grade, max_grade, school_id, is_free, owner_id)'
+)
+
+# Per kind, the ids of shared rows a school (``%s``) shows its own row
+# instead of; a lesson is hidden with its course.
+REPLACED_SQL = {
+    'course': (
+        "SELECT replaces_id FROM novae_app_course "
+        "WHERE school_id = %s AND replaces_id IS NOT NULL"
+    ),
+    'lesson': (
+        "SELECT l.id FROM novae_app_lesson l "
+        "JOIN novae_app_course c ON c.replaces_id = l.course_id WHERE c.school_id = %s"
+    ),
+    'assignment': (
+        "SELECT replaces_id FROM novae_app_assignment "
+        "WHERE school_id = %s AND replaces_id IS NOT NULL"
+    ),
+    'material': (
+        "SELECT replaces_id FROM novae_app_material "
+        "WHERE school_id = %s AND replaces_id IS NOT NULL"
+    ),
+}
+
+
+def _index_row_sql(kind, *columns):
+    code = KIND_CODES[kind]
+    return (
+        f"INSERT INTO {SEARCH_TABLE} {INDEX_COLUMNS} "
+        f"VALUES (NEW.id * {KIND_SLOTS} + {code}, '{kind}', NEW.id, "
+        f"{', '.join(columns)});"
+    )
+
+
+def trigger_statements():
+    for table, (kind, *columns) in SOURCES.items():
+        insert = _index_row_sql(kind, *columns)
+        delete = (
+            f"DELETE FROM {SEARCH_TABLE} "
+            f"WHERE rowid = OLD.id * {KIND_SLOTS} + {KIND_CODES[kind]};"
+        )
+        yield (f"CREATE TRIGGER IF NOT EXISTS {table}_search_ai "
+               f"AFTER INSERT ON {table} BEGIN {insert} END")
+        yield (f"CREATE TRIGGER IF NOT EXISTS {table}_search_ad "
+               f"AFTER DELETE ON {table} BEGIN {delete} END")
+        yield (f"CREATE TRIGGER IF NOT EXISTS {table}_search_au "
+               f"AFTER UPDATE ON {table} BEGIN {delete} {insert} END")
+
+    # Lessons are indexed with their course's grade range and school.
+    yield (
+        "CREATE TRIGGER IF NOT EXISTS novae_app_course_search_lessons "
+        "AFTER UPDATE OF min_grade, max_grade, school_id ON novae_app_course BEGIN "
+        f"UPDATE {SEARCH_TABLE} SET min_grade = NEW.min_grade, "
+        "max_grade = NEW.max_grade, school_id = NEW.school_id WHERE rowid IN "
+        f"(SELECT id * {KIND_SLOTS} + {KIND_CODES['lesson']} "
+        "FROM novae_app_lesson WHERE course_id = NEW.id); END"
+    )
+
+
+def _table_exists(cursor):
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+        [SEARCH_TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def install_triggers(using=None, **kwargs):
+    """
+    (Re)create the index triggers. SQLite drops a table's triggers when a
+    migration rebuilds the table, so this runs after every migrate.
+    """
+    db = connections[using or DEFAULT_DB_ALIAS]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        if not _table_exists(cursor):
+            return
+        for statement in trigger_statements():
+            cursor.execute(statement)
+
+
+def _populate_sql():
+    for table, (kind, *columns) in SOURCES.items():
+        values = [column.replace('NEW.', 't.') for column in columns]
+        yield (
+            f"INSERT INTO {SEARCH_TABLE} {INDEX_COLUMNS} "
+            f"SELECT t.id * {KIND_SLOTS} + {KIND_CODES[kind]}, '{kind}', t.id, "
+            f"{', '.join(values)} FROM {table} t"
+        )
+
+
+@dataclass
+class SearchResult:
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+    url: str = ''
+
+    @property
+    def label(self):
+        return 'Study plan' if self.kind == 'studyplan' else self.kind.capitalize()
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must appear,
+    and the last characters typed may be the start of a longer word.
+    User input never reaches FTS5 syntax unquoted.
+    """
+    terms = re.findall(r'\w+', text or '')[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _highlight(text):
+    return mark_safe(
+        escape(text)
+        .replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search(text, user=None, grade=None, paid=False, school=None, limit=20):
+    """
+    Ranked search visible to ``user``. Catalog rows are the ones ``school``
+    (a School, an id or None) sees, as in ``CatalogQuerySet.for_school``,
+    limited to those whose grade range covers ``grade``, an ordinal (rows
+    without a grade always match), and, unless ``paid``, to free
+    demo/sample content; study plans only match their owner.
+    """
+    match = build_match_query(text)
+    if not match or not is_available():
+        return []
+
+    visibility = ['owner_id IS NULL']
+    params = [match]
+    school_id = getattr(school, 'pk', school)
+    if school_id is None:
+        visibility.append('school_id IS NULL')
+    else:
+        visibility.append('(school_id IS NULL OR school_id = %s)')
+        params.append(school_id)
+        for kind, replaced in REPLACED_SQL.items():
+            visibility.append(f"NOT (kind = '{kind}' AND object_id IN ({replaced}))")
+            params.append(school_id)
+    if grade is not None:
+        visibility.append('(min_grade IS NULL OR (min_grade <= %s AND max_grade >= %s))')
+        params += [grade, grade]
+    if not paid:
+        visibility.append('is_free = 1')
+    where = '(' + ' AND '.join(visibility) + ')'
+    if user is not None and user.is_authenticated and paid:
+        where = f'({where} OR owner_id = %s)'
+        params.append(user.id)
+    params.append(limit)
+
+    sql = f"""
+        SELECT kind, object_id,
+               highlight({SEARCH_TABLE}, 2, %s, %s),
+               snippet({SEARCH_TABLE}, 3, %s, %s, '…', 16)
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH %s AND {where}
+        ORDER BY bm25({SEARCH_TABLE}, 0.0, 0.0, 10.0, 1.0)
+        LIMIT %s
+    """
+    marks = [HIGHLIGHT_START, HIGHLIGHT_END]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, marks + marks + params)
+        rows = cursor.fetchall()
+
+    results = [
+        SearchResult(kind, int(object_id), _highlight(title), _highlight(snippet))
+        for kind, object_id, title, snippet in rows
+    ]
+    _attach_urls(results, school_id)
+    return results
+
+
+def _attach_urls(results, school):
+    material_ids = [r.object_id for r in results if r.kind == 'material']
+    material_urls = {
+        material_id: reverse('material_download', args=[material_id]) if stored else url
+        for material_id, stored, url in Material.objects.for_school(school).filter(
+            id__in=material_ids
+        ).values_list('id', 'file', 'file_url')
+    } if material_ids else {}
+
+    lesson_ids = [r.object_id for r in results if r.kind == 'lesson']
+    lesson_courses = dict(
+        Lesson.objects.filter(id__in=lesson_ids).values_list('id', 'course_id')
+    ) if lesson_ids else {}
+
+    for result in results:
+        if result.kind == 'course':
+            result.url = reverse('course_detail', args=[result.object_id])
+        elif result.kind == 'lesson' and result.object_id in lesson_courses:
+            result.url = reverse(
+                'lesson_detail', args=[lesson_courses[result.object_id], result.object_id]
+            )
+        elif result.kind == 'assignment':
+            result.url = reverse('assignment_preview', args=[result.object_id])
+        elif result.kind == 'material':
+            result.url = material_urls.get(result.object_id, '')
+        elif result.kind == 'studyplan':
+            result.url = reverse('study_plan_edit', args=[result.object_id])
+
+
+def rebuild_index():
+    """Drop every indexed row and re-read all sources. Returns the row count."""
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        for statement in _populate_sql():
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,211 @@
+"""
+Incrementally maintained per-assignment score statistics.
+
+Every time an instance's score appears, changes or disappears the matching
+AssignmentStats row is adjusted in place: count, sum and sum of squares
+(for mean and variance), min/max and a 10-band histogram. That is one row
+read and one row write per graded instance. The only exception is removing
+the current min or max, which needs one indexed MIN/MAX over the
+assignment's instances to find the new extreme. With TENANT_DATABASES
+the instances are spread over the school databases while the stats row is
+shared, so that MIN/MAX and the full recomputation read every one of them.
+
+``rebuild_assignment_stats`` recomputes everything from scratch to check
+or repair the running values.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import HISTOGRAM_BUCKETS, AssignmentInstance, AssignmentStats
+from .tenancy import student_databases
+
+
+_UNTRACKED = object()
+
+
+def bucket_for(score):
+    return min(int(Decimal(score) // 10), HISTOGRAM_BUCKETS - 1)
+
+
+def _empty_histogram():
+    return [0] * HISTOGRAM_BUCKETS
+
+
+def _add(stats, score):
+    value = float(score)
+    stats.count += 1
+    stats.score_sum += value
+    stats.score_sq_sum += value * value
+    stats.histogram[bucket_for(score)] += 1
+    if stats.min_score is None or score < stats.min_score:
+        stats.min_score = score
+    if stats.max_score is None or score > stats.max_score:
+        stats.max_score = score
+
+
+def _remove(stats, score):
+    """Returns True if the min/max may have moved and must be re-read."""
+    value = float(score)
+    stats.count = max(stats.count - 1, 0)
+    stats.score_sum -= value
+    stats.score_sq_sum -= value * value
+    bucket = bucket_for(score)
+    stats.histogram[bucket] = max(stats.histogram[bucket] - 1, 0)
+    if not stats.count:
+        stats.score_sum = stats.score_sq_sum = 0.0
+        stats.min_score = stats.max_score = None
+        return False
+    return score == stats.min_score or score == stats.max_score
+
+
+def apply_score_changes(changes):
+    """
+    Fold ``(assignment_id, old_score, new_score)`` changes into the stats
+    rows. Either score may be None (not graded before / not any more).
+    """
+    by_assignment = defaultdict(list)
+    for assignment_id, old_score, new_score in changes:
+        if old_score != new_score:
+            by_assignment[assignment_id].append((old_score, new_score))
+    if not by_assignment:
+        return
+
+    with transaction.atomic():
+        existing = {
+            stats.assignment_id: stats
+            for stats in AssignmentStats.objects.select_for_update().filter(
+                assignment_id__in=by_assignment
+            )
+        }
+        for assignment_id, assignment_changes in by_assignment.items():
+            stats = existing.get(assignment_id)
+            if stats is None:
+                if all(new is None for _, new in assignment_changes):
+                    # Nothing to add (e.g. the assignment is being deleted).
+                    continue
+                stats = AssignmentStats(assignment_id=assignment_id)
+            if len(stats.histogram) != HISTOGRAM_BUCKETS:
+                stats.histogram = _empty_histogram()
+
+            extremes_stale = False
+            for old_score, new_score in assignment_changes:
+                if old_score is not None:
+                    extremes_stale |= _remove(stats, old_score)
+                if new_score is not None:
+                    _add(stats, new_score)
+
+            if extremes_stale and stats.count:
+                stats.min_score, stats.max_score = score_bounds(assignment_id)
+            stats.save()
+
+
+def score_bounds(assignment_id):
+    """Lowest and highest score of an assignment over every student database."""
+    lows, highs = [], []
+    for alias in student_databases():
+        bounds = AssignmentInstance.objects.using(alias).filter(
+            assignment_id=assignment_id, score__isnull=False
+        ).aggregate(low=Min('score'), high=Max('score'))
+        if bounds['low'] is not None:
+            lows.append(bounds['low'])
+            highs.append(bounds['high'])
+    return (min(lows), max(highs)) if lows else (None, None)
+
+
+def compute_all_stats(assignment_ids=None):
+    """
+    Statistics recomputed from AssignmentInstance in one grouped query per
+    student database, as unsaved AssignmentStats keyed by assignment id.
+    """
+    score = Cast('score', FloatField())
+    bands = {
+        f'band_{band}': Count(
+            'id',
+            filter=Q(score__gte=band * 10) & (
+                Q(score__lt=(band + 1) * 10) if band < HISTOGRAM_BUCKETS - 1 else Q()
+            ),
+        )
+        for band in range(HISTOGRAM_BUCKETS)
+    }
+    instances = AssignmentInstance.objects.filter(score__isnull=False)
+    if assignment_ids is not None:
+        instances = instances.filter(assignment_id__in=assignment_ids)
+    instances = instances.values('assignment_id').annotate(
+        count=Count('id'),
+        score_sum=Sum(score),
+        score_sq_sum=Sum(score * score),
+        min_score=Min('score'),
+        max_score=Max('score'),
+        **bands,
+    ).order_by('assignment_id')
+
+    result = {}
+    for alias in student_databases():
+        for row in instances.using(alias):
+            stats = result.get(row['assignment_id'])
+            if stats is None:
+                stats = result[row['assignment_id']] = AssignmentStats(
+                    assignment_id=row['assignment_id'], histogram=_empty_histogram()
+                )
+            stats.count += row['count']
+            stats.score_sum += row['score_sum'] or 0.0
+            stats.score_sq_sum += row['score_sq_sum'] or 0.0
+            stats.min_score = min(
+                (value for value in (stats.min_score, row['min_score']) if value is not None),
+                default=None,
+            )
+            stats.max_score = max(
+                (value for value in (stats.max_score, row['max_score']) if value is not None),
+                default=None,
+            )
+            for band in range(HISTOGRAM_BUCKETS):
+                stats.histogram[band] += row[f'band_{band}']
+    return result
+
+
+def stats_differ(stored, fresh, tolerance=1e-6):
+    if stored.count != fresh.count or stored.histogram != fresh.histogram:
+        return True
+    if stored.min_score != fresh.min_score or stored.max_score != fresh.max_score:
+        return True
+    return (
+        abs(stored.score_sum - fresh.score_sum) > tolerance * max(1.0, abs(fresh.score_sum))
+        or abs(stored.score_sq_sum - fresh.score_sq_sum) > tolerance * max(1.0, abs(fresh.score_sq_sum))
+    )
+
+
+# ---------------------------
+# Signal wiring
+# ---------------------------
+@receiver(post_init, sender=AssignmentInstance)
+def remember_loaded_score(sender, instance, **kwargs):
+    # Deferred scores are not tracked; reading them here would cost a query.
+    instance._stats_score = instance.__dict__.get('score', _UNTRACKED)
+
+
+@receiver(post_save, sender=AssignmentInstance)
+def update_stats_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'score' not in update_fields:
+        return
+    old_score = None if created else instance._stats_score
+    if old_score is _UNTRACKED:
+        return
+    new_score = instance.score
+    if new_score is not None:
+        new_score = Decimal(new_score).quantize(Decimal('0.01'))
+    if old_score != new_score:
+        apply_score_changes([(instance.assignment_id, old_score, new_score)])
+    instance._stats_score = new_score
+
+
+@receiver(post_delete, sender=AssignmentInstance)
+def update_stats_on_delete(sender, instance, **kwargs):
+    old_score = instance._stats_score
+    if old_score is not _UNTRACKED and old_score is not None:
+        apply_score_changes([(instance.assignment_id, old_score, None)])
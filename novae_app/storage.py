@@ -0,0 +1,38 @@
+"""
+File storage named by content.
+
+Uploads are stored as ``<upload_to>/<aa>/<sha256><ext>``. The hash is read
+from the upload in chunks, so memory stays flat whatever the size, and a
+file that is already on disk is not written a second time: uploading the
+same worksheet to ten materials keeps one copy. Since a stored file may
+belong to several rows, nothing deletes them when a row goes away.
+"""
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        digest = digest.hexdigest()
+        name = os.path.join(directory, digest[:2], f'{digest}{extension}')
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+def content_hash(name):
+    """The hash a ContentHashStorage name was stored under."""
+    return os.path.splitext(os.path.basename(name))[0]
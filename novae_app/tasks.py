@@ -0,0 +1,42 @@
+"""
+Background tasks run by ``manage.py run_worker``. See novae_app.jobs.
+"""
+from collections import defaultdict
+
+from . import documents, materials
+from .jobs import task
+from .models import Assignment, AssignmentInstance, Material, StudentProfile, provision_assignments
+from .tenancy import use_school
+
+
+@task('provision_assignments')
+def provision_students(student_ids):
+    by_school = defaultdict(list)
+    for student in StudentProfile.objects.filter(id__in=student_ids).select_related('school').only(
+        'id', 'grade_ordinal', 'school__slug'
+    ):
+        by_school[student.school].append(student)
+    for school, students in by_school.items():
+        with use_school(school):
+            provision_assignments(students)
+
+
+@task('render_assignment_docx', concurrency=2)
+def render_assignment_docx(assignment_id):
+    assignment = Assignment.objects.filter(id=assignment_id).first()
+    if assignment is not None:
+        documents.write_assignment_docx(assignment)
+
+
+@task('render_graded_docx', concurrency=2)
+def render_graded_docx(instance_id):
+    instance = AssignmentInstance.objects.select_related('assignment').filter(id=instance_id).first()
+    if instance is not None:
+        documents.write_graded_docx(instance)
+
+
+@task('render_material_preview', concurrency=1)
+def render_material_preview(material_id):
+    material = Material.objects.filter(id=material_id).first()
+    if material is not None:
+        materials.write_preview(material)
@@ -0,0 +1,289 @@
+"""
+Per-school tenancy.
+
+Schools own their parents and students (``school`` on the profiles) and
+may add catalog rows of their own or stand in for shared ones
+(``CatalogQuerySet.for_school``).
+
+With ``TENANT_DATABASES = True`` each school's student data (the models in
+TENANT_MODELS: instances, attempts, answers and time tracking) lives in its
+own SQLite file under TENANT_DATABASE_DIR, so a busy school no longer holds
+the single write lock every other family waits on. Everything else,
+catalog included, stays in ``default``, which each school connection
+ATTACHes so joins from student data to the catalog keep working.
+
+TenantMiddleware makes the school of each request current: the school
+whose ``domain`` is the request's host, else the logged-in user's. It is
+looked up lazily, the first time a tenant model is queried. TenantRouter
+then sends tenant models to that school's database; without a current
+school they stay in ``default``. Outside requests, wrap work in
+``use_school(school)``. Writes to student data that must commit together
+go in ``atomic_student_data()``, not a bare ``transaction.atomic()``.
+Jobs remember the school they were queued under. ``manage.py
+migrate_tenants`` creates and migrates the school databases.
+
+Limits of the split: queries have to start from the tenant model (related
+managers such as ``student.assignments`` do); a shared-side join like
+``StudentProfile.objects.filter(assignments__completed=True)`` only sees
+``default``. Deleting a profile does not cascade into its school's
+database. Maintenance commands (archive_answers, regrade and so on) go
+through every school's database in turn, or only those named with
+``--school`` (see ``maintenance_schools``).
+"""
+import io
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AssignmentInstance, School, StudentProfile, provision_assignments
+
+
+TENANT_MODELS = frozenset({
+    'assignmentinstance',
+    'assignmentattempt',
+    'studentanswer',
+    'answerset',
+    'answerarchiveentry',
+    'studysession',
+    'studentdailytime',
+})
+DATABASE_PREFIX = 'school_'
+SHARED_SCHEMA = 'shared'
+DOMAIN_CACHE_TIMEOUT = 5 * 60
+
+# A zero-argument callable returning the current School (or None), so the
+# school of a request is only looked up when something needs it.
+_current = ContextVar('novae_school', default=None)
+
+
+def tenancy_enabled():
+    return getattr(settings, 'TENANT_DATABASES', False)
+
+
+def database_dir():
+    return getattr(settings, 'TENANT_DATABASE_DIR', os.path.join(settings.BASE_DIR, 'tenants'))
+
+
+# ---------------------------
+# Current school
+# ---------------------------
+def current_school():
+    resolve = _current.get()
+    return resolve() if resolve is not None else None
+
+
+@contextmanager
+def use_school(school):
+    """Make ``school`` (or None, for ``default``) current inside the block."""
+    token = _current.set(lambda: school)
+    try:
+        yield school
+    finally:
+        _current.reset(token)
+
+
+def school_for_host(host):
+    key = f'tenancy:domain:{host}'
+    school = cache.get(key)
+    if school is None:
+        school = School.objects.filter(domain=host).first() or False
+        cache.set(key, school, DOMAIN_CACHE_TIMEOUT)
+    return school or None
+
+
+def school_for_user(user):
+    if user is None or not user.is_authenticated:
+        return None
+    return School.objects.filter(Q(students__user=user) | Q(parents__user=user)).first()
+
+
+def request_school(request):
+    """
+    The school of ``request``: by host, else by user. Cached on the request
+    per user, so logging in mid-request switches to the new user's school.
+    """
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None else None
+    cached = getattr(request, '_school_cache', None)
+    if cached is not None and cached[0] == user_id:
+        return cached[1]
+    school = school_for_host(request.get_host().split(':')[0])
+    if school is None:
+        school = school_for_user(user)
+    request._school_cache = (user_id, school)
+    return school
+
+
+def activate_request(request):
+    return _current.set(lambda: request_school(request))
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@receiver([post_save, post_delete], sender=School)
+def forget_school_domain(sender, instance, **kwargs):
+    if instance.domain:
+        cache.delete(f'tenancy:domain:{instance.domain}')
+
+
+# ---------------------------
+# School databases
+# ---------------------------
+def database_for(school):
+    """Alias of ``school``'s database, registered on first use."""
+    alias = f'{DATABASE_PREFIX}{school.slug}'
+    if alias not in connections.databases:
+        config = dict(connections.databases[DEFAULT_DB_ALIAS])
+        config['NAME'] = os.path.join(database_dir(), f'{school.slug}.sqlite3')
+        config['OPTIONS'] = dict(config.get('OPTIONS', {}))
+        config['TEST'] = {**config.get('TEST', {}), 'NAME': None}
+        connections.databases[alias] = config
+    return alias
+
+
+def current_database():
+    """Database of the current school's student data, or None for ``default``."""
+    if not tenancy_enabled():
+        return None
+    school = current_school()
+    return database_for(school) if school is not None else None
+
+
+def student_databases():
+    """
+    Every database holding student data: ``default``, then each school's
+    when TENANT_DATABASES is on. Shared figures (AssignmentStats,
+    QuestionStats) are computed over all of them.
+    """
+    aliases = [DEFAULT_DB_ALIAS]
+    if tenancy_enabled():
+        aliases += [database_for(school) for school in School.objects.order_by('slug')]
+    return aliases
+
+
+def student_database():
+    """Alias that student data (TENANT_MODELS) is written to right now."""
+    return router.db_for_write(AssignmentInstance)
+
+
+@contextmanager
+def atomic_student_data():
+    """
+    ``transaction.atomic()`` for work writing student data. It covers the
+    current school's database and ``default`` (profiles, catalog, stats),
+    one nested in the other; a bare ``atomic()`` only covers ``default``
+    and leaves school-database writes in autocommit.
+    """
+    alias = student_database()
+    with transaction.atomic(using=alias):
+        if alias == DEFAULT_DB_ALIAS:
+            yield
+        else:
+            with transaction.atomic():
+                yield
+
+
+def is_school_database(alias):
+    return alias.startswith(DATABASE_PREFIX)
+
+
+@receiver(connection_created)
+def attach_shared_database(sender, connection, **kwargs):
+    if not is_school_database(connection.alias) or connection.vendor != 'sqlite':
+        return
+    shared = connections.databases[DEFAULT_DB_ALIAS]['NAME']
+    with connection.cursor() as cursor:
+        cursor.execute(f'ATTACH DATABASE %s AS {SHARED_SCHEMA}', [str(shared)])
+
+
+class TenantRouter:
+    """Routes TENANT_MODELS to the current school's database."""
+
+    def _route(self, model):
+        if model._meta.app_label == 'novae_app' and model._meta.model_name in TENANT_MODELS:
+            return current_database()
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._meta.model_name, obj2._meta.model_name} & TENANT_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not is_school_database(db):
+            return None
+        return app_label == 'novae_app' and model_name in TENANT_MODELS
+
+
+# ---------------------------
+# Provisioning
+# ---------------------------
+def migrate_school(school, seed=False):
+    """
+    Create or migrate ``school``'s database; with ``seed``, also give its
+    students their assignment instances. Returns the migrate output.
+    """
+    alias = database_for(school)
+    os.makedirs(database_dir(), exist_ok=True)
+    out = io.StringIO()
+    try:
+        call_command('migrate', database=alias, interactive=False, verbosity=1, stdout=out)
+        if seed:
+            with use_school(school):
+                provision_assignments(list(
+                    StudentProfile.objects.filter(school=school).only('id', 'grade_ordinal', 'school')
+                ))
+    finally:
+        connections[alias].close()
+    return out.getvalue()
+
+
+# ---------------------------
+# Maintenance
+# ---------------------------
+def add_school_argument(parser):
+    parser.add_argument(
+        '--school',
+        action='append',
+        metavar='SLUG',
+        help="Only this school's database (repeatable). By default default's "
+             "and then every school's.",
+    )
+
+
+def maintenance_schools(slugs=None):
+    """
+    The schools maintenance work goes through, one database at a time and
+    each under ``use_school()``: None (``default``) and then every school,
+    or only the schools in ``slugs``. Without TENANT_DATABASES all student
+    data is in ``default`` and this is just ``[None]``.
+    """
+    if not tenancy_enabled():
+        if slugs:
+            raise CommandError("TENANT_DATABASES is off; there are no school databases.")
+        return [None]
+    schools = School.objects.order_by('slug')
+    if not slugs:
+        return [None, *schools]
+    schools = list(schools.filter(slug__in=slugs))
+    missing = set(slugs) - {school.slug for school in schools}
+    if missing:
+        raise CommandError(f"Unknown school(s): {', '.join(sorted(missing))}")
+    return schools
@@ -1,3 +1,1172 @@
-from django.test import TestCase
+import csv
+import io
+import itertools
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections, router
+from django.db.migrations.loader import MigrationLoader
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import exports, jobs, profiling
+from . import search as catalog_search
+from .admin import AdminGradebookExportForm, regrade_selected_assignments
+from .answers import answers_for, pack_answers
+from .archive import archive_answers
+from .digests import send_parent_digests
+from .grading import regrade_assignments, submit_attempt
+from .importers import import_assignments
+from .item_analysis import analyze_assignment
+from .roster import import_roster
+from .review import record_answer
+from .models import (
+    AnswerSet,
+    Assignment,
+    AssignmentAttempt,
+    AssignmentInstance,
+    AssignmentStats,
+    BillingProfile,
+    Course,
+    Game,
+    Job,
+    Lesson,
+    Material,
+    ParentProfile,
+    Question,
+    ReviewSchedule,
+    School,
+    StudentAnswer,
+    StudentProfile,
+    StudyPlan,
+    StudySession,
+    User,
+    provision_assignments,
+)
+from .stats import compute_all_stats, stats_differ
+from .tenancy import (
+    TenantRouter,
+    current_school,
+    maintenance_schools,
+    migrate_school,
+    use_school,
+)
+
+
+# ---------------------------
+# Startup cost
+# ---------------------------
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+IMPORT_TIME_RUNS = 3
+# Optional heavy packages that must only load when a feature uses them.
+LAZY_MODULES = ('docx', 'import_export.admin', 'tablib', 'yaml', 'numpy', 'PIL')
+
+STARTUP_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+from django.urls import resolve
+resolve('/')
+resolve('/admin/')
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'loaded': [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+class ImportTimeBudgetTest(SimpleTestCase):
+    """A fresh process must set Django up and load every URLconf quickly."""
+
+    def probe(self):
+        result = subprocess.run(
+            [sys.executable, '-c', STARTUP_PROBE % (LAZY_MODULES,)],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_heavy_optional_packages_are_not_imported_at_startup(self):
+        self.assertEqual(self.probe()['loaded'], [])
+
+    def test_setup_and_url_resolution_within_budget(self):
+        # Best of a few runs, so a cold bytecode cache or a noisy neighbour
+        # does not fail the build.
+        best = min(self.probe()['seconds'] for _ in range(IMPORT_TIME_RUNS))
+        self.assertLess(
+            best,
+            IMPORT_TIME_BUDGET_SECONDS,
+            f"django.setup() and URL loading took {best:.2f}s",
+        )
+
+
+# ---------------------------
+# Query budgets
+# ---------------------------
+# Queries per page on a cold cache, for (demo, paid) accounts. A page must
+# stay within its budget and make exactly as many queries after the
+# fixture is doubled: anything growing with the number of children,
+# assignments, questions or lessons is an N+1.
+STUDENT_PAGE_BUDGETS = {
+    'student_dashboard': (11, 11),
+    'student_assignments': (4, 6),
+    'student_assignment_detail': (3, 7),
+    'student_grades': (5, 5),
+    'student_materials': (4, 6),
+    'material_download': (5, 5),
+    'material_preview': (5, 5),
+    'daily_quiz': (5, 6),
+    'learning_games': (3, 5),
+    'search': (7, 7),
+    'course_list': (6, 6),
+    'course_detail': (7, 7),
+    'lesson_detail': (9, 9),
+    'study_plan_list': (3, 4),
+    'study_plan_create': (3, 3),
+    'study_plan_edit': (3, 4),
+    'study_plan_delete': (3, 4),
+    'assignment_download': (3, 8),
+    'graded_assignment_download': (7, 7),
+    'achievements': (4, 4),
+    'study_timer': (2, 2),
+    'billing': (3, 3),
+    'assignment_preview': (4, 4),
+}
+PARENT_PAGE_BUDGETS = {
+    'parent_dashboard': (3, 5),
+    'parent_submitted_assignments': (5, 5),
+    'get_grades': (4, 4),
+    'assignment_results': (9, 9),
+    'parent_gradebook_export': (3, 5),
+    'billing': (3, 3),
+}
+ANONYMOUS_PAGE_BUDGETS = {
+    'home': 0,
+    'landing': 0,
+    'about_us': 0,
+    'coming_soon': 0,
+    'student_login': 0,
+    'student_signup': 0,
+    'parent_login': 0,
+    'assignment_preview': 2,
+}
+SUBMISSION_BUDGET = 13
+
+FIXTURE_GRADES = ('3rd', '4th')
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Every page against a family of several children, each with a catalog
+    of assignments with many questions, half of them already graded.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.names = itertools.count()
+        parent_user = User.objects.create_user('parent', password='pw', role='parent')
+        cls.parent = ParentProfile.objects.create(user=parent_user)
+        cls.grow()
+        cls.child = cls.parent.children.order_by('id').first()
+        instances = AssignmentInstance.objects.filter(student=cls.child).order_by('id')
+        cls.graded = instances.filter(score__isnull=False).first()
+        cls.pending = instances.filter(score__isnull=True).first()
+        cls.course = Course.objects.order_by('id').first()
+        cls.lesson = cls.course.lessons.order_by('id').first()
+        cls.material = Material.objects.order_by('id').first()
+        cls.plan = StudyPlan.objects.filter(user=cls.child.user).first()
+
+    @classmethod
+    def name(cls, prefix):
+        return f'{prefix}{next(cls.names)}'
+
+    @classmethod
+    def grow(cls):
+        """Add as much again of everything: the first call builds the fixture."""
+        for grade in FIXTURE_GRADES:
+            course = Course.objects.create(
+                title=cls.name('Course '), description='.', grade_level=grade, is_demo=True
+            )
+            for demo in (True, False):
+                Assignment.objects.create(
+                    title=cls.name('Assignment '), due_date='2026-06-01',
+                    grade_level=grade, course=course, is_demo=demo,
+                )
+                Material.objects.create(
+                    title=cls.name('Material '), file_url='https://example.com/m.pdf',
+                    grade_level=grade, is_demo=demo,
+                )
+            Game.objects.create(
+                title=cls.name('Game '), description='.', url='https://example.com/',
+                min_grade=0, max_grade=12, is_demo=True,
+            )
+        for course in Course.objects.all():
+            for sample in (True, False, True):
+                Lesson.objects.create(
+                    course=course, title=cls.name('Lesson '), content='Text.',
+                    order=next(cls.names), is_sample=sample,
+                )
+        for assignment in Assignment.objects.all():
+            for _ in range(3):
+                Question.objects.create(
+                    assignment=assignment, question_text=cls.name('Question '),
+                    question_type='MC', option_a='a', option_b='b', option_c='c',
+                    option_d='d', correct_option='A',
+                )
+            Question.objects.create(
+                assignment=assignment, question_text=cls.name('Question '),
+                question_type='TEXT', correct_option='answer',
+            )
+        for grade in FIXTURE_GRADES:
+            user = User.objects.create_user(cls.name('child'), password='pw', role='student')
+            child = StudentProfile.objects.create(user=user, grade=grade)
+            cls.parent.children.add(child)
+            StudyPlan.objects.create(user=user, title='Plan')
+        children = list(cls.parent.children.all())
+        # Provisioning normally runs in the worker.
+        provision_assignments(children)
+        for child in children:
+            ungraded = AssignmentInstance.objects.filter(student=child, score__isnull=True)
+            for instance in list(ungraded.select_related('assignment').order_by('id'))[1::2]:
+                questions = instance.assignment.questions.all()
+                submit_attempt(instance, child, {question: 'A' for question in questions})
+
+    def set_paid(self, paid):
+        BillingProfile.objects.update(is_paid=paid)
+
+    def count_queries(self, url, method='get', data=None):
+        # Cold: no cached pages or versions, no queued document renders.
+        cache.clear()
+        Job.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return len(queries)
+
+    def count_pages(self, pages):
+        return {name: self.count_queries(url) for name, url in pages.items()}
+
+    def student_pages(self):
+        return {
+            'student_dashboard': reverse('student_dashboard'),
+            'student_assignments': reverse('student_assignments'),
+            'student_assignment_detail': reverse('student_assignment_detail', args=[self.pending.id]),
+            'student_grades': reverse('student_grades'),
+            'student_materials': reverse('student_materials'),
+            'material_download': reverse('material_download', args=[self.material.id]),
+            'material_preview': reverse('material_preview', args=[self.material.id]),
+            'daily_quiz': reverse('daily_quiz'),
+            'learning_games': reverse('learning_games'),
+            'search': reverse('search') + '?q=Assignment',
+            'course_list': reverse('course_list'),
+            'course_detail': reverse('course_detail', args=[self.course.id]),
+            'lesson_detail': reverse('lesson_detail', args=[self.course.id, self.lesson.id]),
+            'study_plan_list': reverse('study_plan_list'),
+            'study_plan_create': reverse('study_plan_create'),
+            'study_plan_edit': reverse('study_plan_edit', args=[self.plan.id]),
+            'study_plan_delete': reverse('study_plan_delete', args=[self.plan.id]),
+            'assignment_download': reverse('assignment_download', args=[self.graded.assignment_id]),
+            'graded_assignment_download': reverse('graded_assignment_download', args=[self.graded.id]),
+            'achievements': reverse('achievements'),
+            'study_timer': reverse('study_timer'),
+            'billing': reverse('billing'),
+            'assignment_preview': reverse('assignment_preview', args=[self.graded.assignment_id]),
+        }
+
+    def parent_pages(self):
+        return {
+            'parent_dashboard': reverse('parent_dashboard'),
+            'parent_submitted_assignments': reverse('parent_submitted_assignments', args=[self.child.id]),
+            'get_grades': reverse('get_grades', args=[self.child.user_id]),
+            'assignment_results': reverse('assignment_results', args=[self.child.user.username]),
+            'parent_gradebook_export': reverse('parent_gradebook_export') + '?format=csv',
+            'billing': reverse('billing'),
+        }
+
+    def anonymous_pages(self):
+        return {
+            'home': reverse('home'),
+            'landing': reverse('landing'),
+            'about_us': reverse('about_us'),
+            'coming_soon': reverse('coming_soon'),
+            'student_login': reverse('student_login'),
+            'student_signup': reverse('student_signup'),
+            'parent_login': reverse('parent_login'),
+            'assignment_preview': reverse('assignment_preview', args=[self.graded.assignment_id]),
+        }
+
+    def assertWithinBudget(self, pages, budgets):
+        small = self.count_pages(pages)
+        self.grow()
+        large = self.count_pages(pages)
+        for name, budget in budgets.items():
+            with self.subTest(page=name):
+                self.assertLessEqual(small[name], budget, f"{name} is over its query budget")
+                self.assertEqual(
+                    large[name], small[name],
+                    f"{name} makes more queries as the data grows",
+                )
+
+    def assertAccountWithinBudget(self, user, pages, budgets):
+        for paid in (False, True):
+            with self.subTest(paid=paid):
+                self.set_paid(paid)
+                self.client.force_login(user)
+                self.assertWithinBudget(
+                    pages(), {name: budget[paid] for name, budget in budgets.items()}
+                )
+
+    def test_student_pages(self):
+        self.assertAccountWithinBudget(self.child.user, self.student_pages, STUDENT_PAGE_BUDGETS)
+
+    def test_parent_pages(self):
+        self.assertAccountWithinBudget(self.parent.user, self.parent_pages, PARENT_PAGE_BUDGETS)
+
+    def test_anonymous_pages(self):
+        self.assertWithinBudget(self.anonymous_pages(), ANONYMOUS_PAGE_BUDGETS)
+
+    def submit(self):
+        data = {
+            f'question_{question.id}': 'A'
+            for question in self.pending.assignment.questions.all()
+        }
+        return self.count_queries(
+            reverse('student_assignment_detail', args=[self.pending.id]), 'post', data
+        )
+
+    def test_submission(self):
+        self.set_paid(True)
+        self.client.force_login(self.child.user)
+        # Later submissions are retakes; the first also earns the first badges.
+        self.submit()
+        small = self.submit()
+        self.grow()
+        large = self.submit()
+        self.assertLessEqual(small, SUBMISSION_BUDGET)
+        self.assertEqual(large, small, "submitting makes more queries as questions are added")
+
+
+# ---------------------------
+# Archived answers
+# ---------------------------
+def make_student(username, grade='3rd', **fields):
+    user = User.objects.create_user(username, password='pw', role='student')
+    return StudentProfile.objects.create(user=user, grade=grade, **fields)
+
+
+def make_parent(username, *children, **fields):
+    user = User.objects.create_user(
+        username, email=f'{username}@example.com', password='pw', role='parent'
+    )
+    parent = ParentProfile.objects.create(user=user, **fields)
+    parent.children.add(*children)
+    return parent
+
+
+def make_assignment(questions=2, **fields):
+    fields.setdefault('title', 'Fractions')
+    fields.setdefault('due_date', '2026-06-01')
+    fields.setdefault('grade_level', '3rd')
+    assignment = Assignment.objects.create(**fields)
+    for number in range(questions):
+        Question.objects.create(
+            assignment=assignment, question_text=f'Question {number}', question_type='MC',
+            option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A',
+        )
+    return assignment
+
+
+class ArchivedAnswersTest(TestCase):
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        self.enterContext(override_settings(ANSWER_ARCHIVE_DIR=archive_dir.name))
+        self.student = make_student('ada')
+        self.assignment = make_assignment()
+        self.instance = AssignmentInstance.objects.create(
+            assignment=self.assignment, student=self.student
+        )
+        submit_attempt(
+            self.instance, self.student,
+            {question: 'A' for question in self.assignment.questions.all()},
+        )
+        StudentAnswer.objects.update(submitted_at=timezone.now() - timedelta(days=800))
+        archive_answers()
+
+    def test_answers_are_archived(self):
+        self.assertFalse(StudentAnswer.objects.exists())
+        self.assertTrue(self.instance.archive_entries.exists())
+
+    def test_regrade_counts_archived_answers(self):
+        self.assertEqual(regrade_assignments([self.assignment.id]), [])
+        self.instance.refresh_from_db()
+        self.assertEqual(self.instance.score, Decimal('100.00'))
+        self.assertEqual(self.instance.best_score, Decimal('100.00'))
+
+    def test_regrade_rescores_archived_answers(self):
+        self.assignment.questions.update(correct_option='B')
+        changes = regrade_assignments([self.assignment.id])
+        self.assertEqual([change.new_score for change in changes], [Decimal('0.00')])
+
+    def test_archived_answers_are_read_back(self):
+        answers = answers_for(self.instance)
+        self.assertEqual(len(answers), 2)
+        self.assertEqual({answer.selected_option for answer in answers}, {'A'})
+
+    def test_item_analysis_counts_archived_answers(self):
+        stats = analyze_assignment(self.assignment.id)
+        self.assertEqual([(s.responses, s.p_value, s.option_a_count) for s in stats],
+                         [(1, 1.0, 1)] * 2)
+
+
+# ---------------------------
+# Regrading attempts
+# ---------------------------
+class RegradeAttemptsTest(TestCase):
+    def setUp(self):
+        self.student = make_student('ada')
+        self.assignment = make_assignment()
+        self.instance = AssignmentInstance.objects.create(
+            assignment=self.assignment, student=self.student
+        )
+        for option in 'AB':
+            self.instance.start_retake()
+            submit_attempt(
+                self.instance, self.student,
+                {question: option for question in self.assignment.questions.all()},
+            )
+
+    def regrade(self, key):
+        self.assignment.questions.update(correct_option=key)
+        regrade_assignments([self.assignment.id])
+        self.instance.refresh_from_db()
+        return (
+            self.instance.score, self.instance.best_score,
+            list(self.instance.attempt_history.order_by('number').values_list('score', 'correct_count')),
+        )
+
+    def test_attempts_is_the_attempt_count(self):
+        self.instance.refresh_from_db()
+        self.assertEqual((self.instance.attempts, self.instance.attempt_count), (2, 2))
+        self.instance.start_retake()
+        self.instance.refresh_from_db()
+        self.assertEqual(self.instance.attempts, 2)
+
+    def test_every_attempt_is_rescored(self):
+        self.assertEqual(self.regrade('B'), (
+            Decimal('100.00'), Decimal('100.00'), [(Decimal('0.00'), 0), (Decimal('100.00'), 2)],
+        ))
+
+    def test_corrected_key_lowers_the_best_score(self):
+        self.assertEqual(self.instance.best_score, Decimal('100.00'))
+        self.assertEqual(self.regrade('C'), (
+            Decimal('0.00'), Decimal('0.00'), [(Decimal('0.00'), 0), (Decimal('0.00'), 0)],
+        ))
+
+    def test_packed_attempts_are_rescored(self):
+        pack_answers()
+        self.assertFalse(StudentAnswer.objects.exists())
+        self.assertEqual(self.regrade('B')[1:], (
+            Decimal('100.00'), [(Decimal('0.00'), 0), (Decimal('100.00'), 2)],
+        ))
+
+
+# ---------------------------
+# Attempt backfill (migration 0014)
+# ---------------------------
+class AttemptBackfillTest(TestCase):
+    def setUp(self):
+        self.student = make_student('ada')
+        self.graded = AssignmentInstance.objects.create(
+            assignment=make_assignment(), student=self.student, completed=True, score=Decimal('50.00')
+        )
+        # Reopened for a retake before attempts were recorded: answers but no score.
+        self.retaking = AssignmentInstance.objects.create(
+            assignment=make_assignment(title='Decimals'), student=self.student
+        )
+        self.untouched = AssignmentInstance.objects.create(
+            assignment=make_assignment(title='Angles'), student=self.student
+        )
+        for instance in (self.graded, self.retaking):
+            StudentAnswer.objects.bulk_create(
+                StudentAnswer(
+                    student=self.student, question=question,
+                    assignment_instance=instance, selected_option='A',
+                )
+                for question in instance.assignment.questions.all()
+            )
+
+    def backfill(self):
+        migration = import_module('novae_app.migrations.0014_assignment_attempts')
+        migration.backfill_attempts(django_apps, None)
+        for instance in (self.graded, self.retaking, self.untouched):
+            instance.refresh_from_db()
+
+    def test_instances_with_answers_are_on_their_stored_attempt(self):
+        self.backfill()
+        self.assertEqual(self.graded.attempt_count, 1)
+        self.assertEqual(self.retaking.attempt_count, 1)
+        self.assertEqual(self.untouched.attempt_count, 0)
+
+    def test_only_graded_instances_get_a_recorded_attempt(self):
+        self.backfill()
+        self.assertEqual(
+            list(AssignmentAttempt.objects.values_list('instance_id', 'number', 'score')),
+            [(self.graded.id, 1, Decimal('50.00'))],
+        )
+        self.assertEqual(self.graded.best_score, Decimal('50.00'))
+        self.assertIsNone(self.retaking.best_score)
+
+    def test_retake_after_backfill_starts_a_new_attempt(self):
+        self.backfill()
+        questions = self.retaking.assignment.questions.all()
+        submit_attempt(self.retaking, self.student, {question: 'A' for question in questions})
+        self.assertEqual(self.retaking.attempt_count, 2)
+        self.assertEqual(len(answers_for(self.retaking)), 2)
+        self.assertEqual(regrade_assignments([self.retaking.assignment_id]), [])
+        self.retaking.refresh_from_db()
+        self.assertEqual(self.retaking.score, Decimal('100.00'))
+
+    @override_settings(PACKED_ANSWER_STORAGE=True)
+    def test_migration_0013_packs_with_its_own_models(self):
+        # Historical models from before answers had an attempt column.
+        old_apps = MigrationLoader(connection).project_state(('novae_app', '0013_answer_set')).apps
+        submitted_at = timezone.now() - timedelta(days=3)
+        StudentAnswer.objects.update(submitted_at=submitted_at)
+        migration = import_module('novae_app.migrations.0013_answer_set')
+        migration.pack_existing_answers(old_apps, mock.Mock(connection=connection))
+        self.assertFalse(StudentAnswer.objects.exists())
+        self.assertEqual(
+            sorted(AnswerSet.objects.values_list('assignment_instance_id', 'attempt', 'submitted_at')),
+            [(self.graded.id, 1, submitted_at), (self.retaking.id, 1, submitted_at)],
+        )
+        self.assertEqual(len(AnswerSet.objects.get(assignment_instance=self.graded).answers), 2)
+
+
+# ---------------------------
+# School databases
+# ---------------------------
+SCHOOL_DATABASE = 'school_north'
+
+
+class TenantRoutingTest(TransactionTestCase):
+    """Student data goes to the current school's database, atomically."""
+
+    # Resolved when the class is set up, by which time the school database
+    # is registered; the runner itself only knows ``default``.
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(TENANT_DATABASES=True, TENANT_DATABASE_DIR=directory))
+        migrate_school(School(slug='north'))
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[SCHOOL_DATABASE].close()
+        del connections[SCHOOL_DATABASE]
+        del connections.databases[SCHOOL_DATABASE]
+
+    def setUp(self):
+        self.school = School.objects.create(name='North', slug='north')
+        self.student = make_student('ada', school=self.school)
+        self.assignment = make_assignment()
+        with use_school(self.school):
+            self.instance = AssignmentInstance.objects.create(
+                assignment=self.assignment, student=self.student
+            )
+        self.values = {question: 'A' for question in self.assignment.questions.all()}
+
+    def test_use_school_nests_and_restores(self):
+        other = School(name='South', slug='south')
+        self.assertIsNone(current_school())
+        with use_school(self.school):
+            with use_school(other):
+                self.assertEqual(current_school(), other)
+            with use_school(None):
+                self.assertIsNone(current_school())
+            self.assertEqual(current_school(), self.school)
+        self.assertIsNone(current_school())
+
+    def test_router_sends_only_student_data_to_the_school(self):
+        with use_school(self.school):
+            self.assertEqual(router.db_for_write(AssignmentInstance), SCHOOL_DATABASE)
+            self.assertEqual(router.db_for_read(StudentAnswer), SCHOOL_DATABASE)
+            self.assertEqual(router.db_for_write(Assignment), DEFAULT_DB_ALIAS)
+            self.assertEqual(router.db_for_read(StudentProfile), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_write(AssignmentInstance), DEFAULT_DB_ALIAS)
+        with override_settings(TENANT_DATABASES=False), use_school(self.school):
+            self.assertEqual(router.db_for_write(AssignmentInstance), DEFAULT_DB_ALIAS)
+
+    def test_school_database_only_gets_student_tables(self):
+        router_ = TenantRouter()
+        self.assertTrue(router_.allow_migrate(SCHOOL_DATABASE, 'novae_app', 'assignmentinstance'))
+        self.assertFalse(router_.allow_migrate(SCHOOL_DATABASE, 'novae_app', 'assignment'))
+        self.assertIsNone(router_.allow_migrate(DEFAULT_DB_ALIAS, 'novae_app', 'assignmentinstance'))
+
+    def test_instances_live_in_the_school_database(self):
+        self.assertFalse(AssignmentInstance.objects.using(DEFAULT_DB_ALIAS).exists())
+        with use_school(self.school):
+            self.assertTrue(AssignmentInstance.objects.filter(id=self.instance.id).exists())
+
+    def test_submission_is_written_to_the_school_database(self):
+        with use_school(self.school):
+            submit_attempt(self.instance, self.student, self.values)
+        self.assertEqual(AssignmentAttempt.objects.using(SCHOOL_DATABASE).count(), 1)
+        self.assertEqual(StudentAnswer.objects.using(SCHOOL_DATABASE).count(), len(self.values))
+        self.assertFalse(AssignmentAttempt.objects.using(DEFAULT_DB_ALIAS).exists())
+
+    def test_failed_submission_leaves_nothing_behind(self):
+        with use_school(self.school), mock.patch(
+            'novae_app.grading.save_answers', side_effect=DatabaseError('disk full')
+        ):
+            with self.assertRaises(DatabaseError):
+                submit_attempt(self.instance, self.student, self.values)
+        self.assertFalse(AssignmentAttempt.objects.using(SCHOOL_DATABASE).exists())
+        self.instance.refresh_from_db(using=SCHOOL_DATABASE)
+        self.assertEqual(self.instance.attempt_count, 0)
+
+    def test_maintenance_commands_cover_school_databases(self):
+        with use_school(self.school):
+            submit_attempt(self.instance, self.student, self.values)
+        self.assignment.questions.update(correct_option='B')
+        out = io.StringIO()
+        call_command('regrade_assignments', str(self.assignment.id), stdout=out)
+        self.assertIn(f'north: instance {self.instance.id}: 100.00 -> 0.00', out.getvalue())
+        self.instance.refresh_from_db(using=SCHOOL_DATABASE)
+        self.assertEqual(self.instance.score, Decimal('0.00'))
+
+        self.assignment.questions.update(correct_option='A')
+        response = regrade_selected_assignments(
+            None, None, Assignment.objects.filter(id=self.assignment.id)
+        )
+        self.assertIn(f'north,{self.instance.id},{self.assignment.id},0.00,100.00', response.content.decode())
+
+    def test_digest_reads_the_childs_school_database(self):
+        with use_school(self.school):
+            submit_attempt(self.instance, self.student, self.values)
+        parent = make_parent('mum', self.student, school=self.school)
+        self.assertEqual(send_parent_digests(timezone.localdate()).sent, 1)
+        self.assertIn('Assignments completed: 1', mail.outbox[0].body)
+        self.assertIn('Average score: 100.0%', mail.outbox[0].body)
+        self.assertTrue(parent.digests.exists())
+
+    def test_maintenance_schools(self):
+        self.assertEqual(maintenance_schools(), [None, self.school])
+        self.assertEqual(maintenance_schools(['north']), [self.school])
+        with self.assertRaises(CommandError):
+            maintenance_schools(['south'])
+        with override_settings(TENANT_DATABASES=False):
+            self.assertEqual(maintenance_schools(), [None])
+
+    def graded(self, student, score):
+        return AssignmentInstance.objects.create(
+            assignment=self.assignment, student=student, score=Decimal(score)
+        )
+
+    def test_stats_cover_every_school_database(self):
+        self.graded(make_student('bob'), 40)
+        with use_school(self.school):
+            self.instance.score = Decimal(90)
+            self.instance.save()
+            self.graded(make_student('cy', school=self.school), 60)
+            self.instance.score = None
+            self.instance.save()
+        stats = AssignmentStats.objects.get(assignment=self.assignment)
+        self.assertEqual((stats.count, stats.min_score, stats.max_score), (2, 40, 60))
+        fresh = compute_all_stats()[self.assignment.id]
+        self.assertFalse(stats_differ(stats, fresh))
+        self.assertEqual(fresh.histogram[4] + fresh.histogram[6], 2)
+
+    def test_roster_import_provisions_into_the_school_database(self):
+        import_roster(io.StringIO(ROSTER_CSV), workers=1, school=self.school)
+        student = StudentProfile.objects.get(user__username='ada')
+        with use_school(self.school):
+            self.assertTrue(AssignmentInstance.objects.filter(student=student).exists())
+        self.assertFalse(
+            AssignmentInstance.objects.using(DEFAULT_DB_ALIAS).filter(student=student).exists()
+        )
+
+    def test_item_analysis_covers_every_school_database(self):
+        # The same id in two databases is still two instances.
+        other = AssignmentInstance.objects.create(
+            id=self.instance.id, assignment=self.assignment, student=make_student('bob')
+        )
+        submit_attempt(other, other.student, self.values)
+        with use_school(self.school):
+            submit_attempt(self.instance, self.student, dict.fromkeys(self.values, 'B'))
+        stats = analyze_assignment(self.assignment.id)
+        self.assertEqual(
+            [(s.responses, s.p_value, s.option_a_count, s.option_b_count) for s in stats],
+            [(2, 0.5, 1, 1)] * 2,
+        )
+
+
+# ---------------------------
+# Conditional student pages
+# ---------------------------
+class StudentConditionalTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = make_student('ada', grade='3rd')
+        BillingProfile.objects.filter(user=self.student.user).update(is_paid=True)
+        self.client.force_login(self.student.user)
+        self.url = reverse('student_materials')
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self.etag()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_grade_change_invalidates_the_page(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.grade = '4th'
+            self.student.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_school_change_invalidates_the_page(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.school = School.objects.create(name='North', slug='north')
+            self.student.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_saving_an_unchanged_profile_keeps_the_version(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentProfile.objects.get(id=self.student.id).save()
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.data_version, 0)
+
+    def test_siblings_get_different_etags(self):
+        sibling = make_student('bea', grade='3rd')
+        BillingProfile.objects.filter(user=sibling.user).update(is_paid=True)
+        etag = self.etag()
+        self.client.force_login(sibling.user)
+        self.assertNotEqual(self.etag(), etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+# ---------------------------
+# Study sessions
+# ---------------------------
+class StudySessionTest(TestCase):
+    def test_close_stale_ends_sessions_at_their_last_sign_of_life(self):
+        user = make_student('ada').user
+        cutoff = timezone.now() - timedelta(hours=1)
+        old, older = cutoff - timedelta(minutes=5), cutoff - timedelta(minutes=30)
+        silent = StudySession.objects.create(student=user, login_time=older, last_heartbeat=old)
+        mute = StudySession.objects.create(student=user, login_time=old)
+        live = StudySession.objects.create(
+            student=user, login_time=older, last_heartbeat=timezone.now()
+        )
+        self.assertEqual(StudySession.objects.close_stale(cutoff), 2)
+        for session in (silent, mute, live):
+            session.refresh_from_db()
+        self.assertEqual((silent.logout_time, mute.logout_time, live.logout_time), (old, old, None))
+        self.assertFalse(StudySession.objects.stale(cutoff).exists())
+
+
+# ---------------------------
+# Job heartbeats
+# ---------------------------
+class JobHeartbeatTest(TransactionTestCase):
+    """The heartbeat runs on its own connection, so this commits for real."""
+
+    def run_slow_job(self, seconds):
+        stale_after = timedelta(seconds=seconds * 2 / 3)
+        released = []
+
+        def slow():
+            time.sleep(seconds)
+            released.append(jobs.release_stale(stale_after))
+
+        with mock.patch.dict(jobs.TASKS, {'slow': jobs.Task('slow', slow)}):
+            Job.objects.enqueue('slow', {})
+            job = jobs.claim('worker-1')
+            self.assertTrue(jobs.run(job))
+        job.refresh_from_db()
+        return job, released[0]
+
+    @override_settings(JOB_HEARTBEAT_SECONDS=0.05)
+    def test_running_job_with_live_worker_is_not_released(self):
+        job, released = self.run_slow_job(0.3)
+        self.assertEqual(released, 0)
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    @override_settings(JOB_HEARTBEAT_SECONDS=60)
+    def test_job_without_heartbeat_is_released(self):
+        job, released = self.run_slow_job(0.3)
+        self.assertEqual(released, 1)
+        self.assertEqual(job.status, Job.QUEUED)
+
+
+# ---------------------------
+# Search visibility
+# ---------------------------
+class SearchVisibilityTest(TestCase):
+    def setUp(self):
+        self.student = make_student('ada', grade='3rd')
+        self.course = Course.objects.create(
+            title='Volcanoes', description='Lava', grade_level='2nd', is_demo=True,
+            min_grade=2, max_grade=4,
+        )
+        Lesson.objects.create(course=self.course, title='Volcano lesson', content='Magma', is_sample=True)
+
+    def titles(self, text, **kwargs):
+        return sorted(
+            str(result.title).replace('<mark>', '').replace('</mark>', '')
+            for result in catalog_search.search(text, **kwargs)
+        )
+
+    def test_grade_range_covers_student_grade(self):
+        Course.objects.create(title='Volcano physics', description='', grade_level='5th', is_demo=True)
+        self.assertEqual(
+            self.titles('volcano', grade=self.student.grade_ordinal),
+            ['Volcano lesson', 'Volcanoes'],
+        )
+
+    def test_lessons_follow_course_grade_range(self):
+        self.course.max_grade = 2
+        self.course.save()
+        self.assertEqual(self.titles('volcano', grade=self.student.grade_ordinal), [])
+        self.assertEqual(len(self.titles('volcano', grade=2)), 2)
+
+    def test_search_page_uses_student_grade_ordinal(self):
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('search'), {'q': 'volcano'})
+        self.assertEqual(
+            [result.object_id for result in response.context['results'] if result.kind == 'course'],
+            [self.course.id],
+        )
+
+    def test_school_rows_are_private(self):
+        north = School.objects.create(name='North', slug='north')
+        south = School.objects.create(name='South', slug='south')
+        Course.objects.create(
+            title='Volcano club', description='', grade_level='3rd', is_demo=True, school=north,
+        )
+        self.assertNotIn('Volcano club', self.titles('volcano'))
+        self.assertNotIn('Volcano club', self.titles('volcano', school=south))
+        self.assertIn('Volcano club', self.titles('volcano', school=north))
+
+    def test_replaced_rows_and_their_lessons_are_hidden(self):
+        north = School.objects.create(name='North', slug='north')
+        Course.objects.create(
+            title='Volcanoes of the north', description='', grade_level='3rd', is_demo=True,
+            school=north, replaces=self.course,
+        )
+        self.assertEqual(self.titles('volcano', school=north), ['Volcanoes of the north'])
+        self.assertEqual(self.titles('volcano', school=north.id), ['Volcanoes of the north'])
+        self.assertEqual(len(self.titles('volcano')), 2)
+
+    def test_search_page_uses_student_school(self):
+        north = School.objects.create(name='North', slug='north')
+        own = Course.objects.create(
+            title='Volcanoes of the north', description='', grade_level='3rd', is_demo=True,
+            school=north, replaces=self.course,
+        )
+        self.student.school = north
+        self.student.save()
+        self.client.force_login(self.student.user)
+        response = self.client.get(reverse('search'), {'q': 'volcano'})
+        self.assertEqual(
+            [(result.kind, result.object_id) for result in response.context['results']],
+            [('course', own.id)],
+        )
+
+
+# ---------------------------
+# Material downloads
+# ---------------------------
+class MaterialDownloadTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.student = make_student('ada')
+        self.client.force_login(self.student.user)
+
+    def make_material(self, title='Worksheet', **fields):
+        return Material.objects.create(
+            title=title, grade_level='3rd', is_demo=True,
+            file=SimpleUploadedFile('sheet.pdf', b'%PDF-1.4 worksheet'), **fields,
+        )
+
+    def download(self, material):
+        return self.client.get(reverse('material_download', args=[material.id]))
+
+    def test_filename_is_quoted(self):
+        response = self.download(self.make_material('Ünit "1"\r\nX-Injected: yes'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Injected', response)
+        self.assertTrue(response['Content-Disposition'].startswith("inline; filename*=utf-8''"))
+
+    def test_other_schools_materials_are_not_served(self):
+        north = School.objects.create(name='North', slug='north')
+        self.assertEqual(self.download(self.make_material(school=north)).status_code, 404)
+        self.student.school = north
+        self.student.save()
+        self.assertEqual(self.download(self.make_material(school=north)).status_code, 200)
+
+    def test_replaced_materials_are_not_served(self):
+        north = School.objects.create(name='North', slug='north')
+        shared = self.make_material()
+        self.make_material(school=north, replaces=shared)
+        self.student.school = north
+        self.student.save()
+        self.assertEqual(self.download(shared).status_code, 404)
+
+
+# ---------------------------
+# Daily quiz
+# ---------------------------
+class DailyQuizAnswerTest(TestCase):
+    def setUp(self):
+        self.question = make_assignment(questions=1, is_demo=True).questions.get()
+        self.student = make_student('ada')
+        self.client.force_login(self.student.user)
+
+    def answer(self, **data):
+        return self.client.post(reverse('daily_quiz'), {'option': 'A', **data})
+
+    def test_answer_is_checked(self):
+        response = self.answer(question_id=str(self.question.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['correct'])
+
+    def test_bad_question_ids_are_not_found(self):
+        for data in ({}, {'question_id': ''}, {'question_id': 'abc'}, {'question_id': '1.5'},
+                     {'question_id': str(self.question.id + 1)}, {'question_id': '9' * 30}):
+            with self.subTest(data=data):
+                self.assertEqual(self.answer(**data).status_code, 404)
+
+    def test_unpaid_students_only_get_demo_questions(self):
+        paid_only = make_assignment(questions=1).questions.get()
+        self.assertEqual(self.answer(question_id=str(paid_only.id)).status_code, 404)
+        BillingProfile.objects.filter(user=self.student.user).update(is_paid=True)
+        self.assertEqual(self.answer(question_id=str(paid_only.id)).status_code, 200)
+
+    def test_other_schools_questions_are_not_asked(self):
+        BillingProfile.objects.filter(user=self.student.user).update(is_paid=True)
+        north = School.objects.create(name='North', slug='north')
+        private = make_assignment(questions=1, school=north).questions.get()
+        self.assertEqual(self.answer(question_id=str(private.id)).status_code, 404)
+        ReviewSchedule.objects.create(
+            student=self.student, question=private, due_date=date(2026, 1, 1)
+        )
+        response = self.client.get(reverse('daily_quiz'))
+        self.assertEqual(response.context['question'], self.question)
+
+    def test_replaced_assignments_questions_are_not_asked(self):
+        BillingProfile.objects.filter(user=self.student.user).update(is_paid=True)
+        north = School.objects.create(name='North', slug='north')
+        replacement = make_assignment(
+            questions=1, school=north, replaces=self.question.assignment
+        ).questions.get()
+        self.student.school = north
+        self.student.save()
+        self.assertEqual(self.answer(question_id=str(self.question.id)).status_code, 404)
+        self.assertEqual(self.client.get(reverse('daily_quiz')).context['question'], replacement)
+
+    def test_repeated_answers_update_one_schedule(self):
+        record_answer(self.student, self.question, True, today=date(2026, 1, 1))
+        schedule = record_answer(self.student, self.question, True, today=date(2026, 1, 2))
+        self.assertEqual(ReviewSchedule.objects.get(), schedule)
+        self.assertEqual(schedule.repetitions, 2)
+
+
+# ---------------------------
+# Assignment imports
+# ---------------------------
+class ImportAssignmentsTest(TestCase):
+    def line(self, **fields):
+        return json.dumps({
+            'title': 'Fractions', 'due_date': '2026-06-01', 'grade_level': '3rd', **fields
+        })
+
+    def test_bad_course_ids_only_skip_their_line(self):
+        course = Course.objects.create(title='Maths', grade_level='3rd')
+        lines = [self.line(course_id=course.id), self.line(course_id=str(course.id))]
+        lines += [self.line(course_id=value) for value in ('abc', 1.5, [1], '9' * 30, -1)]
+        result = import_assignments(lines)
+        self.assertEqual(result.assignments, 2)
+        self.assertEqual([number for number, _ in result.errors], [3, 4, 5, 6, 7])
+        self.assertEqual(course.assignments.count(), 2)
+
+
+# ---------------------------
+# Roster imports
+# ---------------------------
+ROSTER_CSV = (
+    'parent_username,parent_email,parent_password,child_username,child_password,child_grade\n'
+    'pat,pat@example.com,pw,ada,pw,3rd\n'
+)
+
+
+class RosterImportTest(TestCase):
+    def setUp(self):
+        self.school = School.objects.create(name='North', slug='north')
+
+    def assert_imported_into(self, school):
+        parent = ParentProfile.objects.get(user__username='pat')
+        student = parent.children.get()
+        self.assertEqual((parent.school, student.school), (school, school))
+        return student
+
+    def test_families_join_the_given_school(self):
+        private = make_assignment(school=self.school)
+        result = import_roster(io.StringIO(ROSTER_CSV), workers=1, school=self.school)
+        self.assertEqual((result.parents, result.students, result.errors), (1, 1, []))
+        student = self.assert_imported_into(self.school)
+        self.assertEqual(student.assignments.get().assignment, private)
+
+    def test_admin_import_takes_a_school(self):
+        self.client.force_login(User.objects.create_superuser('admin', password='pw'))
+        upload = SimpleUploadedFile('roster.csv', ROSTER_CSV.encode())
+        response = self.client.post(
+            reverse('admin:novae_app_parentprofile_import_roster'),
+            {'file': upload, 'school': self.school.id},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_imported_into(self.school)
+
+    def test_command_takes_a_school_slug(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as roster:
+            roster.write(ROSTER_CSV)
+        self.addCleanup(os.remove, roster.name)
+        with self.assertRaisesMessage(CommandError, 'Unknown school: south'):
+            call_command('import_roster', roster.name, school='south')
+        call_command('import_roster', roster.name, school='north', workers=1, stdout=io.StringIO())
+        self.assert_imported_into(self.school)
+
+
+# ---------------------------
+# Gradebook exports
+# ---------------------------
+class GradebookExportTest(TestCase):
+    def test_csv_cells_are_not_formulas(self):
+        student = make_student('=HYPERLINK("http://example.com")')
+        instance = AssignmentInstance.objects.create(
+            assignment=make_assignment(title='-1+1'), student=student
+        )
+        submit_attempt(instance, student, {})
+        content = b''.join(exports.csv_chunks(exports.gradebook_rows(
+            exports.gradebook_queryset()
+        ))).decode('utf-8-sig')
+        row = next(itertools.islice(csv.reader(io.StringIO(content)), 1, None))
+        self.assertEqual(row[0], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row[3], "'-1+1")
+
+    def test_admin_export_needs_a_school_with_school_databases(self):
+        School.objects.create(name='North', slug='north')
+        self.assertTrue(AdminGradebookExportForm({'format': 'csv'}).is_valid())
+        with override_settings(TENANT_DATABASES=True):
+            form = AdminGradebookExportForm({'format': 'csv'})
+            self.assertFalse(form.is_valid())
+            self.assertIn('school', form.errors)
+            self.assertNotIn('All schools', str(form['school']))
+
+
+# ---------------------------
+# Parent digests
+# ---------------------------
+class ParentDigestTest(TestCase):
+    def setUp(self):
+        self.week = date(2026, 10, 5)
+        student = make_student('ada')
+        self.parents = [make_parent(f'parent{number}', student) for number in range(3)]
+
+    def test_interrupted_run_resumes_without_duplicates(self):
+        send = mail.get_connection().send_messages
+        calls = []
+
+        def flaky_send(messages):
+            calls.append(messages)
+            if len(calls) == 2:
+                raise ConnectionError("SMTP went away")
+            return send(messages)
+
+        with mock.patch.object(mail.backends.locmem.EmailBackend, 'send_messages', side_effect=flaky_send):
+            with self.assertRaises(ConnectionError):
+                send_parent_digests(self.week, batch_size=1)
+        self.assertEqual(len(mail.outbox), 1)
+
+        result = send_parent_digests(self.week, batch_size=1)
+        self.assertEqual(result.sent, 2)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [f'parent{number}@example.com' for number in range(3)],
+        )
+        self.assertEqual(send_parent_digests(self.week).sent, 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+
+# ---------------------------
+# Profiling and the slow-query log
+# ---------------------------
+class ProfilingTest(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        self.profile_dir = profile_dir.name
+        self.enterContext(override_settings(PROFILE_DIR=self.profile_dir))
+
+    def profiled_get(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('course_list'), {'profile': 'cprofile'})
+
+    def test_non_staff_requests_are_not_profiled(self):
+        response = self.profiled_get(make_student('ada').user)
+        self.assertNotIn('X-Profile-File', response.headers)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_staff_requests_write_a_profile(self):
+        response = self.profiled_get(User.objects.create_user('staff', is_staff=True))
+        path = os.path.join(self.profile_dir, response.headers['X-Profile-File'])
+        self.assertTrue(pstats.Stats(path).total_calls)
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_only_the_newest_profiles_are_kept(self):
+        staff = User.objects.create_user('staff', is_staff=True)
+        names = [self.profiled_get(staff).headers['X-Profile-File'] for _ in range(3)]
+        self.assertEqual(sorted(os.listdir(self.profile_dir)), names[1:])
+
+    @override_settings(SLOW_QUERY_SECONDS=0)
+    def test_slow_queries_are_logged_with_their_plan(self):
+        with self.assertLogs('novae_app.slow_queries', 'WARNING') as logs, \
+                profiling.query_origin('task:test'):
+            Assignment.objects.filter(title='Fractions').exists()
+        entry = json.loads(logs.records[-1].getMessage())
+        self.assertIn('novae_app_assignment', entry['sql'])
+        self.assertTrue(entry['plan'])
+        self.assertEqual(entry['origin'], 'task:test')
+        self.assertTrue(any(frame.startswith('novae_app/tests.py:') for frame in entry['stack']))
@@ -6,10 +6,12 @@ from .views import student_signup
 from django.shortcuts import redirect
 from .views import landing
 from .views import coming_soon
+from .pagecache import cache_anonymous_page
 
 #replace coming_soon with return redirect('student_signup')  # Redirect to the signup page
 #
 # Simple redirect view for the homepage
+@cache_anonymous_page()
 def home_redirect(request):
     return redirect('student_signup')  # Redirect to the signup page
 urlpatterns = [
@@ -32,8 +34,14 @@ urlpatterns = [
     path('student/assignments/<int:instance_id>/retake/', views.student_assignment_retake, name='student_assignment_retake'),
     path('student/grades/', views.student_grades, name='student_grades'),
     path('student/materials/', views.student_materials, name='student_materials'),
+    path('student/materials/<int:pk>/download/', views.material_download, name='material_download'),
+    path('student/materials/<int:pk>/preview/', views.material_preview, name='material_preview'),
     path('student/daily-quiz/', views.daily_quiz, name='daily_quiz'),
     path('student/learning-games/', views.learning_games_view, name='learning_games'),
+    path('search/', views.search, name='search'),
+    path('courses/', views.course_list, name='course_list'),
+    path('courses/<int:course_id>/', views.course_detail, name='course_detail'),
+    path('courses/<int:course_id>/lessons/<int:lesson_id>/', views.lesson_detail, name='lesson_detail'),
 
     # Study Plan
     path('student/study-plans/', views.study_plan_list, name='study_plan_list'),
@@ -65,6 +73,7 @@ urlpatterns = [
     # ---------------------------
     path('parent/login/', views.ParentLoginView.as_view(), name='parent_login'),
     path('parent/dashboard/', views.parent_dashboard, name='parent_dashboard'),
+    path('parent/gradebook/export/', views.parent_gradebook_export, name='parent_gradebook_export'),
 
     # ---------------------------
     # Other Pages
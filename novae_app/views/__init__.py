@@ -0,0 +1,33 @@
+"""
+Views, one module per feature. Everything urls.py routes to is
+re-exported here, so ``views.<name>`` keeps working.
+
+Modules import only what their own pages need; heavy optional packages
+(python-docx, django-import-export, numpy) are imported where they are
+used, never while the URLconf loads.
+"""
+from .access import user_is_paid  # noqa: F401
+from .accounts import ParentLoginView, StudentLoginView, student_signup  # noqa: F401
+from .courses import course_detail, course_list, lesson_detail, render_lesson_body, search  # noqa: F401
+from .downloads import download_assignment_docx, download_graded_assignment_docx  # noqa: F401
+from .materials import material_download, material_preview, student_materials  # noqa: F401
+from .pages import about_us, assignment_preview, billing_view, coming_soon, landing  # noqa: F401
+from .parents import (  # noqa: F401
+    assignment_results,
+    get_grades,
+    parent_dashboard,
+    parent_gradebook_export,
+    parent_submitted_assignments,
+)
+from .student import (  # noqa: F401
+    achievements,
+    daily_quiz,
+    learning_games_view,
+    student_assignment_detail,
+    student_assignment_retake,
+    student_assignments,
+    student_dashboard,
+    student_grades,
+    study_timer,
+)
+from .study_plans import study_plan_create, study_plan_delete, study_plan_edit, study_plan_list  # noqa: F401
@@ -0,0 +1,9 @@
+"""Checks shared by the views."""
+
+
+def user_is_paid(user):
+    return (
+        user.is_authenticated
+        and hasattr(user, "billing_profile")
+        and user.billing_profile.is_paid
+    )
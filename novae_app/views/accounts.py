@@ -0,0 +1,75 @@
+"""Logins and family sign-up."""
+from django.contrib.auth.views import LoginView
+from django.db import transaction
+from django.shortcuts import redirect, render
+from django.views.decorators.cache import never_cache
+
+from ..forms import ChildFormSet, ParentSignUpForm
+from ..models import ParentProfile, StudentProfile, User
+
+
+# ---------------------------
+# STUDENT LOGIN
+# ---------------------------
+class StudentLoginView(LoginView):
+    template_name = 'novae_app/student_login.html'
+
+    def form_valid(self, form):
+        user = form.get_user()
+        if not user.is_student():
+            return redirect('landing')
+        return super().form_valid(form)
+
+
+# ---------------------------
+# PARENT LOGIN VIEW
+# ---------------------------
+class ParentLoginView(LoginView):
+    template_name = 'novae_app/parent_login.html'
+
+    def form_valid(self, form):
+        user = form.get_user()
+        # Make sure the user is a parent
+        if user.is_authenticated and hasattr(user, 'is_parent') and user.is_parent():
+            return super().form_valid(form)
+        form.add_error(None, "You must log in as a parent.")
+        return self.form_invalid(form)
+
+    def get_success_url(self):
+        return '/parent/dashboard/'
+
+
+# ---------------------------
+# SIGN-UP
+# ---------------------------
+@never_cache
+def student_signup(request):
+    if request.method == 'POST':
+        parent_form = ParentSignUpForm(request.POST)
+        child_formset = ChildFormSet(request.POST)
+        if parent_form.is_valid() and child_formset.is_valid():
+            with transaction.atomic():
+                parent_user = User.objects.create_user(
+                    username=parent_form.cleaned_data['username'],
+                    email=parent_form.cleaned_data['email'],
+                    password=parent_form.cleaned_data['password'],
+                    role='parent'
+                )
+                parent_profile = ParentProfile.objects.create(user=parent_user)
+                for child_form in child_formset:
+                    username = child_form.cleaned_data.get('username')
+                    grade = child_form.cleaned_data.get('grade')
+                    password = child_form.cleaned_data.get('password')
+                    if username and grade and password:
+                        child_user = User.objects.create_user(username=username, password=password, role='student')
+                        student_profile = StudentProfile.objects.create(user=child_user, grade=grade)
+                        parent_profile.children.add(student_profile)
+            return redirect('landing')
+    else:
+        parent_form = ParentSignUpForm()
+        child_formset = ChildFormSet()
+
+    return render(request, "student_signup.html", {
+      'parent_form': parent_form,
+      'child_formset': child_formset,
+})
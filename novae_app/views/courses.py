@@ -0,0 +1,136 @@
+"""Course reader and catalog search."""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.shortcuts import get_object_or_404, render
+from django.utils.html import linebreaks, urlize
+from django.utils.safestring import mark_safe
+
+from .. import search as catalog_search
+from .. import tenancy
+from ..models import Course
+from .access import user_is_paid
+
+
+# ---------------------------
+# COURSE READER
+# ---------------------------
+LESSONS_PER_PAGE = 20
+
+
+def render_lesson_body(lesson):
+    """
+    HTML for a lesson's text. Rendered bodies are cached under a hash of
+    the content, so an edit gets a fresh entry and unchanged lessons are
+    never rendered twice.
+    """
+    digest = hashlib.sha256(lesson.content.encode('utf-8')).hexdigest()
+    key = f'lesson-body:{digest}'
+    body = cache.get(key)
+    if body is None:
+        body = linebreaks(urlize(lesson.content, autoescape=True))
+        cache.set(key, body, getattr(settings, 'LESSON_BODY_CACHE_TIMEOUT', 86400))
+    return mark_safe(body)
+
+
+def _visible_courses(user):
+    courses = Course.objects.for_school(tenancy.current_school())
+    if not user_is_paid(user):
+        courses = courses.filter(is_demo=True)
+    return courses
+
+
+def _visible_lessons(course, user):
+    lessons = course.lessons.all()
+    if not user_is_paid(user):
+        lessons = lessons.filter(is_sample=True)
+    return lessons
+
+
+def _parse_cursor(value):
+    """``"<order>-<id>"`` -> (order, id), or None."""
+    try:
+        order, pk = value.split('-', 1)
+        return int(order), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+@login_required
+def course_list(request):
+    courses = _visible_courses(request.user).annotate(
+        lesson_count=Count('lessons')
+    ).order_by('title')
+    return render(request, 'novae_app/course_list.html', {'courses': courses})
+
+
+@login_required
+def course_detail(request, course_id):
+    course = get_object_or_404(_visible_courses(request.user), id=course_id)
+
+    # Keyset pagination on (order, id): each page starts right after the
+    # last lesson of the previous one, so deep pages cost the same as the
+    # first. Lesson bodies are not loaded for the listing.
+    lessons = _visible_lessons(course, request.user).defer('content').order_by('order', 'id')
+    cursor = _parse_cursor(request.GET.get('after'))
+    if cursor:
+        order, pk = cursor
+        lessons = lessons.filter(Q(order__gt=order) | Q(order=order, id__gt=pk))
+    page = list(lessons[:LESSONS_PER_PAGE + 1])
+
+    next_cursor = None
+    if len(page) > LESSONS_PER_PAGE:
+        page = page[:LESSONS_PER_PAGE]
+        next_cursor = f'{page[-1].order}-{page[-1].id}'
+
+    return render(request, 'novae_app/course_detail.html', {
+        'course': course,
+        'lessons': page,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
+    })
+
+
+@login_required
+def lesson_detail(request, course_id, lesson_id):
+    course = get_object_or_404(_visible_courses(request.user), id=course_id)
+    lessons = _visible_lessons(course, request.user)
+    lesson = get_object_or_404(lessons, id=lesson_id)
+
+    following = lessons.defer('content').filter(
+        Q(order__gt=lesson.order) | Q(order=lesson.order, id__gt=lesson.id)
+    ).order_by('order', 'id').first()
+    preceding = lessons.defer('content').filter(
+        Q(order__lt=lesson.order) | Q(order=lesson.order, id__lt=lesson.id)
+    ).order_by('-order', '-id').first()
+
+    return render(request, 'novae_app/lesson_detail.html', {
+        'course': course,
+        'lesson': lesson,
+        'body': render_lesson_body(lesson),
+        'previous_lesson': preceding,
+        'next_lesson': following,
+    })
+
+
+# ---------------------------
+# SEARCH
+# ---------------------------
+@login_required
+def search(request):
+    query = request.GET.get('q', '').strip()
+    profile = getattr(request.user, 'student_profile', None)
+    results = catalog_search.search(
+        query,
+        user=request.user,
+        grade=profile.grade_ordinal if profile else None,
+        paid=user_is_paid(request.user),
+        school=tenancy.current_school(),
+    ) if query else []
+    return render(request, 'novae_app/search.html', {
+        'query': query,
+        'results': results,
+    })
@@ -0,0 +1,63 @@
+"""DOCX downloads, rendered by the worker on first request."""
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404, redirect, render
+
+from .. import documents
+from ..models import Assignment, AssignmentInstance, Job
+from .access import user_is_paid
+
+
+# ---------------------------
+# DOWNLOAD ASSIGNMENTS
+# ---------------------------
+def _docx_download(request, path, filename, task, payload):
+    """
+    Serve an exported DOCX if it has been rendered, otherwise queue the
+    render and tell the browser to try again shortly.
+    """
+    if os.path.exists(path):
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            filename=filename,
+            content_type=documents.DOCX_CONTENT_TYPE,
+        )
+    Job.objects.enqueue(task, payload, priority=10, key=f'{task}:{os.path.basename(path)}')
+    response = render(request, 'novae_app/document_preparing.html', {'filename': filename}, status=202)
+    response['Refresh'] = '3'
+    return response
+
+
+@login_required
+def download_assignment_docx(request, pk):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    assignment = get_object_or_404(Assignment, id=pk)
+    return _docx_download(
+        request,
+        documents.assignment_docx_path(assignment),
+        f"{assignment.title}.docx",
+        'render_assignment_docx',
+        {'assignment_id': assignment.id},
+    )
+
+
+# ---------------------------
+# DOWNLOAD GRADED ASSIGNMENT DOCX
+# ---------------------------
+@login_required
+def download_graded_assignment_docx(request, instance_id):
+    instance = get_object_or_404(
+        AssignmentInstance.objects.select_related('assignment'), id=instance_id
+    )
+    return _docx_download(
+        request,
+        documents.graded_docx_path(instance),
+        f"{instance.assignment.title}_graded_review.docx",
+        'render_graded_docx',
+        {'instance_id': instance.id},
+    )
@@ -0,0 +1,52 @@
+"""Material listing, downloads and previews."""
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+
+from .. import materials as material_files
+from .. import tenancy
+from ..conditional import student_conditional
+from ..models import Material
+from .access import user_is_paid
+
+
+# ---------------------------
+# STUDENT MATERIALS
+# ---------------------------
+@login_required
+@student_conditional('student_materials')
+def student_materials(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    student = request.user.student_profile
+    materials = Material.objects.for_school(student.school_id).for_grade(student.grade_ordinal)
+    return render(request, 'novae_app/student_materials.html', {'materials': materials})
+
+
+def _material_for(request, pk):
+    material = get_object_or_404(Material.objects.for_school(tenancy.current_school()), id=pk)
+    if not (material.is_demo or material.is_sample or user_is_paid(request.user)):
+        return None
+    return material
+
+
+@login_required
+def material_download(request, pk):
+    material = _material_for(request, pk)
+    if material is None:
+        return redirect('billing')
+    if not material.file:
+        return redirect(material.file_url)
+    extension = os.path.splitext(material.file.name)[1]
+    return material_files.serve_file(request, material.file, f"{material.title}{extension}")
+
+
+@login_required
+def material_preview(request, pk):
+    material = _material_for(request, pk)
+    if material is None or not material.preview:
+        raise Http404("No preview for this material.")
+    return material_files.serve_file(request, material.preview)
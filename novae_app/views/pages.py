@@ -0,0 +1,80 @@
+"""Public pages: landing, marketing, billing and assignment previews."""
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.shortcuts import get_object_or_404, render
+
+from ..models import Assignment
+from ..pagecache import assignment_scope, cache_anonymous_page
+
+
+# ---------------------------
+# LANDING PAGE
+# ---------------------------
+@cache_anonymous_page()
+def landing(request):
+    return render(request, 'novae_app/landing.html')
+
+
+@cache_anonymous_page()
+def coming_soon(request):
+    return render(request, "coming_soon.html")
+
+
+@cache_anonymous_page()
+def about_us(request):
+    return render(request, 'about_us.html')
+
+
+# ---------------------------
+# BILLING
+# ---------------------------
+@login_required
+def billing_view(request):
+    """
+    Parent billing page.
+    Shows free trial (demo/sample) assignments.
+    """
+
+    free_trial_assignments = Assignment.objects.filter(
+        Q(is_demo=True) | Q(is_sample=True)
+    )
+
+    return render(
+        request,
+        "billing.html",
+        {
+            "current_plan": "Free Trial",
+            "free_trial_assignments": free_trial_assignments,
+        }
+    )
+
+
+# ---------------------------
+# ASSIGNMENT PREVIEW
+# ---------------------------
+@cache_anonymous_page(scope=assignment_scope)
+def assignment_preview(request, assignment_id):
+    assignment = get_object_or_404(Assignment, id=assignment_id)
+    questions = assignment.questions.all()
+
+    # Build a list of options for each question
+    question_data = []
+    for q in questions:
+        options = []
+        if q.option_a:
+            options.append(q.option_a)
+        if q.option_b:
+            options.append(q.option_b)
+        if q.option_c:
+            options.append(q.option_c)
+        if q.option_d:
+            options.append(q.option_d)
+        question_data.append({
+            "question": q,
+            "options": options
+        })
+
+    return render(request, "assignment_preview.html", {
+        "assignment": assignment,
+        "question_data": question_data,
+    })
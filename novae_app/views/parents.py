@@ -0,0 +1,183 @@
+"""Parent dashboard, children's grades and gradebook export."""
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+
+from .. import answers as submitted_answers
+from .. import exports
+from ..forms import GradebookExportForm
+from ..grading import answer_is_correct
+from ..models import AssignmentInstance, StudentProfile, User
+from .access import user_is_paid
+
+
+# ---------------------------
+# PARENT DASHBOARD
+# ---------------------------
+@login_required
+def parent_dashboard(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    if not request.user.is_parent():
+        return redirect('landing')
+
+    children = request.user.parent_profile.children.select_related('user')
+    data = []
+
+    today = timezone.now().date()
+
+    for child in children:
+        grades = AssignmentInstance.objects.filter(
+            student=child,
+            score__isnull=False
+        )
+
+        seconds = child.daily_time_seconds if child.last_active_date == today else 0
+
+        data.append({
+            'student_id': child.id,
+            'user': child.user,
+            'grade': child.grade,
+            'grades': grades,
+            'total_time_spent': timedelta(seconds=seconds),
+        })
+
+    return render(request, 'novae_app/parent_dashboard.html', {
+        'children': data,
+        'export_form': GradebookExportForm(),
+    })
+
+
+@login_required
+def parent_gradebook_export(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    if not request.user.is_parent():
+        return redirect('landing')
+
+    form = GradebookExportForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, "Please check the export dates.")
+        return redirect('parent_dashboard')
+
+    data = form.cleaned_data
+    return exports.gradebook_response(
+        exports.gradebook_queryset(
+            grade=data['grade'],
+            start=data['start'],
+            end=data['end'],
+            parent=request.user.parent_profile,
+        ),
+        export_format=data['format'],
+    )
+
+
+# ---------------------------
+# CHILDREN'S GRADES
+# ---------------------------
+@login_required
+def get_grades(request, child_id):
+    try:
+        student = StudentProfile.objects.get(user__id=child_id)
+    except StudentProfile.DoesNotExist:
+        return JsonResponse({"error": "Student not found"}, status=404)
+    
+    grades = AssignmentInstance.objects.filter(
+        student=student, score__isnull=False
+    ).select_related('assignment__stats')
+
+    grades_data = []
+    for g in grades:
+        stats = getattr(g.assignment, 'stats', None)
+        grades_data.append({
+            'assignment': g.assignment.title,
+            'score': g.score,
+            'best_score': g.best_score,
+            'attempts': g.attempt_count,
+            'class_average': round(stats.mean, 1) if stats and stats.count else None,
+            'comments': g.feedback or 'No feedback available',
+        })
+    
+    return JsonResponse({'grades': grades_data})
+
+
+@login_required
+def parent_submitted_assignments(request, student_id):
+    parent = request.user.parent_profile
+    student = get_object_or_404(StudentProfile, id=student_id, parents=parent)
+    assignments = AssignmentInstance.objects.filter(
+        student=student, score__isnull=False
+    ).select_related('assignment')
+    return render(request, 'novae_app/student_grades.html', {'student': student, 'grades': assignments})
+
+
+@login_required
+def assignment_results(request, child_name):
+    """
+    Render assignment results page for a specific student.
+    """
+    # Fetch the student user
+    student_user = get_object_or_404(User, username=child_name)
+
+    # Fetch student profile
+    student = get_object_or_404(StudentProfile, user=student_user)
+
+    # Fetch all AssignmentInstances for this student
+    assignments_instances = list(
+        AssignmentInstance.objects.filter(student=student)
+        .select_related('assignment')
+        .prefetch_related('assignment__questions')
+    )
+
+    if not assignments_instances:
+        return render(request, 'novae_app/assignment_results.html', {'error': 'No assignments found'})
+
+    answers_by_instance = submitted_answers.answers_by_instance(
+        instance.id for instance in assignments_instances
+    )
+    assignments_data = []
+
+    for instance in assignments_instances:
+        answers = {
+            answer.question_id: answer for answer in answers_by_instance.get(instance.id, [])
+        }
+
+        assignment_data = {
+            'assignment': instance.assignment,
+            'score': instance.score,
+            'submitted_on': instance.completed_at,
+            'questions': []
+        }
+
+        for question in instance.assignment.questions.all():
+            student_answer = answers.get(question.id)
+            if student_answer is None:
+                shown, is_correct = 'Not answered', False
+            else:
+                shown = (
+                    student_answer.text_answer
+                    if question.question_type == 'TEXT'
+                    else student_answer.selected_option
+                )
+                is_correct = answer_is_correct(
+                    question.question_type,
+                    question.correct_option,
+                    student_answer.selected_option,
+                    student_answer.text_answer,
+                )
+            assignment_data['questions'].append({
+                'question_text': question.question_text,
+                'correct_answer': question.correct_option,
+                'student_answer': shown,
+                'is_correct': is_correct,
+            })
+
+        assignments_data.append(assignment_data)
+
+    return render(request, 'novae_app/assignment_results.html', {'assignments_data': assignments_data})
@@ -0,0 +1,267 @@
+"""The student's own pages: dashboard, assignments, grades, quiz and games."""
+import random
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import Http404
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+
+from .. import achievements as student_achievements
+from .. import review, tenancy
+from ..conditional import bump_students, student_conditional
+from ..forms import DailyQuizAnswerForm
+from ..grading import submit_attempt
+from ..models import Assignment, AssignmentInstance, Game, Material
+from ..review import quiz_questions
+from .access import user_is_paid
+
+
+# ---------------------------
+# STUDENT DASHBOARD
+# ---------------------------
+@login_required
+def student_dashboard(request):
+    if not hasattr(request.user, 'student_profile'):
+        return redirect('landing')
+
+    student = request.user.student_profile
+    paid = user_is_paid(request.user)
+
+    now = timezone.now()
+    today = now.date()
+
+    session_start = request.session.get('session_start', now.timestamp())
+    elapsed_seconds = now.timestamp() - session_start
+
+    if student.last_active_date != today:
+        student.daily_time_seconds = 0
+        student.last_active_date = today
+
+    student.daily_time_seconds += int(elapsed_seconds)
+    student.last_active_date = today
+    student.save()
+    request.session['session_start'] = now.timestamp()
+
+    # ------------------------
+    # Choose assignments based on demo vs paid
+    # ------------------------
+    if paid:
+        assignments_queryset = Assignment.objects.for_school(student.school_id)
+    else:
+        assignments_queryset = Assignment.objects.for_school(student.school_id).filter(is_demo=True)
+
+    # Ensure AssignmentInstances exist: one read on each side and a single
+    # insert for whatever is missing, however long the catalog is.
+    existing = set(student.assignments.values_list('assignment_id', flat=True))
+    missing = set(assignments_queryset.values_list('id', flat=True)) - existing
+    if missing:
+        AssignmentInstance.objects.bulk_create(
+            [AssignmentInstance(student=student, assignment_id=assignment_id) for assignment_id in missing],
+            ignore_conflicts=True,
+        )
+        # bulk_create skips the signals that move the student's data version.
+        bump_students([student.id])
+
+    # ------------------------
+    # Fetch assignments / grades / materials
+    # ------------------------
+    if paid:
+        assignments = AssignmentInstance.objects.filter(
+            student=student, completed=False
+        ).order_by('assignment__due_date')
+
+        grades = AssignmentInstance.objects.filter(
+            student=student, completed=True, score__isnull=False
+        )
+
+        materials = Material.objects.for_school(student.school_id).for_grade(student.grade_ordinal)
+    else:
+        assignments = AssignmentInstance.objects.filter(
+            student=student,
+            assignment__is_demo=True,
+            completed=False
+        ).order_by('assignment__due_date')
+
+        grades = AssignmentInstance.objects.filter(
+            student=student,
+            assignment__is_demo=True,
+            completed=True,
+            score__isnull=False
+        )
+
+        materials = Material.objects.for_school(student.school_id).for_grade(
+            student.grade_ordinal
+        ).filter(is_demo=True)
+
+    return render(request, 'novae_app/student_dashboard.html', {
+        'assignments': assignments,
+        'grades': grades,
+        'materials': materials,
+        'demo': not paid,
+        'total_time_spent': timedelta(seconds=student.daily_time_seconds),
+    })
+
+
+# ---------------------------
+# STUDENT ASSIGNMENTS
+# ---------------------------
+@login_required
+@student_conditional('student_assignments')
+def student_assignments(request):
+    if not user_is_paid(request.user):
+        messages.warning(request, "Upgrade to access assignments.")
+        return redirect('billing')
+
+    student = request.user.student_profile
+    instances = AssignmentInstance.objects.filter(student=student)
+    return render(request, 'novae_app/student_assignments.html', {
+        'assignments': instances
+    })
+
+
+@login_required
+def student_assignment_retake(request, instance_id):
+    """
+    Allow a student to retake an assignment if retake is allowed.
+    """
+    student = request.user.student_profile
+    instance = get_object_or_404(AssignmentInstance, id=instance_id, student=student)
+
+    if not instance.retake_allowed():
+        return redirect('student_assignments')
+
+    instance.start_retake()
+    return redirect('student_assignment_detail', instance_id=instance.id)
+
+
+# ---------------------------
+# ASSIGNMENT DETAIL
+# ---------------------------
+@login_required
+def student_assignment_detail(request, instance_id):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    student = request.user.student_profile
+    instance = get_object_or_404(
+        AssignmentInstance,
+        id=instance_id,
+        student=student
+    )
+
+    questions = instance.assignment.questions.all()
+
+    if request.method == 'POST':
+        values = {
+            question: request.POST.get(f'question_{question.id}', '').strip()
+            for question in questions
+        }
+        old_score, was_completed = instance.score, instance.attempt_count > 0
+        submit_attempt(instance, student, values)
+        student_achievements.record_assignment_graded(
+            student.id, old_score, instance.score, was_completed
+        )
+
+        return redirect('student_assignments')
+
+    return render(request, 'novae_app/assignment_detail.html', {
+        'instance': instance,
+        'questions': questions,
+    })
+
+
+# ---------------------------
+# GRADES
+# ---------------------------
+@login_required
+@student_conditional('student_grades')
+def student_grades(request):
+    student = request.user.student_profile
+    grades = AssignmentInstance.objects.filter(
+        student=student, score__isnull=False
+    ).select_related('assignment')
+    return render(request, 'novae_app/student_grades.html', {'grades': grades})
+
+
+# ---------------------------
+# DAILY QUIZ
+# ---------------------------
+@login_required
+def daily_quiz(request):
+    student = getattr(request.user, 'student_profile', None)
+    paid = user_is_paid(request.user)
+    scheduled = student is not None and paid
+    school = student.school_id if student is not None else tenancy.current_school()
+    questions = quiz_questions(school, paid)
+
+    if request.method == 'POST':
+        form = DailyQuizAnswerForm(request.POST)
+        if not form.is_valid():
+            raise Http404("No such question.")
+        question = get_object_or_404(questions, id=form.cleaned_data['question_id'])
+        selected_option = request.POST.get('option')
+        correct = (selected_option == question.correct_option)
+        if scheduled:
+            review.record_answer(student, question, correct)
+        if student is not None:
+            student_achievements.record_quiz_answer(student.id, correct)
+        return render(request, 'novae_app/daily_quiz_result.html', {
+            'question': question,
+            'selected_option': selected_option,
+            'correct': correct,
+        })
+
+    if scheduled:
+        question = review.next_question(student)
+        if question is None and questions.exists():
+            return render(request, 'novae_app/daily_quiz.html', {
+                'error': "You're all caught up! Come back tomorrow for more reviews.",
+            })
+    elif paid:
+        # Random pick without sorting the whole bank: jump to a random id.
+        last = questions.order_by('-id').values_list('id', flat=True).first()
+        question = last and questions.filter(
+            id__gte=random.randint(1, last)
+        ).order_by('id').first()
+    else:
+        question = questions.order_by('id').first()
+
+    if question is None:
+        return render(request, 'novae_app/daily_quiz.html', {'error': "No questions available."})
+
+    return render(request, 'novae_app/daily_quiz.html', {'question': question})
+
+
+# ---------------------------
+# LEARNING GAMES
+# ---------------------------
+@login_required
+def learning_games_view(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    grade = request.user.student_profile.grade_ordinal
+    games = Game.objects.for_grade(0 if grade is None else grade)
+    return render(request, 'novae_app/learning_games.html', {'games': games})
+
+
+# ---------------------------
+# ACHIEVEMENTS AND TIMER
+# ---------------------------
+@login_required
+def achievements(request):
+    """Render the achievements page for the logged-in user."""
+    student = getattr(request.user, 'student_profile', None)
+    badges = student_achievements.badges_for(student)
+    return render(request, 'novae_app/achievements.html', {
+        'badges': badges,
+        'earned_count': sum(1 for entry in badges if entry['earned_at']),
+    })
+
+
+@login_required
+def study_timer(request):
+    """Render the study timer page for the logged-in user."""
+    return render(request, 'novae_app/study_timer.html')
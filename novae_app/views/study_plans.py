@@ -0,0 +1,69 @@
+"""Study plans."""
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect, render
+
+from ..forms import StudyPlanForm
+from ..models import StudyPlan
+from .access import user_is_paid
+
+
+# ---------------------------
+# STUDY PLANS
+# ---------------------------
+@login_required
+def study_plan_list(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    plans = StudyPlan.objects.filter(user=request.user)
+    return render(request, 'novae_app/study_plan_list.html', {'plans': plans})
+
+
+@login_required
+def study_plan_create(request):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    if request.method == 'POST':
+        form = StudyPlanForm(request.POST)
+        if form.is_valid():
+            plan = form.save(commit=False)
+            plan.user = request.user
+            plan.save()
+            return redirect('study_plan_list')
+    else:
+        form = StudyPlanForm()
+
+    return render(request, 'novae_app/study_plan_form.html', {'form': form})
+
+
+@login_required
+def study_plan_edit(request, pk):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    plan = get_object_or_404(StudyPlan, id=pk, user=request.user)
+
+    if request.method == 'POST':
+        form = StudyPlanForm(request.POST, instance=plan)
+        if form.is_valid():
+            form.save()
+            return redirect('study_plan_list')
+    else:
+        form = StudyPlanForm(instance=plan)
+
+    return render(request, 'novae_app/study_plan_form.html', {'form': form})
+
+
+@login_required
+def study_plan_delete(request, pk):
+    if not user_is_paid(request.user):
+        return redirect('billing')
+
+    plan = get_object_or_404(StudyPlan, id=pk, user=request.user)
+
+    if request.method == 'POST':
+        plan.delete()
+        return redirect('study_plan_list')
+
+    return render(request, 'novae_app/study_plan_confirm_delete.html', {'plan': plan})